@@ -1,20 +1,178 @@
-from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, Request
-from sqlalchemy.orm import Session
-from app.db.database import get_db
-from app.models.analysis import Analysis
-from app.models.skin import Skin
-from app.services.agent import analyze_skin
+from fastapi import APIRouter, Depends, HTTPException, Query, status, UploadFile, File, Request, Response
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from sqlalchemy import func, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import load_only, selectinload
+from app.db.database import get_db, SessionLocal
+from app.models.analysis import SUMMARY_COLUMNS, Analysis
+from app.models.analysis_jobs import AnalysisJob
+from app.services.analysis_jobs import (
+    COMPLETED,
+    FAILED,
+    analyze_batch,
+    analyze_upload,
+    create_job,
+    release_upload,
+)
+from app.services.agent import TEAM_PROFILES
+from app.services.analysis_stream import format_sse
+from app.services.blob_store import blob_store
+from app.services.image_derivatives import derivative_urls, schedule_derivatives
+from app.services.image_hash import cache_info, image_hash_index
+from app.services.pagination import InvalidCursor, keyset_page
+from app.services.profile_limits import AnalysisBusy
+from app.services.rate_limit import RateLimitExceeded, check_rate_limit
+from app.services.skin_metrics import compute_skin_metrics
+from app.services.timing import StageTimer, degraded_info, timing_info
+from app.services.uploads import UploadTooLarge
+from app.core.config import settings
 from app.core.security import get_current_user
 from app.models.users import User
 from app.schemas.responses import APIResponse
-from app.models.journals import Journals
-import aiofiles
-import os
-from datetime import datetime
-import json
+import asyncio
+from typing import List, Optional
 
 router = APIRouter()
 
+
+def analysis_to_dict(analysis: Analysis):
+    """Convert an analysis record to the dictionary returned by the API"""
+    return {
+        "id": analysis.id,
+        "user_id": analysis.user_id,
+        "image_url": analysis.image_url,
+        **derivative_urls(analysis.image_url),
+        "overall_health": analysis.overall_health,
+        "skin_type": analysis.skin_type,
+        "concerns": analysis.concerns,
+        "recommendations": analysis.recommendations,
+        "analysis_metrics": analysis.analysis_metrics,
+        "skincare_products": analysis.skincare_products,
+        "created_at": analysis.created_at.isoformat()
+    }
+
+
+def analysis_summary_to_dict(analysis: Analysis):
+    """Listing entry of an analysis, loaded with ``SUMMARY_COLUMNS`` only"""
+    return {
+        "id": analysis.id,
+        "user_id": analysis.user_id,
+        "image_url": analysis.image_url,
+        **derivative_urls(analysis.image_url),
+        "overall_health": analysis.overall_health,
+        "skin_type": analysis.skin_type,
+        "concern_names": analysis.concern_names or [],
+        "analysis_metrics": analysis.analysis_metrics,
+        "created_at": analysis.created_at.isoformat()
+    }
+
+
+def analysis_payload(analysis: Analysis, skin_profile: bool = True):
+    """API payload of a new analysis: the record, the skin profile, cache, timings and degradation"""
+    data = {"analysis": analysis_to_dict(analysis)}
+    if skin_profile:
+        data["skin_profile"] = {
+            "skin_type": analysis.skin_type,
+            "concerns": [concern["name"] for concern in analysis.concerns]
+        }
+    data["cache"] = cache_info(analysis)
+    data["timings"] = timing_info(analysis)
+    data["degraded"] = degraded_info(analysis)
+    return data
+
+
+def analyze_in_worker(user_id: int, image_path: str, image_url: str, **kwargs):
+    """Analyze an upload with a session of the worker thread and return its payload.
+
+    The upload's blob reference is released when the analysis fails.
+    """
+    db = SessionLocal()
+    try:
+        try:
+            user = db.get(User, user_id)
+            return analysis_payload(analyze_upload(db, user, image_path, image_url, **kwargs))
+        except Exception:
+            release_upload(db, image_url)
+            raise
+    finally:
+        db.close()
+
+
+def analyze_batch_in_worker(user_id: int, uploads, **kwargs):
+    """Analyze a batch with a session of the worker thread.
+
+    Returns one payload or ``{"error": ...}`` per upload, in order, and the
+    combined skin profile. Failed uploads release their blob reference.
+    """
+    db = SessionLocal()
+    try:
+        try:
+            results, skin_profile = analyze_batch(db, db.get(User, user_id), uploads, **kwargs)
+        except Exception as e:
+            results = [{"analysis": None, "error": e} for _ in uploads]
+            skin_profile = None
+
+        outcomes = []
+        for (_, image_url), result in zip(uploads, results):
+            if result["analysis"] is None:
+                release_upload(db, image_url)
+                outcomes.append({"error": result["error"]})
+            else:
+                outcomes.append(analysis_payload(result["analysis"], skin_profile=False))
+        return outcomes, skin_profile
+    finally:
+        db.close()
+
+
+def validate_profile(profile: Optional[str]):
+    if profile is not None and profile not in TEAM_PROFILES:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Profile must be one of: {', '.join(TEAM_PROFILES)}"
+        )
+
+
+def analysis_error_status(error: Exception):
+    """HTTP status for a failed analysis, busy run slots and an exhausted API key are not server errors"""
+    if isinstance(error, RateLimitExceeded):
+        return status.HTTP_429_TOO_MANY_REQUESTS
+    if isinstance(error, AnalysisBusy):
+        return status.HTTP_503_SERVICE_UNAVAILABLE
+    return status.HTTP_500_INTERNAL_SERVER_ERROR
+
+
+def analysis_error_headers(error: Exception):
+    if isinstance(error, RateLimitExceeded):
+        return {"Retry-After": str(error.retry_after_seconds)}
+    return None
+
+
+async def store_image(db: AsyncSession, image: UploadFile):
+    """Stream an uploaded image into the blob store and render its thumbnails, answering 413 when it is too large"""
+    try:
+        blob = await blob_store.put(db, image)
+    except UploadTooLarge as e:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=str(e)
+        )
+    schedule_derivatives(blob)
+    return blob
+
+
+async def ensure_rate_limit(user: User):
+    """Reject an analysis before its upload is stored when the user's API key is out of budget"""
+    try:
+        # The SQLite store blocks on its file lock
+        await run_in_threadpool(check_rate_limit, user.gemini_api_key)
+    except RateLimitExceeded as e:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail=str(e),
+            headers=analysis_error_headers(e)
+        )
+
 # @router.post("/upload-image", response_model=APIResponse)
 # async def upload_image(image: UploadFile = File(...), current_user: User = Depends(get_current_user)):
 #     """Upload skin image for analysis"""
@@ -51,136 +209,92 @@ router = APIRouter()
 #     )
 
 @router.post("/analyze", response_model=APIResponse)
-async def analyze_skin_image(request: Request, image: UploadFile = File(...), current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
-    """Upload and analyze skin image"""
+async def analyze_skin_image(
+    request: Request,
+    response: Response,
+    image: UploadFile = File(...),
+    mode: str = "sync",
+    profile: Optional[str] = None,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """Upload and analyze skin image
+
+    With ``mode=async`` the upload is stored, a background job is queued and
+    its id is returned immediately. Poll ``/analysis/jobs/{job_id}`` for the
+    result. ``mode=quick`` only computes local image metrics, without calling
+    the model or storing anything. ``profile`` picks the team: ``fast``,
+    ``standard`` or ``deep``.
+    """
+    if mode not in ("sync", "async", "quick"):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Mode must be one of: sync, async, quick"
+        )
+    validate_profile(profile)
+
     # Validate image format
     if not image.content_type.startswith("image/"):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="File must be an image"
         )
+
+    if mode == "quick":
+        try:
+            metrics = await run_in_threadpool(compute_skin_metrics, image.file)
+        except Exception as e:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Quick scan failed: {str(e)}"
+            )
+        return APIResponse(
+            success=True,
+            message="Quick scan completed successfully",
+            data={"analysis_metrics": metrics}
+        )
     
-    # Save image 
-    upload_dir = "uploads/skin-images"
-    os.makedirs(upload_dir, exist_ok=True)
-    
-    # Generate unique filename
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    file_extension = os.path.splitext(image.filename)[1]
-    filename = f"{current_user.id}_{timestamp}{file_extension}"
-    filepath = os.path.join(upload_dir, filename)
+    await ensure_rate_limit(current_user)
 
-    # Save the uplaoded file
-    with open(filepath, "wb") as buffer:
-        buffer.write(await image.read())
+    # Save the uploaded image, named by its content
+    timer = StageTimer()
+    with timer.span("file_save"):
+        blob = await store_image(db, image)
 
-    # async with aiofiles.open(filepath, 'wb') as out_file:
-    #     content = await image.read()
-    #     await out_file.write(content)
+    filepath = blob_store.path(blob)
+    image_url = str(request.base_url)[:-1] + blob_store.url(blob)
+
+    if mode == "async":
+        job = await db.run_sync(create_job, current_user.id, filepath, image_url, profile)
+        response.status_code = status.HTTP_202_ACCEPTED
+        return APIResponse(
+            success=True,
+            message="Analysis job queued",
+            data={
+                "job_id": job.id,
+                "status": job.status
+            }
+        )
 
     # Perform AI analysis
     try:
-        query = db.query(Journals).filter(Journals.user_id == current_user.id)
-
-        journals = query.order_by(Journals.created_at.desc()).all()
-        # Convert SQLAlchemy model to dictionary
-        journals_list = []
-        for journal in journals:
-            journals_list.append({
-                "title": journal.title,
-                "content": journal.content,
-                "created_at": journal.created_at,
-                "updated_at": journal.updated_at
-            })
-
-        user_api_key = current_user.gemini_api_key
-        user_country = current_user.country
-        analysis_result = analyze_skin(filepath, user_api_key,  user_country, journals_list)
-
-        # Validate and convert AI response
-        if isinstance(analysis_result, str):
-            analysis_result = json.loads(analysis_result)
-
-        # Validate required fields
-        required_fields = ["overall_health", "skin_type", "concerns", "recommendations", "analysis_metrics", "skincare_products"]
-        if not all(field in analysis_result for field in required_fields):
-            raise ValueError("Invalid AI response structure")
-        
-        # Create analysis record
-        analysis = Analysis(
-            user_id=current_user.id,
-            image_url=str(request.base_url)[:-1] + f"/uploads/skin-images/{filename}",
-            overall_health=analysis_result["overall_health"],
-            skin_type=analysis_result["skin_type"],
-            concerns=analysis_result["concerns"],
-            recommendations=analysis_result["recommendations"],
-            analysis_metrics=analysis_result["analysis_metrics"],
-            skincare_products=analysis_result["skincare_products"]
+        # Run the blocking team run in a worker thread with its own session to keep the event loop free
+        data = await run_in_threadpool(
+            analyze_in_worker, current_user.id, filepath, image_url, timer=timer, profile=profile
         )
-        db.add(analysis)
-
-        # Update or create skin profile
-        skin = db.query(Skin).filter(Skin.user_id == current_user.id).first()
-        concerns_list = [concern["name"] for concern in analysis_result["concerns"]]
-
-        if not skin:
-            skin = Skin(
-                user_id=current_user.id,
-                skin_type=analysis_result["skin_type"],
-                concerns=", ".join(concerns_list)
-            )
-            db.add(skin)
-        else:
-            skin.skin_type = analysis_result["skin_type"]
-            skin.concerns = ", ".join(concerns_list)
-        
-        db.commit()
-        db.refresh(analysis)
-
-        # # Convert SQLAlchemy model to Pydantic model for serialization
-        # analysis_response = AnalysisResponse(
-        #     id=analysis.id,
-        #     user_id=analysis.user_id,
-        #     image_url=analysis.image_url,
-        #     created_at=analysis.created_at,
-        #     overall_health=analysis.overall_health,
-        #     skin_type=analysis.skin_type,
-        #     concerns=analysis.concerns,
-        #     recommendations=analysis.recommendations,
-        #     analysis_metrics=analysis.analysis_metrics
-        # )
 
         return APIResponse(
             success=True,
             message="Image analyzed successfully",
-            data={
-                "analysis": {
-                    "id": analysis.id,
-                    "image_url": analysis.image_url,
-                    "overall_health": analysis.overall_health,
-                    "skin_type": analysis.skin_type,
-                    "concerns": analysis.concerns,
-                    "recommendations": analysis.recommendations,
-                    "analysis_metrics": analysis.analysis_metrics,
-                    "skincare_products": analysis.skincare_products,
-                    "created_at": analysis.created_at.isoformat()
-                },
-                "skin_profile": {
-                    "skin_type": analysis_result["skin_type"],
-                    "concerns": concerns_list
-                }
-            }
+            data=data
         )
     except Exception as e:
-        # Clean up the uploaded file if analysis fails
-        if os.path.exists(filepath):
-            os.remove(filepath)
         raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=f"Analysis failed: {str(e)}"
+            status_code=analysis_error_status(e),
+            detail=f"Analysis failed: {str(e)}",
+            headers=analysis_error_headers(e)
         )
 
-    
     # # Mock response for development
     # analysis_data = {
     #     "overall_health": "Good",
@@ -221,37 +335,257 @@ async def analyze_skin_image(request: Request, image: UploadFile = File(...), cu
     
 
 
+@router.post("/analyze-stream")
+async def analyze_skin_image_stream(
+    request: Request,
+    image: UploadFile = File(...),
+    profile: Optional[str] = None,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """Upload and analyze skin image, streaming progress as Server-Sent Events
+
+    Events: ``image_accepted``, ``cache_hit``, ``quick_scan``, ``run_started``,
+    ``member_started``/``member_finished``, ``tool_call_started``/``tool_call_completed``,
+    ``section`` (one per finished part of the result), ``recommendation_cache_hit``
+    when the research for the skin profile was reused, ``degraded`` when the
+    deadline budget cut the run short, then ``analysis`` with the persisted
+    record, or ``error``.
+    """
+    validate_profile(profile)
+
+    # Validate image format
+    if not image.content_type.startswith("image/"):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="File must be an image"
+        )
+
+    await ensure_rate_limit(current_user)
+
+    # Save the uploaded image, named by its content
+    timer = StageTimer()
+    with timer.span("file_save"):
+        blob = await store_image(db, image)
+
+    filepath = blob_store.path(blob)
+    image_url = str(request.base_url)[:-1] + blob_store.url(blob)
+    user_id = current_user.id
+
+    loop = asyncio.get_running_loop()
+    events = asyncio.Queue()
+
+    def emit(event, data=None):
+        loop.call_soon_threadsafe(events.put_nowait, (event, data))
+
+    def run_analysis():
+        try:
+            emit("analysis", analyze_in_worker(user_id, filepath, image_url, on_event=emit, timer=timer, profile=profile))
+        except Exception as e:
+            emit("error", {
+                "detail": f"Analysis failed: {str(e)}",
+                "status": analysis_error_status(e),
+                "retry_after": e.retry_after_seconds if isinstance(e, RateLimitExceeded) else None
+            })
+        finally:
+            emit(None)
+
+    async def event_stream():
+        yield format_sse("image_accepted", {"image_url": image_url})
+        task = loop.run_in_executor(None, run_analysis)
+        while True:
+            event, data = await events.get()
+            if event is None:
+                break
+            yield format_sse(event, data)
+        await task
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+@router.post("/analyze-batch", response_model=APIResponse)
+async def analyze_skin_images_batch(
+    request: Request,
+    images: List[UploadFile] = File(...),
+    profile: Optional[str] = None,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """Upload and analyze several photos of the same face (e.g. left cheek, right cheek, forehead)
+
+    The image part of every photo runs concurrently, the web research for the
+    combined concerns runs once for the whole batch. Returns one entry per
+    photo, in upload order, with its analysis or its error, and the combined
+    skin profile written for the user.
+    """
+    validate_profile(profile)
+    if len(images) > settings.ANALYSIS_BATCH_MAX_IMAGES:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"At most {settings.ANALYSIS_BATCH_MAX_IMAGES} images can be analyzed at once"
+        )
+    # Validate image format
+    if not all(image.content_type.startswith("image/") for image in images):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="All files must be images"
+        )
+
+    await ensure_rate_limit(current_user)
+
+    # Save the uploaded images, named by their content
+    timer = StageTimer()
+    uploads = []
+    with timer.span("file_save"):
+        for image in images:
+            try:
+                blob = await store_image(db, image)
+            except HTTPException:
+                # Drop the photos of the batch saved so far
+                for _, saved_url in uploads:
+                    await db.run_sync(release_upload, saved_url)
+                raise
+            uploads.append((blob_store.path(blob), str(request.base_url)[:-1] + blob_store.url(blob)))
+
+    # Run the blocking batch in a worker thread with its own session to keep the event loop free
+    outcomes, skin_profile = await run_in_threadpool(
+        analyze_batch_in_worker, current_user.id, uploads, timer=timer, profile=profile
+    )
+
+    items = []
+    for image, outcome in zip(images, outcomes):
+        if "error" in outcome:
+            items.append({"filename": image.filename, "error": f"Analysis failed: {str(outcome['error'])}"})
+        else:
+            items.append({"filename": image.filename, **outcome})
+
+    analyzed = sum(1 for outcome in outcomes if "error" not in outcome)
+    if not analyzed:
+        raise HTTPException(
+            status_code=analysis_error_status(outcomes[0]["error"]),
+            detail=f"Analysis failed: {str(outcomes[0]['error'])}",
+            headers=analysis_error_headers(outcomes[0]["error"])
+        )
+
+    return APIResponse(
+        success=True,
+        message=f"{analyzed} of {len(images)} images analyzed successfully",
+        data={
+            "items": items,
+            "skin_profile": skin_profile
+        }
+    )
+
+
+@router.get("/jobs/{job_id}", response_model=APIResponse)
+async def get_analysis_job(job_id: str, current_user: User = Depends(get_current_user), db: AsyncSession = Depends(get_db)):
+    """Get the status of a background analysis job"""
+    job = await db.scalar(select(AnalysisJob).where(
+        AnalysisJob.id == job_id,
+        AnalysisJob.user_id == current_user.id
+    ))
+
+    if not job:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Analysis job not found"
+        )
+
+    return APIResponse(
+        success=True,
+        message="Analysis job retrieved successfully",
+        data={
+            "job_id": job.id,
+            "status": job.status,
+            "profile": job.profile,
+            "analysis_id": job.analysis_id,
+            "error": job.error,
+            "created_at": job.created_at.isoformat() if job.created_at else None,
+            "updated_at": job.updated_at.isoformat() if job.updated_at else None
+        }
+    )
+
+
+@router.get("/jobs/{job_id}/result", response_model=APIResponse)
+async def get_analysis_job_result(job_id: str, current_user: User = Depends(get_current_user), db: AsyncSession = Depends(get_db)):
+    """Get the analysis produced by a finished background job"""
+    # The payload reads the analysis' hash and timing, lazy loads need the event loop
+    job = await db.scalar(select(AnalysisJob).where(
+        AnalysisJob.id == job_id,
+        AnalysisJob.user_id == current_user.id
+    ).options(
+        selectinload(AnalysisJob.analysis).selectinload(Analysis.image_hash),
+        selectinload(AnalysisJob.analysis).selectinload(Analysis.timing)
+    ))
+
+    if not job:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Analysis job not found"
+        )
+
+    if job.status == FAILED:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=job.error or "Analysis failed"
+        )
+
+    if job.status == COMPLETED and not job.analysis:
+        raise HTTPException(
+            status_code=status.HTTP_410_GONE,
+            detail="The analysis of this job was deleted"
+        )
+
+    if job.status != COMPLETED:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"Analysis job is {job.status}"
+        )
+
+    return APIResponse(
+        success=True,
+        message="Image analyzed successfully",
+        data=analysis_payload(job.analysis)
+    )
+
+
 @router.get("/history", response_model=APIResponse)
 async def get_analysis_history(
     current_user: User = Depends(get_current_user), 
-    db: Session = Depends(get_db),
-    skip: int = 0,
-    limit: int = 10
+    db: AsyncSession = Depends(get_db),
+    cursor: Optional[str] = None,
+    limit: int = Query(10, ge=1, le=100),
+    include_total: bool = False,
+    view: str = Query("summary", pattern="^(summary|full)$")
 ):
-    """Get users' analysis history with pagination"""
-    total = db.query(Analysis).filter(Analysis.user_id == current_user.id).count()
-    analyses = db.query(Analysis)\
-        .filter(Analysis.user_id == current_user.id)\
-        .order_by(Analysis.created_at.desc())\
-        .offset(skip)\
-        .limit(limit)\
-        .all()
+    """Get users' analysis history, newest first, paged with the cursors of the previous page.
+
+    The default summary view leaves out the concerns, recommendations and
+    products, the full view (or get-analysis) has them.
+    """
+    query = select(Analysis).where(Analysis.user_id == current_user.id)
+    if view == "summary":
+        # Touching an unloaded column raises instead of querying row by row
+        query = query.options(load_only(*SUMMARY_COLUMNS, raiseload=True))
+    try:
+        page = await keyset_page(db, query, Analysis, limit, cursor)
+    except InvalidCursor as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    total = None
+    if include_total:
+        total = await db.scalar(select(func.count()).select_from(Analysis).where(Analysis.user_id == current_user.id))
     
     # Convert SQLAlchemy models to dictionaries
     analysis_list = []
-    for analysis in analyses:
-        analysis_list.append({
-            "id": analysis.id,
-            "user_id": analysis.user_id,
-            "image_url": analysis.image_url,
-            "overall_health": analysis.overall_health,
-            "skin_type": analysis.skin_type,
-            "concerns": analysis.concerns,
-            "recommendations": analysis.recommendations,
-            "analysis_metrics": analysis.analysis_metrics,
-            "skincare_products": analysis.skincare_products,
-            "created_at": analysis.created_at.isoformat()
-        })
+    for analysis in page.items:
+        if view == "summary":
+            analysis_list.append(analysis_summary_to_dict(analysis))
+        else:
+            analysis_list.append(analysis_to_dict(analysis))
     
     return APIResponse(
         success=True,
@@ -259,18 +593,19 @@ async def get_analysis_history(
         data={
             "items": analysis_list,
             "total": total,
-            "skip": skip,
-            "limit": limit
+            "limit": limit,
+            "next_cursor": page.next_cursor,
+            "prev_cursor": page.prev_cursor
         }
     )
 
 @router.get("/get-analysis/{analysis_id}", response_model=APIResponse)
-async def get_analysis(analysis_id: int, current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
+async def get_analysis(analysis_id: int, current_user: User = Depends(get_current_user), db: AsyncSession = Depends(get_db)):
     """Get specific analysis results"""
-    analysis = db.query(Analysis).filter(
+    analysis = await db.scalar(select(Analysis).where(
         Analysis.id == analysis_id, 
         Analysis.user_id == current_user.id
-    ).first()
+    ))
 
     if not analysis:
         raise HTTPException(
@@ -278,33 +613,19 @@ async def get_analysis(analysis_id: int, current_user: User = Depends(get_curren
             detail="Analysis not found"
         )
     
-    # Convert SQLAlchemy model to dictionary
-    analysis_data = {
-        "id": analysis.id,
-        "user_id": analysis.user_id,
-        "image_url": analysis.image_url,
-        "overall_health": analysis.overall_health,
-        "skin_type": analysis.skin_type,
-        "concerns": analysis.concerns,
-        "recommendations": analysis.recommendations,
-        "analysis_metrics": analysis.analysis_metrics,
-        "skincare_products": analysis.skincare_products,
-        "created_at": analysis.created_at.isoformat()
-    }
-    
     return APIResponse(
         success=True,
         message="Analysis retrieved successfully",
-        data=analysis_data
+        data=analysis_to_dict(analysis)
     )
 
 @router.delete("/delete-analysis/{analysis_id}", response_model=APIResponse)
-async def delete_analysis(analysis_id: int, current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
+async def delete_analysis(analysis_id: int, current_user: User = Depends(get_current_user), db: AsyncSession = Depends(get_db)):
     """Delete an analysis record"""
-    analysis = db.query(Analysis).filter(
+    analysis = await db.scalar(select(Analysis).where(
         Analysis.id == analysis_id, 
         Analysis.user_id == current_user.id
-    ).first()
+    ))
 
     if not analysis:
         raise HTTPException(
@@ -312,8 +633,15 @@ async def delete_analysis(analysis_id: int, current_user: User = Depends(get_cur
             detail="Analysis not found"
         )
 
-    db.delete(analysis)
-    db.commit()
+    await db.run_sync(blob_store.release, analysis.image_url)
+    # SQLite does not enforce the jobs' ON DELETE SET NULL
+    await db.execute(update(AnalysisJob).where(
+        AnalysisJob.user_id == current_user.id,
+        AnalysisJob.analysis_id == analysis_id
+    ).values(analysis_id=None))
+    await db.delete(analysis)
+    await db.commit()
+    image_hash_index.discard(current_user.id, analysis_id)
 
     return APIResponse(
         success=True,
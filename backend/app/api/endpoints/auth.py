@@ -8,7 +8,8 @@ import re
 from datetime import timedelta
 from app.db.database import get_db 
 from app.models.users import User
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from app.core.security import create_access_token, create_refresh_token
 from app.core.config import settings 
 from jose import jwt
@@ -43,9 +44,9 @@ class Token(BaseModel):
     token_type: str 
 
 @router.post('/register', status_code=status.HTTP_201_CREATED)
-async def register(user: UserCreate, db: Session = Depends(get_db)):
+async def register(user: UserCreate, db: AsyncSession = Depends(get_db)):
     # Check if email already exists
-    db_user = db.query(User).filter(User.email == user.email).first()
+    db_user = await db.scalar(select(User).where(User.email == user.email))
     if db_user:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -53,7 +54,7 @@ async def register(user: UserCreate, db: Session = Depends(get_db)):
         )
     
     # Check if gemini_api_key is valid
-    gemini_api_key_check = db.query(User).filter(User.gemini_api_key == user.gemini_api_key).first()
+    gemini_api_key_check = await db.scalar(select(User).where(User.gemini_api_key == user.gemini_api_key))
     if gemini_api_key_check:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -71,8 +72,8 @@ async def register(user: UserCreate, db: Session = Depends(get_db)):
     )
 
     db.add(db_user)
-    db.commit()
-    db.refresh(db_user)
+    await db.commit()
+    await db.refresh(db_user)
 
     # Generate access token
     access_token_expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
@@ -95,8 +96,8 @@ async def register(user: UserCreate, db: Session = Depends(get_db)):
 
 
 @router.post("/login", response_model=Token)
-async def login(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
-    user = db.query(User).filter(User.email == form_data.username).first()
+async def login(form_data: OAuth2PasswordRequestForm = Depends(), db: AsyncSession = Depends(get_db)):
+    user = await db.scalar(select(User).where(User.email == form_data.username))
     if not user or not pwd_context.verify(form_data.password, user.hashed_password):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -121,7 +122,7 @@ async def login(form_data: OAuth2PasswordRequestForm = Depends(), db: Session =
 
 
 @router.post("/refresh", response_model=Token)
-async def refresh_token(refresh_token: str = Body(...), db: Session = Depends(get_db)):
+async def refresh_token(refresh_token: str = Body(...), db: AsyncSession = Depends(get_db)):
     try:
         payload = jwt.decode(
             refresh_token,
@@ -135,7 +136,7 @@ async def refresh_token(refresh_token: str = Body(...), db: Session = Depends(ge
             raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token")
         
         # Verify user still exists
-        user = db.query(User).filter(User.email == email).first()
+        user = await db.scalar(select(User).where(User.email == email))
         if user is None:
             raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="User not found")
         
@@ -1,5 +1,7 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Optional
 
 from app.db.database import get_db
 from app.models.journals import Journals
@@ -7,12 +9,13 @@ from app.models.users import User
 from app.schemas.journal import JournalCreate
 from app.schemas.responses import APIResponse
 from app.core.security import get_current_user
+from app.services.pagination import InvalidCursor, keyset_page
 
 router = APIRouter()
 
 
 @router.post("/create-journal", response_model=APIResponse)
-async def create_journal(journal_data: JournalCreate, current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
+async def create_journal(journal_data: JournalCreate, current_user: User = Depends(get_current_user), db: AsyncSession = Depends(get_db)):
     """Create a new journal entry."""
     journal = Journals(
         user_id=current_user.id,
@@ -20,8 +23,8 @@ async def create_journal(journal_data: JournalCreate, current_user: User = Depen
         content=journal_data.content
     )
     db.add(journal)
-    db.commit()
-    db.refresh(journal)
+    await db.commit()
+    await db.refresh(journal)
 
     # Convert SQLAlchemy model to dictionary
     journal_dict = {
@@ -41,16 +44,22 @@ async def create_journal(journal_data: JournalCreate, current_user: User = Depen
 
 
 @router.get("/get-journals", response_model=APIResponse)
-async def get_journals(current_user: User = Depends(get_current_user), db: Session = Depends(get_db), skip: int = 0, limit: int = 10):
-    """Get user's journal entries with pagination and optional mood filter"""
-    query = db.query(Journals).filter(Journals.user_id == current_user.id)
-
-    total = query.count()
-    journals = query.order_by(Journals.created_at.desc()).offset(skip).limit(limit).all()
+async def get_journals(current_user: User = Depends(get_current_user), db: AsyncSession = Depends(get_db),
+                       cursor: Optional[str] = None, limit: int = Query(10, ge=1, le=100), include_total: bool = False):
+    """Get user's journal entries, newest first, paged with the cursors of the previous page"""
+    query = select(Journals).where(Journals.user_id == current_user.id)
+
+    try:
+        page = await keyset_page(db, query, Journals, limit, cursor)
+    except InvalidCursor as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    total = None
+    if include_total:
+        total = await db.scalar(select(func.count()).select_from(Journals).where(Journals.user_id == current_user.id))
 
     # Convert SQLAlchemy models to dictionaries
     journals_list = []
-    for journal in journals:
+    for journal in page.items:
         journals_list.append({
             "id": journal.id,
             "user_id": journal.user_id,
@@ -66,19 +75,20 @@ async def get_journals(current_user: User = Depends(get_current_user), db: Sessi
         data={
             "items": journals_list,
             "total": total,
-            "skip": skip,
-            "limit": limit
+            "limit": limit,
+            "next_cursor": page.next_cursor,
+            "prev_cursor": page.prev_cursor
         }
     )
 
 
 @router.get("/get-journal/{journal_id}", response_model=APIResponse)
-async def get_journal(journal_id: int, current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
+async def get_journal(journal_id: int, current_user: User = Depends(get_current_user), db: AsyncSession = Depends(get_db)):
     """Get a specific journal entry"""
-    journal = db.query(Journals).filter(
+    journal = await db.scalar(select(Journals).where(
         Journals.id == journal_id,
         Journals.user_id == current_user.id
-    ).first()
+    ))
 
     if not journal:
         raise HTTPException(
@@ -108,13 +118,13 @@ async def update_journal(
     journal_id: int,
     journal_data: JournalCreate,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Update a journal entry"""
-    journal = db.query(Journals).filter(
+    journal = await db.scalar(select(Journals).where(
         Journals.id == journal_id,
         Journals.user_id == current_user.id
-    ).first()
+    ))
 
     if not journal:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Journal not found")
@@ -123,8 +133,8 @@ async def update_journal(
     journal.title = journal_data.title 
     journal.content = journal_data.content 
 
-    db.commit()
-    db.refresh(journal)
+    await db.commit()
+    await db.refresh(journal)
 
     # Convert SQLAlchemy model to dictionary
     journal_dict = {
@@ -144,12 +154,12 @@ async def update_journal(
 
 
 @router.delete("/delete-journal/{journal_id}", response_model=APIResponse)
-async def delete_journal(journal_id: int, current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
+async def delete_journal(journal_id: int, current_user: User = Depends(get_current_user), db: AsyncSession = Depends(get_db)):
     """ Delete a journal entry"""
-    journal = db.query(Journals).filter(
+    journal = await db.scalar(select(Journals).where(
         Journals.id == journal_id,
         Journals.user_id == current_user.id
-    ).first()
+    ))
 
     if not journal:
         raise HTTPException(
@@ -157,8 +167,8 @@ async def delete_journal(journal_id: int, current_user: User = Depends(get_curre
             detail="Journal not found"
         )
     
-    db.delete(journal)
-    db.commit()
+    await db.delete(journal)
+    await db.commit()
 
     return APIResponse(
         success=True,
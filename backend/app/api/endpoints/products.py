@@ -1,6 +1,8 @@
-from fastapi import APIRouter, Depends, HTTPException, status 
-from sqlalchemy.orm import Session 
-from typing import List 
+from fastapi import APIRouter, Depends, HTTPException, Query, status 
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Optional
 
 from app.db.database import get_db
 from app.models.products import Products
@@ -8,12 +10,14 @@ from app.models.users import User
 from app.schemas.product import ProductCreate, ProductResponse
 from app.schemas.responses import APIResponse
 from app.core.security import get_current_user
+from app.services.pagination import InvalidCursor, keyset_page
+from app.services.product_catalog import product_catalog_index
 
 
 router = APIRouter()
 
 @router.post("/create-product", response_model=APIResponse)
-async def create_product(product_data: ProductCreate, current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
+async def create_product(product_data: ProductCreate, current_user: User = Depends(get_current_user), db: AsyncSession = Depends(get_db)):
     product = Products(
         user_id=current_user.id,
         product_name=product_data.product_name,
@@ -22,8 +26,8 @@ async def create_product(product_data: ProductCreate, current_user: User = Depen
     )
 
     db.add(product)
-    db.commit()
-    db.refresh(product)
+    await db.commit()
+    await db.refresh(product)
 
     # Convert SQLAlchemy model to dictionary
     product_dict = {
@@ -45,13 +49,19 @@ async def create_product(product_data: ProductCreate, current_user: User = Depen
 
 
 @router.get("/get-products", response_model=APIResponse)
-async def get_products(current_user: User = Depends(get_current_user), db: Session = Depends(get_db), skip: int = 0, limit: int = 10):
-    total = db.query(Products).filter(Products.user_id == current_user.id).count()
-    products = db.query(Products).filter(Products.user_id == current_user.id).order_by(Products.created_at.desc()).offset(skip).limit(limit).all()
+async def get_products(current_user: User = Depends(get_current_user), db: AsyncSession = Depends(get_db),
+                       cursor: Optional[str] = None, limit: int = Query(10, ge=1, le=100), include_total: bool = False):
+    try:
+        page = await keyset_page(db, select(Products).where(Products.user_id == current_user.id), Products, limit, cursor)
+    except InvalidCursor as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    total = None
+    if include_total:
+        total = await db.scalar(select(func.count()).select_from(Products).where(Products.user_id == current_user.id))
 
     # Convert SQLAlchemy models to dictionaries
     products_list = []
-    for product in products:
+    for product in page.items:
         products_list.append({
             "id": product.id,
             "user_id": product.user_id,
@@ -68,8 +78,29 @@ async def get_products(current_user: User = Depends(get_current_user), db: Sessi
         data={
             "items": products_list,
             "total": total,
-            "skip": skip,
-            "limit": limit
+            "limit": limit,
+            "next_cursor": page.next_cursor,
+            "prev_cursor": page.prev_cursor
+        }
+    )
+
+
+@router.get("/catalog", response_model=APIResponse)
+async def get_catalog_products(concern: List[str] = Query([]), skin_type: Optional[str] = None,
+                               limit: int = Query(3, ge=1, le=100),
+                               current_user: User = Depends(get_current_user)):
+    """Products recommended to users in the same country, for the given concerns and skin type"""
+    # A country's first search loads it with a sync session, keep it off the event loop
+    products, missing = await run_in_threadpool(
+        product_catalog_index.search, current_user.country, concern, skin_type, limit=limit
+    )
+
+    return APIResponse(
+        success=True,
+        message="Catalog products retrieved successfully",
+        data={
+            "items": products,
+            "missing_concerns": missing
         }
     )
 
@@ -94,11 +125,11 @@ async def get_products(current_user: User = Depends(get_current_user), db: Sessi
 
 
 @router.put("/update-product/{product_id}", response_model=APIResponse)
-async def update_product(product_id: int, product_data: ProductCreate, current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
-    product = db.query(Products).filter(
+async def update_product(product_id: int, product_data: ProductCreate, current_user: User = Depends(get_current_user), db: AsyncSession = Depends(get_db)):
+    product = await db.scalar(select(Products).where(
         Products.id == product_id,
         Products.user_id == current_user.id
-    ).first()
+    ))
 
     if not product:
         return APIResponse(
@@ -111,8 +142,8 @@ async def update_product(product_id: int, product_data: ProductCreate, current_u
     product.product_category = product_data.product_category
     product.ai_recommendation = product_data.ai_recommendation
 
-    db.commit()
-    db.refresh(product)
+    await db.commit()
+    await db.refresh(product)
 
     # Convert SQLAlchemy model to dictionary
     product_dict = {
@@ -133,11 +164,11 @@ async def update_product(product_id: int, product_data: ProductCreate, current_u
 
 
 @router.delete("/delete-product/{product_id}", response_model=APIResponse)
-async def delete_product(product_id: int, current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
-    product = db.query(Products).filter(
+async def delete_product(product_id: int, current_user: User = Depends(get_current_user), db: AsyncSession = Depends(get_db)):
+    product = await db.scalar(select(Products).where(
         Products.id == product_id,
         Products.user_id == current_user.id
-    ).first()
+    ))
 
     if not product:
         return APIResponse(
@@ -146,8 +177,8 @@ async def delete_product(product_id: int, current_user: User = Depends(get_curre
             data=None
         )
 
-    db.delete(product)
-    db.commit()
+    await db.delete(product)
+    await db.commit()
 
     return APIResponse(
         success=True,
@@ -1,15 +1,29 @@
 from fastapi import APIRouter, Depends, HTTPException, status, Request 
-from sqlalchemy.orm import Session
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from app.db.database import get_db
+from app.models.analysis import Analysis
+from app.models.analysis_jobs import AnalysisJob
 from app.models.users import User 
 from app.core.security import get_current_user, pwd_context
 from pydantic import BaseModel, EmailStr, validator
 from app.schemas.responses import APIResponse
+from app.services.rate_limit import rate_key, rate_limiter
+from app.services.analysis_jobs import PENDING, RUNNING
+from app.services.blob_store import blob_store
+from app.services.image_derivatives import derivative_urls, schedule_derivatives
+from app.services.uploads import UploadTooLarge
 from typing import Optional
 import re
 from fastapi import UploadFile, File 
 import os 
-from datetime import datetime 
+
+def profile_image_urls(request: Request, profile_image):
+    """Thumbnail and preview URLs of a profile image, keyed profile_image_thumbnail / profile_image_preview"""
+    urls = derivative_urls(f"{str(request.base_url)[:-1]}{profile_image}" if profile_image else None)
+    return {f"profile_image_{name.removesuffix('_url')}": url for name, url in urls.items()}
+
 
 class UserProfileUpdate(BaseModel):
     name: Optional[str]
@@ -36,7 +50,7 @@ router = APIRouter()
 async def update_profile(
     user_update: UserProfileUpdate, 
     current_user: User = Depends(get_current_user), 
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Update user profile including password"""
     # Validate current password if trying to change password or email
@@ -56,7 +70,7 @@ async def update_profile(
 
     # Update email if provided
     if user_update.email and user_update.email != current_user.email:
-        existing_user = db.query(User).filter(User.email == user_update.email).first()
+        existing_user = await db.scalar(select(User).where(User.email == user_update.email))
         if existing_user:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
@@ -73,8 +87,8 @@ async def update_profile(
         current_user.hashed_password = pwd_context.hash(user_update.new_password)
 
     try:
-        db.commit()
-        db.refresh(current_user)
+        await db.commit()
+        await db.refresh(current_user)
 
         return APIResponse(
             success=True,
@@ -87,7 +101,7 @@ async def update_profile(
             }
         )
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="An error occurred while updating the profile"
@@ -103,26 +117,53 @@ async def get_profile(request: Request, current_user: User = Depends(get_current
             "id": current_user.id,
             "name": current_user.name,
             "email": current_user.email,
-            "profile_image": f"{str(request.base_url)[:-1]}{current_user.profile_image}" if current_user.profile_image else None
+            "profile_image": f"{str(request.base_url)[:-1]}{current_user.profile_image}" if current_user.profile_image else None,
+            **profile_image_urls(request, current_user.profile_image)
         }
     )
 
 
+@router.get("/api-quota", response_model=APIResponse)
+async def get_api_quota(current_user: User = Depends(get_current_user)):
+    """Get the remaining per-minute budget and the recorded usage of the user's Gemini API key"""
+    # The SQLite store blocks on its file lock
+    quota = await run_in_threadpool(rate_limiter.status, rate_key(current_user.gemini_api_key))
+    return APIResponse(
+        success=True,
+        message="API quota retrieved successfully",
+        data={
+            "own_key": bool(current_user.gemini_api_key),
+            **quota
+        }
+    )
+
 
 @router.delete("/delete-account", response_model=APIResponse)
-async def delete_account(current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
+async def delete_account(current_user: User = Depends(get_current_user), db: AsyncSession = Depends(get_db)):
     """Delete user account permanently"""
     try:
-        # Delete profile image if exists
-        if current_user.profile_image:
-            image_path = current_user.profile_image.lstrip('/')
+        # Drop the user's references to stored images, unused blobs are deleted after the commit.
+        # Unfinished jobs still hold their upload, a running one finds its job gone and keeps nothing.
+        image_urls = (await db.scalars(select(Analysis.image_url).where(Analysis.user_id == current_user.id))).all()
+        image_urls += (await db.scalars(select(AnalysisJob.image_url).where(
+            AnalysisJob.user_id == current_user.id,
+            AnalysisJob.status.in_([PENDING, RUNNING])
+        ))).all()
+        for image_url in image_urls:
+            await db.run_sync(blob_store.release, image_url)
+
+        # A profile image from before the blob store is a plain file
+        legacy_image = None
+        if current_user.profile_image and not await db.run_sync(blob_store.release, current_user.profile_image):
             # Remove loading slash
-            if os.path.exists(image_path):
-                os.remove(image_path)
+            legacy_image = current_user.profile_image.lstrip('/')
         
         # Delete the user (cascading delete will handle related records)
-        db.delete(current_user)
-        db.commit()
+        await db.delete(current_user)
+        await db.commit()
+
+        if legacy_image and os.path.exists(legacy_image):
+            os.remove(legacy_image)
 
         return APIResponse(
             success=True,
@@ -130,7 +171,7 @@ async def delete_account(current_user: User = Depends(get_current_user), db: Ses
             data=None
         )
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="An error occurred while deleting the account"
@@ -138,7 +179,7 @@ async def delete_account(current_user: User = Depends(get_current_user), db: Ses
     
 
 @router.post("/upload-profile-image", response_model=APIResponse)
-async def upload_profile_image(request: Request, file: UploadFile = File(...), current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
+async def upload_profile_image(request: Request, file: UploadFile = File(...), current_user: User = Depends(get_current_user), db: AsyncSession = Depends(get_db)):
     """Upload profile image for user"""
     # Validate image format
     if not file.content_type.startswith("image/"):
@@ -147,36 +188,33 @@ async def upload_profile_image(request: Request, file: UploadFile = File(...), c
             detail="File must be an image"
         )
     
-    # Create upload directory if not exists
-    upload_dir = "uploads/profile-images"
-    os.makedirs(upload_dir, exist_ok=True)
-
-    # Generate unique filename
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    file_extension = os.path.splitext(file.filename)[1]
-    filename = f"{current_user.id}_{timestamp}{file_extension}"
-    filepath = os.path.join(upload_dir, filename)
-
-    # Save the file
+    # Save the file, named by its content
     try:
-        with open(filepath, "wb") as buffer:
-            buffer.write(await file.read())
+        blob = await blob_store.put(db, file)
+    except UploadTooLarge as e:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=str(e)
+        )
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Failed to save file: {str(e)}"
         )
     
-    # Update user profile image
-    file_path_url = f"/{filepath.replace(os.sep, '/')}"  # Convert path to URL format
+    schedule_derivatives(blob)
+
+    # Update user profile image, dropping the reference to the previous one
+    file_path_url = blob_store.url(blob)
+    await db.run_sync(blob_store.release, current_user.profile_image)
     current_user.profile_image = file_path_url
-    db.commit()
+    await db.commit()
 
    
     base_url_image = f"{str(request.base_url)[:-1]}{file_path_url}"
     return APIResponse(
         success=True,
         message="Profile image uploaded successfully",
-        data={"profile_image_url": base_url_image}
+        data={"profile_image_url": base_url_image, **profile_image_urls(request, file_path_url)}
     )
 
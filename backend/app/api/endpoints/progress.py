@@ -1,5 +1,6 @@
 from fastapi import APIRouter, Depends
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from app.db.database import get_db
 from app.models.analysis import Analysis
 from app.models.users import User
@@ -10,13 +11,13 @@ from app.schemas.responses import APIResponse
 router = APIRouter()
 
 @router.get("/metrics/{analysis_id}", response_model=APIResponse)
-async def get_progress_metrics(analysis_id: int, current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
+async def get_progress_metrics(analysis_id: int, current_user: User = Depends(get_current_user), db: AsyncSession = Depends(get_db)):
     """Get progress metrics comparing with previous analysis"""
     # Get current analysis
-    current_analysis = db.query(Analysis).filter(
+    current_analysis = await db.scalar(select(Analysis).where(
         Analysis.id == analysis_id,
         Analysis.user_id == current_user.id
-    ).first()
+    ))
 
     if not current_analysis:
         return APIResponse(
@@ -26,10 +27,10 @@ async def get_progress_metrics(analysis_id: int, current_user: User = Depends(ge
         )
     
     # Get previous analysis for comparison
-    previous_analysis = db.query(Analysis).filter(
+    previous_analysis = await db.scalar(select(Analysis).where(
         Analysis.user_id == current_user.id,
         Analysis.created_at < current_analysis.created_at
-    ).order_by(Analysis.created_at.desc()).first()
+    ).order_by(Analysis.created_at.desc()).limit(1))
 
     if not previous_analysis:
         # Return current analysis data without comparison
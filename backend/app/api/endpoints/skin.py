@@ -1,5 +1,6 @@
 from fastapi import APIRouter, Depends
-from sqlalchemy.orm import Session 
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.db.database import get_db
 from app.models.skin import Skin
@@ -16,12 +17,12 @@ router = APIRouter()
 @router.get("/get-profile-skin", response_model=APIResponse)
 async def get_profile_skin(
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Get user profile skin"""
-    query = db.query(Skin).filter(
+    query = await db.scalar(select(Skin).where(
         Skin.user_id == current_user.id
-    ).first()
+    ))
 
     if not query:
         return APIResponse(
@@ -45,9 +46,9 @@ async def get_profile_skin(
 
 
 @router.post("/create-profile-skin", response_model=APIResponse)
-async def create_profile_skin(skin_create: SkinCreate, current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
+async def create_profile_skin(skin_create: SkinCreate, current_user: User = Depends(get_current_user), db: AsyncSession = Depends(get_db)):
     """Create new skin profile"""
-    existing_skin = db.query(Skin).filter(Skin.user_id == current_user.id).first()
+    existing_skin = await db.scalar(select(Skin).where(Skin.user_id == current_user.id))
     if existing_skin:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -66,8 +67,8 @@ async def create_profile_skin(skin_create: SkinCreate, current_user: User = Depe
             concerns=concerns_str
         )
         db.add(skin)
-        db.commit()
-        db.refresh(skin)
+        await db.commit()
+        await db.refresh(skin)
 
         return APIResponse(
             success=True,
@@ -82,7 +83,7 @@ async def create_profile_skin(skin_create: SkinCreate, current_user: User = Depe
             )
         )
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Creation failed: {str(e)}"
@@ -92,9 +93,9 @@ async def create_profile_skin(skin_create: SkinCreate, current_user: User = Depe
 async def update_skin_profile(
     skin_update: SkinUpdate,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
-    skin = db.query(Skin).filter(Skin.user_id == current_user.id).first()
+    skin = await db.scalar(select(Skin).where(Skin.user_id == current_user.id))
     if not skin:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -104,8 +105,8 @@ async def update_skin_profile(
     try:
         skin.skin_type = skin_update.skin_type
         skin.concerns = skin_update.concerns if isinstance(skin_update.concerns, str) else ", ".join(skin_update.concerns)
-        db.commit()
-        db.refresh(skin)
+        await db.commit()
+        await db.refresh(skin)
 
         return APIResponse(
             success=True,
@@ -120,7 +121,7 @@ async def update_skin_profile(
             )
         )
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Update failed: {str(e)}"
@@ -1,5 +1,6 @@
 from pydantic_settings import BaseSettings
 import os
+from typing import Optional
 
 class Settings(BaseSettings):
     REFRESH_TOKEN_EXPIRE_DAYS: int = 30
@@ -11,6 +12,137 @@ class Settings(BaseSettings):
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 60 * 24 * 8
     ALLOWED_ORIGINS: list = ["http://localhost:5173"]
 
+    # Apply pending schema migrations on startup. Deploys running several workers migrate
+    # once with `python -m app.db.migrate upgrade` before starting them and turn this off
+    DATABASE_MIGRATE_ON_STARTUP: bool = True
+
+    # SQLite connections: WAL journal, fsync at checkpoints only, waiting up to the busy timeout
+    # for the write lock, memory-mapped reads and a page cache per connection
+    DATABASE_SQLITE_JOURNAL_MODE: str = "wal"
+    DATABASE_SQLITE_SYNCHRONOUS: str = "normal"
+    DATABASE_SQLITE_BUSY_TIMEOUT_MS: int = 15_000
+    DATABASE_SQLITE_MMAP_SIZE: int = 256 * 1024 * 1024
+    DATABASE_SQLITE_CACHE_SIZE_KIB: int = 16 * 1024
+
+    # Connection pool of each engine (sync and async) per process, for server databases (Postgres)
+    DATABASE_POOL_SIZE: int = 10
+    DATABASE_MAX_OVERFLOW: int = 20
+    DATABASE_POOL_TIMEOUT_SECONDS: float = 30.0
+    DATABASE_POOL_PRE_PING: bool = True
+    DATABASE_POOL_RECYCLE_SECONDS: int = 30 * 60
+
+    # Chat model behind the agent team: "gemini", or "fake" for offline load tests
+    MODEL_PROVIDER: str = "gemini"
+    MODEL_ID: str = "gemini-2.0-flash-exp"
+    FAKE_MODEL_LATENCY_DISTRIBUTION: str = "lognormal"
+    FAKE_MODEL_LATENCY_MEAN_MS: float = 800.0
+    FAKE_MODEL_LATENCY_STDDEV_MS: float = 300.0
+    FAKE_MODEL_ERROR_RATE: float = 0.0
+    FAKE_MODEL_INPUT_TOKENS: int = 1500
+    FAKE_MODEL_OUTPUT_TOKENS: int = 600
+    FAKE_MODEL_SEED: Optional[int] = None
+
+    # Token-bucket rate limit per Gemini API key, one minute of budget per bucket.
+    # Store "memory" limits each worker on its own, "sqlite" shares the buckets between workers
+    RATE_LIMIT_ENABLED: bool = True
+    RATE_LIMIT_REQUESTS_PER_MINUTE: int = 15
+    RATE_LIMIT_TOKENS_PER_MINUTE: int = 1_000_000
+    RATE_LIMIT_MAX_WAIT_SECONDS: float = 20.0
+    RATE_LIMIT_OUTPUT_TOKENS_ESTIMATE: int = 1024
+    RATE_LIMIT_STORE: str = "memory"
+    RATE_LIMIT_STORE_PATH: str = "./rate_limits.db"
+
+    # Analysis profiles (fast / standard / deep): deadline budget and concurrent runs of each
+    ANALYSIS_DEFAULT_PROFILE: str = "standard"
+    ANALYSIS_PROFILES: dict = {
+        "fast": {"timeout_seconds": 30, "max_concurrency": 32},
+        "standard": {"timeout_seconds": 90, "max_concurrency": 16},
+        "deep": {"timeout_seconds": 240, "max_concurrency": 4},
+    }
+
+    # Deadline budget of an analysis (the profile timeout): share of it tool calls may
+    # use, longest single tool call, and threads for tool calls that can be abandoned
+    ANALYSIS_TOOL_BUDGET_FRACTION: float = 0.6
+    ANALYSIS_TOOL_TIMEOUT_SECONDS: int = 20
+    ANALYSIS_TOOL_WORKERS: int = 32
+
+    # Pool of pre-built agent teams reused across analyses
+    AGENT_POOL_MAX_SIZE: int = 32
+    AGENT_POOL_IDLE_TTL_SECONDS: int = 60 * 15
+
+    # Expose Prometheus metrics (analysis stage, member and tool timings, DB pools) on /metrics
+    METRICS_ENABLED: bool = True
+
+    # Background analysis jobs. A process refreshes the heartbeat of its running jobs, a running
+    # job without one for ANALYSIS_JOB_STALE_SECONDS is requeued by the next process to start
+    ANALYSIS_JOB_WORKERS: int = 4
+    ANALYSIS_JOB_HEARTBEAT_SECONDS: int = 15
+    ANALYSIS_JOB_STALE_SECONDS: int = 120
+
+    # Multi-photo batch analysis: photos per request and image runs in parallel
+    ANALYSIS_BATCH_MAX_IMAGES: int = 8
+    ANALYSIS_BATCH_CONCURRENCY: int = 4
+
+    # Perceptual-hash cache for re-uploaded images
+    IMAGE_HASH_CACHE_ENABLED: bool = True
+    IMAGE_HASH_MAX_DISTANCE: int = 4
+    IMAGE_HASH_MAX_AGE_HOURS: int = 24 * 7
+
+    # Uploaded files: largest accepted file, and the chunks it is streamed to disk in
+    UPLOAD_MAX_BYTES: int = 10 * 1024 * 1024
+    UPLOAD_CHUNK_BYTES: int = 256 * 1024
+
+    # Serving of /uploads: "direct" sends files from the worker, "x-accel" (nginx, internal location
+    # at UPLOAD_X_ACCEL_PREFIX) and "x-sendfile" (Apache, lighttpd) leave the bytes to the front proxy.
+    # Content-addressed blobs and thumbnails are cached as immutable for UPLOAD_CACHE_MAX_AGE
+    UPLOAD_SERVE_MODE: str = "direct"
+    UPLOAD_X_ACCEL_PREFIX: str = "/internal-uploads"
+    UPLOAD_CACHE_MAX_AGE: int = 60 * 60 * 24 * 365
+
+    # Normalized copy of each upload sent to the model
+    IMAGE_NORMALIZE_ENABLED: bool = True
+    IMAGE_MAX_EDGE: int = 1024
+    IMAGE_JPEG_QUALITY: int = 85
+
+    # Thumbnails and previews of uploaded images, rendered on a process pool after upload
+    # and on their first request. WebP falls back to JPEG when Pillow lacks it
+    IMAGE_DERIVATIVES_ENABLED: bool = True
+    IMAGE_DERIVATIVE_WORKERS: int = 2
+    IMAGE_DERIVATIVE_FORMAT: str = "webp"
+    IMAGE_DERIVATIVE_QUALITY: int = 80
+    IMAGE_THUMBNAIL_SIZE: int = 256
+    IMAGE_PREVIEW_MAX_EDGE: int = 768
+
+    # Feed the local quick scan metrics into the team run as grounding
+    QUICK_SCAN_GROUNDING: bool = True
+
+    # Country-scoped catalog of products harvested from analyses, searched before the web
+    PRODUCT_CATALOG_ENABLED: bool = True
+    PRODUCT_CATALOG_RESULTS_PER_CONCERN: int = 3
+
+    # Cache of the researched recommendations and products per skin profile and country.
+    # Single-image analyses of the split profiles run the image part on the fast image agent and
+    # only research on a miss; deep keeps its whole team on the image unless it is listed
+    RECOMMENDATION_CACHE_ENABLED: bool = True
+    RECOMMENDATION_CACHE_SPLIT_PROFILES: list = ["standard"]
+    RECOMMENDATION_CACHE_PATH: str = "./recommendation_cache.db"
+    RECOMMENDATION_CACHE_MAX_ENTRIES: int = 5000
+    RECOMMENDATION_CACHE_TTL_SECONDS: int = 60 * 60 * 24 * 7
+
+    # Persistent cache for web search and arXiv tool calls
+    TOOL_CACHE_ENABLED: bool = True
+    TOOL_CACHE_PATH: str = "./tool_cache.db"
+    TOOL_CACHE_MAX_ENTRIES: int = 10000
+    TOOL_CACHE_DEFAULT_TTL_SECONDS: int = 60 * 60 * 24
+    TOOL_CACHE_TTLS: dict = {
+        "google_search": 60 * 60 * 24,
+        "duckduckgo_search": 60 * 60 * 24,
+        "duckduckgo_news": 60 * 60,
+        "baidu_search": 60 * 60 * 24,
+        "search_arxiv_and_return_articles": 60 * 60 * 24 * 7,
+        "read_arxiv_papers": 60 * 60 * 24 * 30,
+    }
+
     class Config:
         case_sensitive = True 
 
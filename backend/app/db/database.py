@@ -1,27 +1,58 @@
-from sqlalchemy import create_engine 
+import importlib.util
+
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from app.core.config import settings
+from app.db.engine import make_async_engine, make_engine
 
 
 SQLALCHEMY_DATABASE_URL = settings.DATABASE_URL
 
-engine = create_engine(SQLALCHEMY_DATABASE_URL)
+# Async drivers of the supported databases, by backend name
+ASYNC_DRIVERS = {"sqlite": "aiosqlite", "postgresql": "asyncpg"}
+
+
+def async_database_url(url: str):
+    """The database URL with the backend's async driver, e.g. sqlite+aiosqlite:// for sqlite://"""
+    url = make_url(url)
+    driver = ASYNC_DRIVERS.get(url.get_backend_name())
+    if driver is None:
+        raise ValueError(f"No async driver for database backend: {url.get_backend_name()}")
+    # Only aiosqlite is in the requirements, the others are installed with their database
+    if importlib.util.find_spec(driver) is None:
+        raise RuntimeError(
+            f"The {url.get_backend_name()} database needs the {driver} driver, install it with: pip install {driver}"
+        )
+    return url.set(drivername=f"{url.get_backend_name()}+{driver}")
+
+
+# Sync engine for the analysis workers and startup tasks, which run in threads
+engine = make_engine(SQLALCHEMY_DATABASE_URL)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Async engine for the request handlers, DB round trips do not block the event loop
+async_engine = make_async_engine(async_database_url(SQLALCHEMY_DATABASE_URL))
+# Loaded attributes stay readable after a commit, lazy loads would need the event loop
+AsyncSessionLocal = async_sessionmaker(async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False)
+
 Base = declarative_base()
 
 from app.models.users import User
 from app.models.skin import Skin
 from app.models.products import Products
 from app.models.analysis import Analysis
+from app.models.analysis_jobs import AnalysisJob
+from app.models.analysis_timings import AnalysisTiming
+from app.models.catalog_products import CatalogProduct
+from app.models.image_hashes import AnalysisImageHash
 from app.models.journals import Journals
+from app.models.stored_blobs import StoredBlob
 
-Base.metadata.create_all(bind=engine)
+# Tables are created and changed by the migrations, see app.db.migrate
 
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db 
-    finally: db.close()
+async def get_db():
+    async with AsyncSessionLocal() as db:
+        yield db
 
@@ -0,0 +1,115 @@
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from app.core.config import settings
+
+try:
+    from prometheus_client.core import REGISTRY, GaugeMetricFamily
+except ImportError:  # prometheus_client is optional, the pools work without their metrics
+    REGISTRY = GaugeMetricFamily = None
+
+
+class PoolMetrics:
+    """Prometheus collector of the connection pools, read when the metrics are scraped"""
+
+    def __init__(self):
+        # Engine name -> engine, disposing an engine replaces its pool
+        self.engines = {}
+
+    def collect(self):
+        gauges = {
+            "size": GaugeMetricFamily(
+                "skin_doctor_db_pool_size", "Connections the pool keeps open", labels=["engine"]
+            ),
+            "checkedout": GaugeMetricFamily(
+                "skin_doctor_db_pool_checked_out", "Connections in use", labels=["engine"]
+            ),
+            "checkedin": GaugeMetricFamily(
+                "skin_doctor_db_pool_checked_in", "Idle connections in the pool", labels=["engine"]
+            ),
+            "overflow": GaugeMetricFamily(
+                "skin_doctor_db_pool_overflow", "Connections opened beyond the pool size", labels=["engine"]
+            ),
+        }
+        for name, engine in list(self.engines.items()):
+            pool = engine.pool
+            # NullPool and StaticPool have no counters
+            for method, gauge in gauges.items():
+                if hasattr(pool, method):
+                    # QueuePool counts its overflow from -size up
+                    value = getattr(pool, method)()
+                    gauge.add_metric([name], max(value, 0) if method == "overflow" else value)
+        yield from gauges.values()
+
+
+pool_metrics = PoolMetrics()
+if REGISTRY is not None:
+    REGISTRY.register(pool_metrics)
+
+
+def is_sqlite_file(url) -> bool:
+    url = make_url(url)
+    return url.get_backend_name() == "sqlite" and url.database not in (None, "", ":memory:")
+
+
+def sqlite_pragmas():
+    """Pragmas of every SQLite connection, in the order they are set"""
+    return {
+        # Readers do not block the writer and the writer does not block readers
+        "journal_mode": settings.DATABASE_SQLITE_JOURNAL_MODE,
+        # Durable at checkpoints in WAL mode, no fsync per commit
+        "synchronous": settings.DATABASE_SQLITE_SYNCHRONOUS,
+        # Wait for the write lock instead of failing with "database is locked"
+        "busy_timeout": settings.DATABASE_SQLITE_BUSY_TIMEOUT_MS,
+        "mmap_size": settings.DATABASE_SQLITE_MMAP_SIZE,
+        # Negative sizes are KiB instead of pages
+        "cache_size": -settings.DATABASE_SQLITE_CACHE_SIZE_KIB,
+    }
+
+
+def set_sqlite_pragmas(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    try:
+        for name, value in sqlite_pragmas().items():
+            cursor.execute(f"PRAGMA {name}={value}")
+    finally:
+        cursor.close()
+
+
+def engine_options(url) -> dict:
+    """``create_engine`` arguments for a database URL, from the settings"""
+    if make_url(url).get_backend_name() == "sqlite":
+        return {}
+    return {
+        "pool_size": settings.DATABASE_POOL_SIZE,
+        "max_overflow": settings.DATABASE_MAX_OVERFLOW,
+        "pool_timeout": settings.DATABASE_POOL_TIMEOUT_SECONDS,
+        # Connections dropped by the server or a proxy are replaced before use
+        "pool_pre_ping": settings.DATABASE_POOL_PRE_PING,
+        "pool_recycle": settings.DATABASE_POOL_RECYCLE_SECONDS,
+    }
+
+
+def configure_engine(name: str, engine, url):
+    """Set the SQLite pragmas on new connections and report the pool in the metrics"""
+    if is_sqlite_file(url):
+        event.listen(engine, "connect", set_sqlite_pragmas)
+    pool_metrics.engines[name] = engine
+    return engine
+
+
+def make_engine(url, name: str = "sync"):
+    """Sync engine of the app, tuned by the DATABASE_* settings"""
+    connect_args = {}
+    if make_url(url).get_backend_name() == "sqlite":
+        # Pooled connections move between the threads of the workers and the threadpool
+        connect_args["check_same_thread"] = False
+    return configure_engine(name, create_engine(url, connect_args=connect_args, **engine_options(url)), url)
+
+
+def make_async_engine(url, name: str = "async"):
+    """Async engine of the app, tuned by the DATABASE_* settings"""
+    engine = create_async_engine(url, **engine_options(url))
+    configure_engine(name, engine.sync_engine, url)
+    return engine
@@ -0,0 +1,86 @@
+"""Schema migrations of the app database.
+
+Run at deploy time, before the app starts::
+
+    python -m app.db.migrate upgrade        # to the latest revision
+    python -m app.db.migrate current        # revision of the database
+    python -m app.db.migrate check-plans    # endpoint queries must use an index
+
+The revisions live in ``migrations/versions`` and are plain Alembic scripts,
+``alembic`` works on them as well.
+"""
+import argparse
+import sys
+from pathlib import Path
+
+from alembic import command
+from alembic.config import Config
+from alembic.migration import MigrationContext
+from alembic.script import ScriptDirectory
+from sqlalchemy import inspect
+
+from app.db.database import engine
+
+MIGRATIONS_DIR = Path(__file__).resolve().parents[2] / "migrations"
+
+# The original five tables, which every database created by Base.metadata.create_all has
+BASELINE_REVISION = "0001"
+
+
+def alembic_config(connection=None) -> Config:
+    config = Config()
+    config.set_main_option("script_location", str(MIGRATIONS_DIR))
+    config.attributes["connection"] = connection
+    return config
+
+
+def head_revision():
+    """Latest revision of the migrations"""
+    return ScriptDirectory.from_config(alembic_config()).get_current_head()
+
+
+def current_revision(bind=None):
+    """Revision of the database, None before the first migration"""
+    with (bind or engine).connect() as connection:
+        return MigrationContext.configure(connection).get_current_revision()
+
+
+def upgrade(revision: str = "head", bind=None):
+    """Migrate the database of ``bind``, the app's engine by default, to ``revision``.
+
+    A database whose tables were created without migrations is stamped with
+    the original schema first, the later revisions add what it is missing.
+    """
+    with (bind or engine).begin() as connection:
+        tables = inspect(connection).get_table_names()
+        config = alembic_config(connection)
+        if "alembic_version" not in tables and "users" in tables:
+            command.stamp(config, BASELINE_REVISION)
+        command.upgrade(config, revision)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m app.db.migrate", description="Schema migrations of the app database")
+    commands = parser.add_subparsers(dest="command", required=True)
+    upgrade_parser = commands.add_parser("upgrade", help="migrate to a revision, the latest by default")
+    upgrade_parser.add_argument("revision", nargs="?", default="head")
+    commands.add_parser("current", help="print the revision of the database")
+    commands.add_parser("check-plans", help="fail when an endpoint query does not use an index")
+    args = parser.parse_args(argv)
+
+    if args.command == "upgrade":
+        upgrade(args.revision)
+    elif args.command == "current":
+        print(current_revision() or "none")
+    else:
+        from app.db.query_plans import check_query_plans
+
+        failures = check_query_plans(engine, verbose=True)
+        if failures:
+            print(f"{len(failures)} queries without an index: {', '.join(failures)}")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,111 @@
+"""Query plans of the endpoint queries.
+
+Every query a request runs on a user-sized table should be answered through
+an index. ``check_query_plans`` explains them against the migrated database
+and reports the ones that scan a whole table or sort their rows.
+"""
+import re
+from datetime import datetime
+
+from sqlalchemy import func, select, text
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.orm import load_only
+from sqlalchemy.sql.expression import ClauseElement, Executable
+
+from app.models.analysis import SUMMARY_COLUMNS, Analysis
+from app.models.analysis_jobs import AnalysisJob
+from app.models.image_hashes import AnalysisImageHash
+from app.models.journals import Journals
+from app.models.products import Products
+from app.models.skin import Skin
+from app.models.stored_blobs import StoredBlob
+from app.models.users import User
+from app.services.pagination import encode_cursor, keyset_statement
+
+# SQLite: a table scan, unless it walks an index; a sort outside an index
+SQLITE_SCAN_PATTERN = re.compile(r"^SCAN (?!.*\bUSING (?:COVERING )?INDEX\b)")
+SQLITE_SORT_PATTERN = re.compile(r"USE TEMP B-TREE FOR (?:RIGHT PART OF )?ORDER BY")
+
+
+class Explain(Executable, ClauseElement):
+    """``EXPLAIN`` of a statement, in the syntax of the dialect"""
+
+    inherit_cache = False
+
+    def __init__(self, statement):
+        self.statement = statement
+
+
+@compiles(Explain)
+def compile_explain(element, compiler, **kw):
+    prefix = "EXPLAIN QUERY PLAN " if compiler.dialect.name == "sqlite" else "EXPLAIN "
+    return prefix + compiler.process(element.statement, **kw)
+
+
+def endpoint_queries(dialect_name: str):
+    """Name -> statement of the queries the endpoints run per request"""
+    user_id, now = 1, datetime(2024, 1, 1)
+    queries = {
+        "current user": select(User).where(User.email == "user@example.com"),
+        "register api key": select(User).where(User.gemini_api_key == "key"),
+        "skin profile": select(Skin).where(Skin.user_id == user_id),
+        "analysis": select(Analysis).where(Analysis.id == 1, Analysis.user_id == user_id),
+        "previous analysis": select(Analysis).where(
+            Analysis.user_id == user_id, Analysis.created_at < now
+        ).order_by(Analysis.created_at.desc()).limit(1),
+        "pending jobs": select(AnalysisJob.image_url).where(AnalysisJob.user_id == user_id, AnalysisJob.status == "pending"),
+        "image hashes": select(AnalysisImageHash).where(AnalysisImageHash.user_id == user_id),
+        "stored blob": select(StoredBlob).where(StoredBlob.sha256 == "0" * 64),
+    }
+    # Cursor values as the pagination issues them for the dialect
+    key = "2024-01-01 00:00:00.000000" if dialect_name == "sqlite" else now
+    for name, model in [("history", Analysis), ("journals", Journals), ("products", Products)]:
+        listing = select(model).where(model.user_id == user_id)
+        queries[f"{name} page"] = keyset_statement(dialect_name, listing, model, 10)[0]
+        for direction in ["next", "prev"]:
+            cursor = encode_cursor(direction, key, 1)
+            queries[f"{name} {direction} page"] = keyset_statement(dialect_name, listing, model, 10, cursor)[0]
+        queries[f"{name} total"] = select(func.count()).select_from(model).where(model.user_id == user_id)
+    # The history's default summary view, which selects fewer columns
+    summary = select(Analysis).where(Analysis.user_id == user_id).options(load_only(*SUMMARY_COLUMNS, raiseload=True))
+    queries["history summary page"] = keyset_statement(dialect_name, summary, Analysis, 10)[0]
+    queries["history summary next page"] = keyset_statement(
+        dialect_name, summary, Analysis, 10, encode_cursor("next", key, 1)
+    )[0]
+    return queries
+
+
+def plan_problems(dialect_name: str, plan):
+    """Lines of a plan that scan a table or sort without an index"""
+    if dialect_name == "sqlite":
+        return [line for line in plan if SQLITE_SCAN_PATTERN.match(line) or SQLITE_SORT_PATTERN.search(line)]
+    return [line for line in plan if "Seq Scan" in line]
+
+
+def explain(connection, statement):
+    """Plan of a statement as lines of text"""
+    rows = connection.execute(Explain(statement)).all()
+    if connection.dialect.name == "sqlite":
+        # (id, parent, notused, detail)
+        return [row[-1] for row in rows]
+    return [row[0] for row in rows]
+
+
+def check_query_plans(engine, verbose: bool = False):
+    """Names of the endpoint queries whose plan does not use an index"""
+    failures = []
+    with engine.connect() as connection:
+        if connection.dialect.name == "postgresql":
+            # Small tables are cheaper to scan, ask whether an index could serve the query at all
+            connection.execute(text("SET enable_seqscan = off"))
+        for name, statement in endpoint_queries(connection.dialect.name).items():
+            plan = explain(connection, statement)
+            problems = plan_problems(connection.dialect.name, plan)
+            if problems:
+                failures.append(name)
+            if verbose:
+                print(f"{'FAIL' if problems else 'ok':<4} {name}")
+                for line in plan:
+                    print(f"       {line}")
+        connection.rollback()
+    return failures
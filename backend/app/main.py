@@ -6,10 +6,16 @@ sys.path.append(str(Path(__file__).parent.parent))
 
 from fastapi import FastAPI 
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.staticfiles import StaticFiles
 from app.api.routes import router as api_router 
 from app.core.config import settings
 from app.core.exceptions import app_exception_handler, AppException
+from app.db import migrate
+from app.db.database import SessionLocal, async_engine
+from app.services import analysis_jobs, image_derivatives
+from app.services.product_catalog import backfill_catalog
+from app.services.static_uploads import UploadStaticFiles
+from app.services.uploads import UploadSizeLimitMiddleware, max_request_bytes
+from app.services.timing import metrics_app
 import uvicorn
 
 app = FastAPI(
@@ -26,11 +32,54 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-app.mount("/uploads", StaticFiles(directory="uploads"), name="uploads")
+# Oversized bodies are refused before they are parsed
+app.add_middleware(UploadSizeLimitMiddleware, max_bytes=max_request_bytes())
+
+# Uploaded images with immutable caching, or handed to the front proxy (UPLOAD_SERVE_MODE)
+app.mount("/uploads", UploadStaticFiles(directory="uploads"), name="uploads")
+
+# Prometheus metrics, served when prometheus_client is installed
+prometheus_app = metrics_app() if settings.METRICS_ENABLED else None
+if prometheus_app is not None:
+    app.mount("/metrics", prometheus_app)
 
 # Exception handlers
 app.add_exception_handler(AppException, app_exception_handler)
 
+# Schema migrations, before any startup task touches the database
+@app.on_event("startup")
+def migrate_database():
+    if settings.DATABASE_MIGRATE_ON_STARTUP:
+        migrate.upgrade()
+
+
+# Background analysis jobs
+@app.on_event("startup")
+def resume_analysis_jobs():
+    analysis_jobs.resume_jobs()
+
+
+# Product catalog, built from the stored analyses on the first start
+@app.on_event("startup")
+def build_product_catalog():
+    db = SessionLocal()
+    try:
+        backfill_catalog(db)
+    finally:
+        db.close()
+
+
+@app.on_event("shutdown")
+def stop_analysis_jobs():
+    analysis_jobs.shutdown()
+    image_derivatives.shutdown()
+
+
+# Pooled async connections keep their driver threads alive until disposed
+@app.on_event("shutdown")
+async def close_database():
+    await async_engine.dispose()
+
 # API routes
 app.include_router(api_router, prefix=settings.API_V1_STR)
 
@@ -1,6 +1,11 @@
 # Import semua model di sini
 from app.models.users import User
 from app.models.analysis import Analysis
+from app.models.analysis_jobs import AnalysisJob
+from app.models.analysis_timings import AnalysisTiming
+from app.models.catalog_products import CatalogProduct
+from app.models.image_hashes import AnalysisImageHash
 from app.models.journals import Journals
 from app.models.skin import Skin
+from app.models.stored_blobs import StoredBlob
 from app.models.products import Products
\ No newline at end of file
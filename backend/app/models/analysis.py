@@ -1,6 +1,6 @@
-from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, JSON
+from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, Index, JSON
 from sqlalchemy.sql import func
-from sqlalchemy.orm import relationship
+from sqlalchemy.orm import relationship, validates
 from app.db.database import Base
 
 class Analysis(Base):
@@ -12,6 +12,8 @@ class Analysis(Base):
     overall_health = Column(String, nullable=True)
     skin_type = Column(String, nullable=True)
     concerns = Column(JSON, nullable=True)
+    # Names of the concerns, kept in step with concerns for listings that skip the full JSON
+    concern_names = Column(JSON, nullable=True)
     recommendations = Column(JSON, nullable=True)
     analysis_metrics = Column(JSON, nullable=True)
     skincare_products = Column(JSON, nullable=True)
@@ -19,4 +21,21 @@ class Analysis(Base):
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
 
     # Relasi
-    user = relationship("User", back_populates="analyses")
\ No newline at end of file
+    user = relationship("User", back_populates="analyses")
+    image_hash = relationship("AnalysisImageHash", back_populates="analysis", uselist=False, cascade="all, delete-orphan")
+    timing = relationship("AnalysisTiming", back_populates="analysis", uselist=False, cascade="all, delete-orphan")
+
+    @validates("concerns")
+    def set_concern_names(self, key, concerns):
+        self.concern_names = [concern["name"] for concern in concerns or []]
+        return concerns
+
+
+# Columns of an analysis in listings, the concerns, recommendations and products JSON stay unloaded
+SUMMARY_COLUMNS = (
+    Analysis.id, Analysis.user_id, Analysis.image_url, Analysis.overall_health, Analysis.skin_type,
+    Analysis.concern_names, Analysis.analysis_metrics, Analysis.created_at
+)
+
+# History pages and the previous analysis of a user, newest first
+Index("ix_analyses_user_id_created_at", Analysis.user_id, Analysis.created_at.desc(), Analysis.id.desc())
@@ -0,0 +1,31 @@
+from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, Index, Text
+from sqlalchemy.sql import func
+from sqlalchemy.orm import relationship
+from app.db.database import Base
+
+
+class AnalysisJob(Base):
+    __tablename__ = "analysis_jobs"
+
+    id = Column(String, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    analysis_id = Column(Integer, ForeignKey("analyses.id", ondelete="SET NULL"), nullable=True)
+    status = Column(String, nullable=False, default="pending")
+    image_path = Column(String, nullable=False)
+    image_url = Column(String, nullable=False)
+    # Analysis profile (fast / standard / deep), None for the default profile
+    profile = Column(String, nullable=True)
+    error = Column(Text, nullable=True)
+    # Worker process running the job and when it last reported in, a stale heartbeat requeues it
+    owner = Column(String, nullable=True)
+    heartbeat_at = Column(DateTime(timezone=True), nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+
+    # Relasi
+    user = relationship("User", back_populates="analysis_jobs")
+    analysis = relationship("Analysis")
+
+
+# Pending jobs of a user, released with the account
+Index("ix_analysis_jobs_user_id_status", AnalysisJob.user_id, AnalysisJob.status)
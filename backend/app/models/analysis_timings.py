@@ -0,0 +1,24 @@
+from sqlalchemy import Column, Integer, Float, String, ForeignKey, DateTime, JSON
+from sqlalchemy.sql import func
+from sqlalchemy.orm import relationship
+from app.db.database import Base
+
+
+class AnalysisTiming(Base):
+    __tablename__ = "analysis_timings"
+
+    id = Column(Integer, primary_key=True, index=True)
+    analysis_id = Column(Integer, ForeignKey("analyses.id", ondelete="CASCADE"), nullable=False, unique=True)
+    # Analysis profile of the team run, None when served from the image hash cache
+    profile = Column(String, nullable=True)
+    # Why the answer was cut short by the deadline budget, None for a complete analysis
+    degraded_reason = Column(String, nullable=True)
+    # Seconds per request stage, per team member and per tool
+    stages = Column(JSON, nullable=False)
+    members = Column(JSON, nullable=True)
+    tools = Column(JSON, nullable=True)
+    total_seconds = Column(Float, nullable=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    # Relasi
+    analysis = relationship("Analysis", back_populates="timing")
@@ -0,0 +1,27 @@
+from sqlalchemy import Column, Integer, String, Text, DateTime, JSON, UniqueConstraint
+from sqlalchemy.sql import func
+from app.db.database import Base
+
+
+class CatalogProduct(Base):
+    __tablename__ = "catalog_products"
+    __table_args__ = (UniqueConstraint("country", "product_key", name="uq_catalog_products_country_key"),)
+
+    id = Column(Integer, primary_key=True, index=True)
+    # Normalized country and dedupe key (normalized link, or title when there is no link)
+    country = Column(String, nullable=False, index=True)
+    product_key = Column(String, nullable=False)
+    title = Column(String, nullable=False)
+    description = Column(Text, nullable=True)
+    link = Column(String, nullable=True)
+    price = Column(String, nullable=True)
+    how_to_use = Column(Text, nullable=True)
+    benefits = Column(Text, nullable=True)
+    side_effects = Column(Text, nullable=True)
+    dosage = Column(Text, nullable=True)
+    # Normalized concern names and skin types of the analyses that recommended it
+    concerns = Column(JSON, nullable=False, default=list)
+    skin_types = Column(JSON, nullable=False, default=list)
+    times_recommended = Column(Integer, nullable=False, default=1)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
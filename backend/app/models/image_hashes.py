@@ -0,0 +1,23 @@
+from sqlalchemy import Column, Integer, String, ForeignKey, DateTime
+from sqlalchemy.sql import func
+from sqlalchemy.orm import relationship
+from app.db.database import Base
+
+
+class AnalysisImageHash(Base):
+    __tablename__ = "analysis_image_hashes"
+
+    id = Column(Integer, primary_key=True, index=True)
+    analysis_id = Column(Integer, ForeignKey("analyses.id", ondelete="CASCADE"), nullable=False, unique=True)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True)
+    # 64-bit perceptual hash stored as 16 hex characters
+    image_hash = Column(String(16), nullable=False)
+    # Team profile (fast, standard or deep) of the analysis, only as deep or deeper requests reuse it
+    profile = Column(String, nullable=True)
+    # Set when the analysis was cloned from a cached one instead of a team run
+    source_analysis_id = Column(Integer, nullable=True)
+    distance = Column(Integer, nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    # Relasi
+    analysis = relationship("Analysis", back_populates="image_hash")
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Index
 from sqlalchemy.orm import relationship
 from app.db.database import Base 
 from datetime import datetime 
@@ -14,4 +14,8 @@ class Journals(Base):
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
-    user = relationship("User", back_populates="journals")
\ No newline at end of file
+    user = relationship("User", back_populates="journals")
+
+
+# Journal pages of a user, newest first
+Index("ix_journals_user_id_created_at", Journals.user_id, Journals.created_at.desc(), Journals.id.desc())
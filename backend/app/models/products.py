@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, ForeignKey 
+from sqlalchemy import Column, Integer, String, Boolean, DateTime, ForeignKey, Index
 from sqlalchemy.orm import relationship
 from app.db.database import Base 
 from datetime import datetime 
@@ -16,4 +16,8 @@ class Products(Base):
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
-    user = relationship("User", back_populates="products")
\ No newline at end of file
+    user = relationship("User", back_populates="products")
+
+
+# Product pages of a user, newest first
+Index("ix_products_user_id_created_at", Products.user_id, Products.created_at.desc(), Products.id.desc())
@@ -8,7 +8,7 @@ class Skin(Base):
     __tablename__ = "skin"
     
     id = Column(Integer, primary_key=True, index=True)
-    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"))
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), index=True)
     skin_type = Column(String, nullable=False, default="")
     concerns = Column(Text, nullable=False, default="")
     created_at = Column(String, nullable=False, default=datetime.now().strftime("%Y-%m-%d %H:%M:%S"))
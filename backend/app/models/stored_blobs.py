@@ -0,0 +1,18 @@
+from sqlalchemy import Column, Integer, String, DateTime
+from sqlalchemy.sql import func
+from app.db.database import Base
+
+
+class StoredBlob(Base):
+    __tablename__ = "stored_blobs"
+
+    id = Column(Integer, primary_key=True, index=True)
+    # SHA-256 of the content as 64 hex characters, the blob's name in the store
+    sha256 = Column(String(64), nullable=False, unique=True, index=True)
+    # Sharded path below the upload root, e.g. blobs/ab/cd/abcd...jpg
+    path = Column(String, nullable=False)
+    size = Column(Integer, nullable=False)
+    # Analyses, jobs and profile images pointing at the blob
+    ref_count = Column(Integer, nullable=False, default=0)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
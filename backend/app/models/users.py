@@ -12,7 +12,7 @@ class User(Base):
     country = Column(String, nullable=False)
     hashed_password = Column(String, nullable=False)
     profile_image = Column(String, nullable=True)
-    gemini_api_key = Column(String, nullable=True)
+    gemini_api_key = Column(String, nullable=True, index=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
 
@@ -20,4 +20,5 @@ class User(Base):
     products = relationship("Products", back_populates="user", cascade="all, delete-orphan")
     analyses = relationship("Analysis", back_populates="user", cascade="all, delete-orphan")
     journals = relationship("Journals", back_populates="user", cascade="all, delete-orphan")
-    skin = relationship("Skin", back_populates="user", cascade="all, delete-orphan")
\ No newline at end of file
+    skin = relationship("Skin", back_populates="user", cascade="all, delete-orphan")
+    analysis_jobs = relationship("AnalysisJob", back_populates="user", cascade="all, delete-orphan")
\ No newline at end of file
@@ -1,17 +1,29 @@
 from agno.agent import Agent
-from agno.models.google import Gemini
 from agno.media import Image
 from agno.tools.duckduckgo import DuckDuckGoTools
 from agno.tools.baidusearch import BaiduSearchTools
 from agno.tools.googlesearch import GoogleSearchTools
 from agno.tools.arxiv import ArxivTools
 from agno.team.team import Team
+from app.core.config import settings
+from app.services.agent_pool import TeamPool
+from app.services.analysis_stream import run_team_streaming
+from app.services.deadline import DEADLINE_EXCEEDED, TOOLS_CUT, Deadline, deadline_scope, deadline_toolkit
+from app.services.model_provider import create_model
+from app.services.product_catalog import ProductCatalogTools
+from app.services.profile_limits import AnalysisTimeout, ProfileLimiter
+from app.services.recommendation_cache import get_recommendations, recommendation_key, set_recommendations
+from app.services.skin_metrics import compute_skin_metrics
+from app.services.timing import StageTimer
+from app.services.tool_cache import cached_toolkit
+import json
 import os
+import time
 from dotenv import load_dotenv
 
 
 # Import restructured for the agent
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, TypeAdapter, ValidationError
 from typing import List, Optional
 
 load_dotenv()
@@ -119,170 +131,49 @@ class SkinAnalysisResponse(BaseModel):
                 ]
             }
         }
-        
 
 
+# Sections the shared research run contributes to every photo's analysis
+BATCH_CONTEXT_SECTIONS = {
+    "recommendations": TypeAdapter(List[Recommendation]),
+    "skincare_products": TypeAdapter(List[SkincareProducts]),
+}
 
+# fast: image agent alone; standard: routed with cached web search; deep: adds arXiv research
+TEAM_PROFILES = ("fast", "standard", "deep")
 
+TEAM_INSTRUCTIONS = """
+As a dermatologist expert team, your responsibilities are:
+1. Analyze skin images with clinical precision
+2. Analyze skin journals user, when they are provided with the request, for accurate reccomendations treatment
+3. Collaborate with search and research agents to:
+- Verify diagnosis with latest medical information
+- Cross-reference treatment options
+- Identify emerging therapies
+4. Provide comprehensive analysis including:
+- Condition identification
+- Severity assessment
+- Root cause analysis
+5. Create personalized treatment plans that consider:
+- Skin type
+- Medical history
+- Lifestyle factors
+- Budget considerations
+6. Present information in clear, patient-friendly language
+7. Always include:
+- Primary recommended treatment
+- Alternative options
+- Prevention strategies
+- Expected timeline for results
+8. For complex cases:
+- Consult with research agent for latest studies
+- Verify with search agent for clinical guidelines
+- Present multiple approaches with pros/cons
+9. Maintain professional medical standards in all recommendations
+"""
 
-def analyze_skin(image_url, user_api_key=None, country=None, journals=None):
-    # Set up Agno Agent with Gemini model
-    search_agent = Agent(
-        name="Searching",
-        role="You are a search agent that can search the web for relevant information about the skin problem and how to solve it.",
-        model=Gemini(id="gemini-2.0-flash-exp", api_key=user_api_key),
-        tools=[GoogleSearchTools(), DuckDuckGoTools(), BaiduSearchTools()],
-        add_name_to_instructions=True,
-        instructions=f"""
-        When searching for skin-related information:
-        1. Focus on finding reliable medical sources (Mayo Clinic, WebMD, dermatology journals)
-        2. Prioritize recent research and studies (last 3 years)
-        3. Look for both treatment options and prevention methods
-        4. Include information about different skin types and conditions
-        5. Verify information from multiple reputable sources
-        6. Pay special attention to:
-        - Acne and acne scars treatments
-        - Hyperpigmentation solutions
-        - Anti-aging recommendations
-        - Skin hydration techniques
-        - Sun protection methods
-        7. Always include source links for reference
-        8. Present findings in clear, organized bullet points
-        9. Give recommendations scincare product that available in {country}, You can use e-commerce products that operate in the {country}.
-        """,
-    )
-
-    research_agent = Agent(
-        name="Researcher",
-        role="You are a researcher that can research the web for relevant information about the skin problem and how to solve it.",
-        model=Gemini(id="gemini-2.0-flash-exp", api_key=user_api_key),
-        tools=[ArxivTools()],
-        add_name_to_instructions=True,
-        instructions="""
-        When researching skin-related information:
-        1. Focus exclusively on peer-reviewed dermatology journals and medical research papers
-        2. Prioritize studies published within the last 2 years for the most current findings
-        3. Search for:
-        - Clinical trial results for new treatments
-        - Emerging skin conditions and their treatments
-        - Breakthrough therapies and their efficacy rates
-        - Comparative studies between treatment methods
-        4. Always verify findings across multiple reputable sources
-        5. Include complete citation information (authors, journal, DOI)
-        6. Present findings in this structured format:
-        [Condition/Problem]
-        - Latest research findings
-        - Treatment options (with success rates)
-        - Potential side effects
-        - Recommended protocols
-        7. Highlight any FDA-approved treatments separately
-        8. Include links to full papers when available
-        9. For controversial topics, present both sides with evidence
-        """,
-    )
 
-    image_agent = Agent(
-        model=Gemini(id="gemini-2.0-flash-exp", api_key=user_api_key),
-        agent_id="dermatologist",
-        name="Skin Dermatologist",
-        markdown=True,
-        instructions=[
-            "You are a dermatologist AI that analyzes skin conditions from images.",
-            "Provide detailed descriptions and potential diagnoses based on the images you receive.",
-        ],
-    )
-
-    
-    if journals is not None or journals != []:
-        agent = Team(
-            name="Skin Dermatologist Team",
-            mode="route",
-            model=Gemini(
-                id="gemini-2.0-flash-exp", api_key=user_api_key),  # Using the strongest multi-modal model
-            members=[image_agent, search_agent, research_agent],
-            instructions=f"""
-            As a dermatologist expert team, your responsibilities are:
-            1. Analyze skin images with clinical precision
-            2. Analyze skin journals user for accurate reccomendations treatment, {journals}
-            3. Collaborate with search and research agents to:
-            - Verify diagnosis with latest medical information
-            - Cross-reference treatment options
-            - Identify emerging therapies
-            4. Provide comprehensive analysis including:
-            - Condition identification
-            - Severity assessment
-            - Root cause analysis
-            5. Create personalized treatment plans that consider:
-            - Skin type
-            - Medical history
-            - Lifestyle factors
-            - Budget considerations
-            6. Present information in clear, patient-friendly language
-            7. Always include:
-            - Primary recommended treatment
-            - Alternative options
-            - Prevention strategies
-            - Expected timeline for results
-            8. For complex cases:
-            - Consult with research agent for latest studies
-            - Verify with search agent for clinical guidelines
-            - Present multiple approaches with pros/cons
-            9. Maintain professional medical standards in all recommendations
-            """,
-            show_tool_calls=True,
-            markdown=True,
-            debug_mode=True,
-            show_members_responses=True,
-            enable_team_history=True,
-            use_json_mode=True,
-            response_model=SkinAnalysisResponse,
-        )
-    else:
-        agent = Team(
-            name="Skin Dermatologist Team",
-            mode="route",
-            model=Gemini(
-                id="gemini-2.0-flash-exp", api_key=user_api_key),  # Using the strongest multi-modal model
-            members=[image_agent, search_agent, research_agent],
-            instructions=f"""
-            As a dermatologist expert team, your responsibilities are:
-            1. Analyze skin images with clinical precision
-            2. Collaborate with search and research agents to:
-            - Verify diagnosis with latest medical information
-            - Cross-reference treatment options
-            - Identify emerging therapies
-            3. Provide comprehensive analysis including:
-            - Condition identification
-            - Severity assessment
-            - Root cause analysis
-            4. Create personalized treatment plans that consider:
-            - Skin type
-            - Medical history
-            - Lifestyle factors
-            - Budget considerations
-            5. Present information in clear, patient-friendly language
-            6. Always include:
-            - Primary recommended treatment
-            - Alternative options
-            - Prevention strategies
-            - Expected timeline for results
-            7. For complex cases:
-            - Consult with research agent for latest studies
-            - Verify with search agent for clinical guidelines
-            - Present multiple approaches with pros/cons
-            8. Maintain professional medical standards in all recommendations
-            """,
-            show_tool_calls=True,
-            markdown=True,
-            debug_mode=True,
-            show_members_responses=True,
-            enable_team_history=True,
-            use_json_mode=True,
-            response_model=SkinAnalysisResponse,
-        )
-
-    # Analyze the skin image
-    analysis_prompt =f"""
+ANALYSIS_PROMPT = """
     Analyze this facial skin image in detail and provide a structured assessment in the following format:
 
     1. Overall Skin Health Assessment:
@@ -369,7 +260,425 @@ def analyze_skin(image_url, user_api_key=None, country=None, journals=None):
     Return the analysis in a format that exactly matches these database fields.
     """
 
-    response = agent.run(analysis_prompt, images=[Image(filepath=image_url)])
-    response_json = response.content.model_dump_json(indent=2)
 
-    return response_json
\ No newline at end of file
+BATCH_CONTEXT_PROMPT = """
+    The same person sent {count} photo(s) of their face, each photo was already analyzed on its own.
+    Combined findings of all photos:
+    - Skin type: {skin_type}
+    - Concerns: {concerns}
+
+    Research treatments for all of these concerns and skincare products that are available in {country},
+    with prices in the currency of {country}. Do not analyze any image.
+
+    Answer with the same JSON structure as a skin analysis: copy overall_health, skin_type and concerns from
+    the combined findings, and fill recommendations and skincare_products so that they cover every concern.
+    """
+
+
+def build_team(user_api_key=None, country=None, profile=None):
+    """Build the dermatologist agents for a Gemini API key, country and profile.
+
+    ``fast`` is the image agent alone, answering with the structured result
+    itself. ``standard`` routes between the image agent and the cached web
+    search agent. ``deep`` is the full team with arXiv research, debug output
+    and member echo.
+
+    The team only holds state that is shared by every analysis for the same
+    key (models, tools, instructions). Per-request state such as journals is
+    passed to ``analyze_skin`` and injected into the run message.
+    """
+    profile = profile or settings.ANALYSIS_DEFAULT_PROFILE
+    if profile not in TEAM_PROFILES:
+        raise ValueError(f"Unknown team profile: {profile}")
+
+    if profile == "fast":
+        return build_image_agent(user_api_key, structured=True)
+
+    members = [build_image_agent(user_api_key), build_search_agent(user_api_key, country)]
+    if profile == "deep":
+        members.append(build_research_agent(user_api_key, country))
+
+    verbose = profile == "deep"
+    return Team(
+        name="Skin Dermatologist Team",
+        mode="route",
+        model=create_model(user_api_key),  # Using the strongest multi-modal model
+        members=members,
+        instructions=TEAM_INSTRUCTIONS,
+        show_tool_calls=verbose,
+        markdown=True,
+        debug_mode=verbose,
+        show_members_responses=verbose,
+        enable_team_history=verbose,
+        use_json_mode=True,
+        response_model=SkinAnalysisResponse,
+    )
+
+
+def build_image_agent(user_api_key=None, structured=False):
+    """The dermatologist agent, ``structured`` makes it return ``SkinAnalysisResponse`` on its own"""
+    instructions = [
+        "You are a dermatologist AI that analyzes skin conditions from images.",
+        "Provide detailed descriptions and potential diagnoses based on the images you receive.",
+    ]
+    if not structured:
+        return Agent(
+            model=create_model(user_api_key),
+            agent_id="dermatologist",
+            name="Skin Dermatologist",
+            markdown=True,
+            instructions=instructions,
+        )
+
+    # Without a team leader the agent carries the team's instructions itself
+    return Agent(
+        model=create_model(user_api_key),
+        agent_id="dermatologist",
+        name="Skin Dermatologist",
+        instructions=instructions + [TEAM_INSTRUCTIONS],
+        use_json_mode=True,
+        response_model=SkinAnalysisResponse,
+    )
+
+
+def build_search_agent(user_api_key=None, country=None):
+    """The web search agent, its search tools go through the tool cache.
+
+    Products are looked up in the country's product catalog first, the web is
+    only searched for the concerns the catalog has nothing for.
+    """
+    catalog_tools = [ProductCatalogTools(country)] if settings.PRODUCT_CATALOG_ENABLED else []
+    product_instruction = (
+        "Call search_product_catalog with the skin concerns and skin type first, only search the web for "
+        "products for the concerns it returns in missing_concerns."
+        if settings.PRODUCT_CATALOG_ENABLED else ""
+    )
+    return Agent(
+        name="Searching",
+        role="You are a search agent that can search the web for relevant information about the skin problem and how to solve it.",
+        model=create_model(user_api_key),
+        tools=catalog_tools + [
+            deadline_toolkit(cached_toolkit(GoogleSearchTools(), country)),
+            deadline_toolkit(cached_toolkit(DuckDuckGoTools(), country)),
+            deadline_toolkit(cached_toolkit(BaiduSearchTools(), country)),
+        ],
+        add_name_to_instructions=True,
+        instructions=f"""
+        When searching for skin-related information:
+        1. Focus on finding reliable medical sources (Mayo Clinic, WebMD, dermatology journals)
+        2. Prioritize recent research and studies (last 3 years)
+        3. Look for both treatment options and prevention methods
+        4. Include information about different skin types and conditions
+        5. Verify information from multiple reputable sources
+        6. Pay special attention to:
+        - Acne and acne scars treatments
+        - Hyperpigmentation solutions
+        - Anti-aging recommendations
+        - Skin hydration techniques
+        - Sun protection methods
+        7. Always include source links for reference
+        8. Present findings in clear, organized bullet points
+        9. Give recommendations scincare product that available in {country}, You can use e-commerce products that operate in the {country}.
+        {product_instruction}
+        """,
+    )
+
+
+def build_research_agent(user_api_key=None, country=None):
+    """The arXiv research agent, only part of the deep profile"""
+    return Agent(
+        name="Researcher",
+        role="You are a researcher that can research the web for relevant information about the skin problem and how to solve it.",
+        model=create_model(user_api_key),
+        tools=[deadline_toolkit(cached_toolkit(ArxivTools(), country))],
+        add_name_to_instructions=True,
+        instructions="""
+        When researching skin-related information:
+        1. Focus exclusively on peer-reviewed dermatology journals and medical research papers
+        2. Prioritize studies published within the last 2 years for the most current findings
+        3. Search for:
+        - Clinical trial results for new treatments
+        - Emerging skin conditions and their treatments
+        - Breakthrough therapies and their efficacy rates
+        - Comparative studies between treatment methods
+        4. Always verify findings across multiple reputable sources
+        5. Include complete citation information (authors, journal, DOI)
+        6. Present findings in this structured format:
+        [Condition/Problem]
+        - Latest research findings
+        - Treatment options (with success rates)
+        - Potential side effects
+        - Recommended protocols
+        7. Highlight any FDA-approved treatments separately
+        8. Include links to full papers when available
+        9. For controversial topics, present both sides with evidence
+        """,
+    )
+
+
+def build_analysis_prompt(country=None, journals=None, metrics=None):
+    """Format the per-request analysis message, including the user's journals."""
+    analysis_prompt = ANALYSIS_PROMPT.format(country=country)
+    if metrics:
+        analysis_prompt += f"""
+    Locally measured image metrics (deterministic image statistics, 0-100), use them as grounding for analysis_metrics:
+    {metrics}
+    """
+    if journals:
+        analysis_prompt += f"""
+    User skin journals (most recent first), use them for accurate recommendations treatment:
+    {journals}
+    """
+    return analysis_prompt
+
+
+def build_batch_context_prompt(country=None, findings=None, count=1):
+    """Format the message of the shared research run, from the combined findings of the photos.
+
+    The answer is shared between photos and cached across users, so it never
+    includes personal data such as journals.
+    """
+    findings = findings or {}
+    return BATCH_CONTEXT_PROMPT.format(
+        count=count,
+        country=country,
+        skin_type=findings.get("skin_type") or "Unknown",
+        concerns=findings.get("concerns") or [],
+    )
+
+
+team_pool = TeamPool(
+    build_team,
+    max_size=settings.AGENT_POOL_MAX_SIZE,
+    idle_ttl=settings.AGENT_POOL_IDLE_TTL_SECONDS,
+)
+
+profile_limiter = ProfileLimiter(settings.ANALYSIS_PROFILES)
+
+
+def analyze_skin(image_url, user_api_key=None, country=None, journals=None, profile=None, metrics=None,
+                 on_event=None, timer=None):
+    """Run the profile's team on an image and return the analysis as JSON.
+
+    The team is streamed; when ``on_event(event, data)`` is given, progress
+    (members, tool calls, finished sections) is reported through it. Stage,
+    member and tool timings are recorded on ``timer``.
+
+    The profile's timeout is the deadline budget of the run. Tool calls only
+    get a share of it, and when the whole budget runs out the run is
+    abandoned and the answer is assembled from the sections finished so far
+    and the local image metrics. Either way ``timer.degraded`` tells why.
+    Raises ``AnalysisBusy`` when no run slot of the profile frees up in time.
+
+    With the recommendation cache enabled, analyses of the profiles in
+    ``RECOMMENDATION_CACHE_SPLIT_PROFILES`` (standard by default) are split
+    in two: see ``analyze_skin_split``. The other profiles run their whole
+    team on the image.
+    """
+    timer = timer or StageTimer()
+    profile = profile or settings.ANALYSIS_DEFAULT_PROFILE
+    if profile not in TEAM_PROFILES:
+        raise ValueError(f"Unknown team profile: {profile}")
+    if (settings.RECOMMENDATION_CACHE_ENABLED and profile != "fast"
+            and profile in settings.RECOMMENDATION_CACHE_SPLIT_PROFILES):
+        return analyze_skin_split(image_url, user_api_key, country, journals, profile, metrics, on_event, timer)
+    timer.profile = profile
+
+    with timer.span("prompt_build"):
+        analysis_prompt = build_analysis_prompt(country, journals, metrics)
+        images = [Image(filepath=image_url)]
+
+    response_json, sections = run_with_deadline(
+        analysis_prompt, images, user_api_key, country, profile, on_event, timer
+    )
+    if response_json is not None:
+        return response_json
+    with timer.span("degraded_fallback"):
+        return build_degraded_response(sections, metrics or compute_skin_metrics(image_url))
+
+
+def analyze_skin_split(image_url, user_api_key=None, country=None, journals=None, profile=None, metrics=None,
+                       on_event=None, timer=None):
+    """Analyze an image in two parts, reusing the research for skin profiles seen before.
+
+    The image part runs on the fast profile's image agent, with the journals,
+    and finds the concerns and metrics. The recommendations and products for
+    the resulting skin profile then come from the recommendation cache, or
+    from a research run of the profile's team that fills it. A degraded image
+    part is returned as it is.
+    """
+    timer = timer or StageTimer()
+
+    def image_events(event, data):
+        # The recommendation and product sections are reported once merged
+        if on_event is None or (event == "section" and data["name"] in BATCH_CONTEXT_SECTIONS):
+            return
+        on_event(event, data)
+
+    analysis_result = json.loads(
+        analyze_skin(image_url, user_api_key, country, journals, "fast", metrics, image_events, timer)
+    )
+    timer.profile = profile
+    if timer.degraded is None:
+        findings = {
+            "skin_type": analysis_result["skin_type"],
+            "concerns": [concern["name"] for concern in analysis_result["concerns"]],
+        }
+        context = shared_recommendations(
+            findings, analysis_result["concerns"], 1, user_api_key, country, profile, timer, on_event
+        )
+        analysis_result = merge_shared_recommendations(analysis_result, context)
+
+    if on_event is not None:
+        for name in BATCH_CONTEXT_SECTIONS:
+            on_event("section", {"name": name, "value": analysis_result[name]})
+    return SkinAnalysisResponse.model_validate(analysis_result).model_dump_json(indent=2)
+
+
+def shared_recommendations(findings, concerns, count, user_api_key=None, country=None, profile=None, timer=None,
+                           on_event=None):
+    """Recommendations and products for a skin profile, from the recommendation cache or a research run.
+
+    ``findings`` is the combined ``{"skin_type", "concerns"}`` of the photos,
+    ``concerns`` their concern dictionaries, whose names and highest severity
+    are part of the cache key. Only complete research is cached.
+    """
+    timer = timer or StageTimer()
+    profile = profile or settings.ANALYSIS_DEFAULT_PROFILE
+    key = recommendation_key(findings["skin_type"], concerns, profile)
+    with timer.span("recommendation_cache"):
+        context = get_recommendations(key, country)
+    if context is not None:
+        if on_event is not None:
+            on_event("recommendation_cache_hit", {"skin_type": key["skin_type"], "concerns": key["concerns"]})
+        return context
+
+    degraded = timer.degraded
+    context = research_batch_context(findings, count, user_api_key, country, profile, timer)
+    if timer.degraded == degraded and all(context.get(name) for name in BATCH_CONTEXT_SECTIONS):
+        set_recommendations(key, country, context)
+    return context
+
+
+def research_batch_context(findings, count, user_api_key=None, country=None, profile=None, timer=None):
+    """Research recommendations and products once for the combined findings of one or more photos.
+
+    Runs the profile's team without images, so the leader routes to the
+    search and research members. Returns the ``recommendations`` and
+    ``skincare_products`` that could be validated, possibly none of them when
+    the deadline budget ran out first.
+    """
+    timer = timer or StageTimer()
+    profile = profile or settings.ANALYSIS_DEFAULT_PROFILE
+    with timer.span("prompt_build"):
+        analysis_prompt = build_batch_context_prompt(country, findings, count)
+
+    response_json, sections = run_with_deadline(analysis_prompt, None, user_api_key, country, profile, None, timer)
+    if response_json is not None:
+        sections = SkinAnalysisResponse.model_validate_json(response_json).model_dump()
+
+    context = {}
+    for name, adapter in BATCH_CONTEXT_SECTIONS.items():
+        try:
+            context[name] = adapter.dump_python(adapter.validate_python(sections[name]))
+        except (KeyError, ValidationError):
+            continue
+    return context
+
+
+def merge_shared_recommendations(analysis_result: dict, context: dict) -> dict:
+    """Give one photo's analysis the recommendations and products researched for its skin profile.
+
+    The photo keeps its own recommendations, the shared ones with other
+    titles are added after them. Researched products replace the ones the
+    image agent suggested on its own.
+    """
+    merged = dict(analysis_result)
+    if context.get("recommendations"):
+        titles = {recommendation["title"].strip().lower() for recommendation in merged["recommendations"]}
+        merged["recommendations"] = merged["recommendations"] + [
+            recommendation for recommendation in context["recommendations"]
+            if recommendation["title"].strip().lower() not in titles
+        ]
+    if context.get("skincare_products"):
+        merged["skincare_products"] = context["skincare_products"]
+    return merged
+
+
+def run_with_deadline(analysis_prompt, images, user_api_key, country, profile, on_event, timer):
+    """Run the profile's team within its deadline budget.
+
+    Returns ``(response_json, sections)``. When the budget runs out the run is
+    abandoned, ``response_json`` is None and ``sections`` holds the sections
+    streamed so far.
+    """
+    deadline = Deadline(settings.ANALYSIS_PROFILES[profile]["timeout_seconds"])
+    sections = {}
+
+    def collect(event, data):
+        # Nothing from an abandoned run reaches the caller
+        if deadline.abandoned:
+            return
+        if event == "section":
+            sections[data["name"]] = data["value"]
+        if on_event is not None:
+            on_event(event, data)
+
+    try:
+        response_json = profile_limiter.run(
+            profile, run_team, analysis_prompt, images, user_api_key, country, profile, collect, timer,
+            deadline, time.perf_counter()
+        )
+        return response_json, dict(sections)
+    except AnalysisTimeout:
+        deadline.abandon()
+
+    timer.set_degraded(DEADLINE_EXCEEDED)
+    if on_event is not None:
+        on_event("degraded", {"reason": DEADLINE_EXCEEDED, "sections": sorted(sections)})
+    return None, dict(sections)
+
+
+def run_team(analysis_prompt, images, user_api_key, country, profile, on_event, timer, deadline, queued_at):
+    timer.add_stage("profile_wait", time.perf_counter() - queued_at)
+
+    # Analyze the skin image with a pooled team, leasing includes building one when none is idle
+    lease_started = time.perf_counter()
+    with team_pool.lease(user_api_key, country, profile) as agent, deadline_scope(deadline):
+        timer.add_stage("team_lease", time.perf_counter() - lease_started)
+        with timer.span("team_run"):
+            response_json = run_team_streaming(agent, analysis_prompt, images, on_event, SkinAnalysisResponse)
+        timer.record_run(agent.run_response, agent)
+
+    if deadline.cut_tools and not deadline.abandoned:
+        timer.set_degraded(TOOLS_CUT)
+        on_event("degraded", {"reason": TOOLS_CUT, "tools": deadline.cut_tools})
+    return response_json
+
+
+def build_degraded_response(sections: dict, metrics: dict) -> str:
+    """Assemble a valid ``SkinAnalysisResponse`` from the sections finished before the deadline.
+
+    Missing sections are left empty, the metrics fall back to the local quick
+    scan and the overall health is derived from the overall score.
+    """
+    result = {
+        "overall_health": None,
+        "skin_type": "Unknown",
+        "concerns": [],
+        "analysis_metrics": metrics,
+        "recommendations": [],
+        "skincare_products": [],
+    }
+    # Keep each finished section that is valid on its own
+    for name, value in sections.items():
+        try:
+            SkinAnalysisResponse.model_validate({**result, "overall_health": "Unknown", name: value})
+        except ValidationError:
+            continue
+        result[name] = value
+
+    if result["overall_health"] is None:
+        score = result["analysis_metrics"]["overall_score"]
+        result["overall_health"] = "Good" if score >= 75 else "Fair" if score >= 50 else "Poor"
+    return SkinAnalysisResponse.model_validate(result).model_dump_json(indent=2)
@@ -0,0 +1,127 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+
+
+class TeamPool:
+    """Keyed pool of reusable agent teams.
+
+    Teams are keyed by (API key hash, country, profile). A team is leased to a
+    single run at a time and returned afterwards, so the same instance is never
+    shared by two concurrent analyses. Idle teams are evicted in LRU order once
+    ``max_size`` is exceeded and dropped when they stay idle longer than
+    ``idle_ttl`` seconds.
+    """
+
+    def __init__(self, factory, max_size=32, idle_ttl=900):
+        self.factory = factory
+        self.max_size = max_size
+        self.idle_ttl = idle_ttl
+        # key -> list of (released_at, team), least recently used keys first
+        self._idle = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(api_key, country, profile):
+        api_key_hash = hashlib.sha256((api_key or "").encode()).hexdigest()
+        return (api_key_hash, country, profile)
+
+    @contextmanager
+    def lease(self, api_key, country=None, profile=None):
+        """Check out a team for one run, building it if none is idle."""
+        key = self.make_key(api_key, country, profile)
+        team = self._acquire(key)
+        if team is None:
+            team = self.factory(api_key, country, profile)
+        else:
+            reset_team(team)
+
+        # A run that raises may leave the team half way through a run, so it is
+        # only returned to the pool when the body completes
+        yield team
+        self._release(key, team)
+
+    def size(self):
+        with self._lock:
+            return sum(len(teams) for teams in self._idle.values())
+
+    def clear(self):
+        with self._lock:
+            self._idle.clear()
+
+    def _acquire(self, key):
+        with self._lock:
+            self._expire(time.monotonic())
+            teams = self._idle.get(key)
+            if not teams:
+                return None
+            _, team = teams.pop()
+            if not teams:
+                del self._idle[key]
+            return team
+
+    def _release(self, key, team):
+        now = time.monotonic()
+        with self._lock:
+            self._idle.setdefault(key, []).append((now, team))
+            self._idle.move_to_end(key)
+            self._expire(now)
+            self._evict()
+
+    def _expire(self, now):
+        for key in list(self._idle):
+            teams = [entry for entry in self._idle[key] if now - entry[0] < self.idle_ttl]
+            if teams:
+                self._idle[key] = teams
+            else:
+                del self._idle[key]
+
+    def _evict(self):
+        size = sum(len(teams) for teams in self._idle.values())
+        while size > self.max_size:
+            key, teams = next(iter(self._idle.items()))
+            teams.pop(0)
+            if not teams:
+                del self._idle[key]
+            size -= 1
+
+
+def reset_team(team):
+    """Clear per-run state so nothing leaks from the previous lease.
+
+    Works on a team, recursing into its members, or on a single agent.
+    """
+    if not hasattr(team, "members"):
+        reset_agent(team)
+        return
+
+    team.memory = None
+    team.session_id = None
+    team.run_id = None
+    team.run_input = None
+    team.run_messages = None
+    team.run_response = None
+    team.team_session = None
+    team.images = None
+    team.audio = None
+    team.videos = None
+    for member in team.members:
+        reset_team(member)
+
+
+def reset_agent(agent):
+    agent.memory = None
+    agent.session_id = None
+    agent.team_session_id = None
+    agent.run_id = None
+    agent.run_input = None
+    agent.run_response = None
+    agent.agent_session = None
+    agent.images = None
+    agent.audio = None
+    agent.videos = None
+    # agno keeps streaming switched on for an agent once it ran streamed
+    agent.stream = None
+    agent.stream_intermediate_steps = False
@@ -0,0 +1,509 @@
+import json
+import logging
+import os
+import socket
+import threading
+import time
+import uuid
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import or_, update
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.db.database import SessionLocal
+from app.models.analysis import Analysis
+from app.models.analysis_jobs import AnalysisJob
+from app.models.journals import Journals
+from app.models.skin import Skin
+from app.models.users import User
+from app.services.agent import (
+    TEAM_PROFILES,
+    analyze_skin,
+    merge_shared_recommendations,
+    profile_limiter,
+    shared_recommendations,
+)
+from app.services.analysis_stream import emit_sections
+from app.services.blob_store import blob_store
+from app.services.image_processing import normalized_image
+from app.services.product_catalog import record_catalog_products
+from app.services.skin_metrics import compute_skin_metrics
+from app.services.timing import StageTimer, record_timing
+from app.services.image_hash import (
+    compute_dhash,
+    find_cached_analysis,
+    image_hash_index,
+    record_image_hash,
+    to_timestamp,
+)
+
+logger = logging.getLogger(__name__)
+
+REQUIRED_FIELDS = ["overall_health", "skin_type", "concerns", "recommendations", "analysis_metrics", "skincare_products"]
+
+# Job statuses
+PENDING = "pending"
+RUNNING = "running"
+COMPLETED = "completed"
+FAILED = "failed"
+
+executor = ThreadPoolExecutor(max_workers=settings.ANALYSIS_JOB_WORKERS, thread_name_prefix="analysis-job")
+
+# Owner of the jobs this process runs, unique across hosts, processes and restarts
+WORKER_ID = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+
+def get_journals_list(db: Session, user_id: int):
+    """Return the user's journals as plain dictionaries, most recent first"""
+    journals = db.query(Journals)\
+        .filter(Journals.user_id == user_id)\
+        .order_by(Journals.created_at.desc())\
+        .all()
+
+    # Convert SQLAlchemy model to dictionary
+    return [
+        {
+            "title": journal.title,
+            "content": journal.content,
+            "created_at": journal.created_at,
+            "updated_at": journal.updated_at
+        }
+        for journal in journals
+    ]
+
+
+def parse_analysis_result(analysis_result):
+    """Validate and convert the AI response into a dictionary"""
+    if isinstance(analysis_result, str):
+        analysis_result = json.loads(analysis_result)
+
+    # Validate required fields
+    if not all(field in analysis_result for field in REQUIRED_FIELDS):
+        raise ValueError("Invalid AI response structure")
+    return analysis_result
+
+
+def store_analysis(db: Session, user_id: int, image_url: str, analysis_result: dict, update_skin: bool = True) -> Analysis:
+    """Create the analysis record and update the user's skin profile, without committing"""
+    analysis = Analysis(
+        user_id=user_id,
+        image_url=image_url,
+        overall_health=analysis_result["overall_health"],
+        skin_type=analysis_result["skin_type"],
+        concerns=analysis_result["concerns"],
+        recommendations=analysis_result["recommendations"],
+        analysis_metrics=analysis_result["analysis_metrics"],
+        skincare_products=analysis_result["skincare_products"]
+    )
+    db.add(analysis)
+    if update_skin:
+        concerns_list = [concern["name"] for concern in analysis_result["concerns"]]
+        update_skin_profile(db, user_id, analysis_result["skin_type"], concerns_list)
+    return analysis
+
+
+def update_skin_profile(db: Session, user_id: int, skin_type: str, concerns_list: list):
+    """Update or create the user's skin profile, without committing"""
+    skin = db.query(Skin).filter(Skin.user_id == user_id).first()
+
+    if not skin:
+        skin = Skin(
+            user_id=user_id,
+            skin_type=skin_type,
+            concerns=", ".join(concerns_list)
+        )
+        db.add(skin)
+    else:
+        skin.skin_type = skin_type
+        skin.concerns = ", ".join(concerns_list)
+    return skin
+
+
+def combine_skin_profiles(analysis_results: list):
+    """Combine the analyses of several photos into one ``{"skin_type", "concerns"}`` profile.
+
+    The skin type is the one most photos agree on, the concerns are every
+    concern seen in any photo, in order of first appearance.
+    """
+    skin_types = Counter(
+        result["skin_type"] for result in analysis_results
+        if result["skin_type"] and result["skin_type"].lower() != "unknown"
+    )
+    concerns = {}
+    for result in analysis_results:
+        for concern in result["concerns"]:
+            concerns.setdefault(concern["name"].strip().lower(), concern["name"])
+    return {
+        "skin_type": skin_types.most_common(1)[0][0] if skin_types else analysis_results[0]["skin_type"],
+        "concerns": list(concerns.values()),
+    }
+
+
+def analysis_result_from(analysis: Analysis):
+    """Rebuild the AI response dictionary from a stored analysis"""
+    return {field: getattr(analysis, field) for field in REQUIRED_FIELDS}
+
+
+def reusable_profiles(profile: str):
+    """Team profiles whose analyses can stand in for one of ``profile``: it and the deeper ones"""
+    return TEAM_PROFILES[TEAM_PROFILES.index(profile):]
+
+
+def analyze_upload(db: Session, user: User, image_path: str, image_url: str, on_event=None,
+                   timer: StageTimer = None, profile: str = None) -> Analysis:
+    """Analyze a saved upload and commit the new analysis record.
+
+    A recent near-duplicate of the same user's image, analyzed by the same
+    or a deeper profile, is cloned instead of running the agent team again. ``on_event(event, data)`` receives progress
+    events for streaming clients. ``profile`` selects the team (fast, standard
+    or deep). Stage timings are collected on ``timer`` and stored with the
+    analysis. The recommended products are harvested into the product catalog.
+    """
+    timer = timer or StageTimer()
+    profile = profile or settings.ANALYSIS_DEFAULT_PROFILE
+    with timer.span("image_hash"):
+        image_hash = compute_dhash(image_path)
+    with timer.span("cache_lookup"):
+        cached = find_cached_analysis(db, user.id, image_hash, reusable_profiles(profile))
+
+    if cached is not None:
+        source, distance = cached
+        analysis_result = analysis_result_from(source)
+        if on_event is not None:
+            on_event("cache_hit", {"source_analysis_id": source.id, "distance": distance})
+            emit_sections(on_event, analysis_result)
+    else:
+        source, distance = None, None
+        with timer.span("journals_query"):
+            journals_list = get_journals_list(db, user.id)
+        # The model gets a downscaled, metadata-free copy; the original is kept for display
+        normalize_started = time.perf_counter()
+        with normalized_image(image_path) as model_image_path:
+            timer.add_stage("image_normalize", time.perf_counter() - normalize_started)
+            metrics = None
+            if settings.QUICK_SCAN_GROUNDING:
+                with timer.span("quick_scan"):
+                    metrics = compute_skin_metrics(model_image_path)
+            if metrics is not None and on_event is not None:
+                on_event("quick_scan", {"analysis_metrics": metrics})
+            analysis_result = analyze_skin(
+                model_image_path, user.gemini_api_key, user.country, journals_list, profile=profile,
+                metrics=metrics, on_event=on_event, timer=timer
+            )
+
+    # Validate and convert AI response
+    with timer.span("result_parse"):
+        analysis_result = parse_analysis_result(analysis_result)
+
+    with timer.span("db_write"):
+        # A degraded answer neither overwrites the skin profile nor serves later re-uploads
+        degraded = timer.degraded is not None
+        analysis = store_analysis(db, user.id, image_url, analysis_result, update_skin=not degraded)
+        if not degraded:
+            record_image_hash(analysis, image_hash, profile, source, distance)
+    # The commit itself is only exported to Prometheus, it happens after the record is written
+    record_timing(analysis, timer)
+    with timer.span("db_commit"):
+        db.commit()
+        db.refresh(analysis)
+
+    if not degraded:
+        image_hash_index.add(user.id, analysis.id, image_hash, to_timestamp(analysis.created_at),
+                             analysis.image_hash.profile)
+    # Clones of a cached analysis recommend nothing new
+    if source is None:
+        with timer.span("catalog_harvest"):
+            record_catalog_products(db, user.country, analysis_result)
+    return analysis
+
+
+def analyze_batch(db: Session, user: User, uploads: list, timer: StageTimer = None, profile: str = None):
+    """Analyze several saved photos of one user and commit their analysis records together.
+
+    ``uploads`` is a list of ``(image_path, image_url)``. Near-duplicates of
+    recent uploads are cloned as in ``analyze_upload``. The image part of the
+    other photos runs concurrently, at most ``ANALYSIS_BATCH_CONCURRENCY`` at
+    a time, on the fast profile's image agent. Unless ``profile`` is fast,
+    recommendations and products for the combined concerns then come once
+    from the recommendation cache or the team's research, and every photo
+    gets that shared context. The user's skin profile is updated once, from
+    all photos.
+
+    Returns ``(results, skin_profile)``. ``results`` has one
+    ``{"analysis", "error"}`` entry per upload. ``skin_profile`` is None when
+    no photo could update it. Shared stage timings are collected on
+    ``timer`` and stored with every analysis.
+    """
+    timer = timer or StageTimer()
+    profile = profile or settings.ANALYSIS_DEFAULT_PROFILE
+    timer.profile = profile
+    with timer.span("journals_query"):
+        journals_list = get_journals_list(db, user.id)
+
+    # Hashing and cache lookups share the request's session, so they run one photo at a time
+    items = []
+    for image_path, image_url in uploads:
+        item = {"image_path": image_path, "image_url": image_url, "timer": StageTimer(), "source": None,
+                "distance": None, "result": None, "analysis": None, "error": None}
+        with item["timer"].span("image_hash"):
+            item["image_hash"] = compute_dhash(image_path)
+        with item["timer"].span("cache_lookup"):
+            cached = find_cached_analysis(db, user.id, item["image_hash"], reusable_profiles(profile))
+        if cached is not None:
+            item["source"], item["distance"] = cached
+            item["result"] = analysis_result_from(item["source"])
+        items.append(item)
+
+    # Each photo's own recommendations use the journals, the shared research never does
+    shared_context = profile != "fast"
+    pending = [item for item in items if item["source"] is None]
+    if pending:
+        with ThreadPoolExecutor(
+            max_workers=min(len(pending), settings.ANALYSIS_BATCH_CONCURRENCY),
+            thread_name_prefix="analysis-batch"
+        ) as pool:
+            list(pool.map(
+                lambda item: analyze_batch_image(item, user.gemini_api_key, user.country, journals_list),
+                pending
+            ))
+
+    analyzed = [item for item in pending if item["result"] is not None]
+    context = None
+    if shared_context and analyzed:
+        findings = combine_skin_profiles([item["result"] for item in analyzed])
+        concerns = [concern for item in analyzed for concern in item["result"]["concerns"]]
+        context = shared_recommendations(
+            findings, concerns, len(analyzed), user.gemini_api_key, user.country, profile=profile, timer=timer
+        )
+        for item in analyzed:
+            item["result"] = merge_shared_recommendations(item["result"], context)
+
+    # Every analysis carries the shared stages, the analyzed ones are degraded when the shared run was
+    stored = [item for item in items if item["result"] is not None]
+    for item in stored:
+        item["timer"].profile = profile
+        item["timer"].merge(timer)
+        if item["source"] is None and item["timer"].degraded is None:
+            item["timer"].degraded = timer.degraded
+
+    with timer.span("db_write"):
+        for item in stored:
+            # A degraded answer neither overwrites the skin profile nor serves later re-uploads
+            item["analysis"] = store_analysis(db, user.id, item["image_url"], item["result"], update_skin=False)
+            if item["timer"].degraded is None:
+                record_image_hash(item["analysis"], item["image_hash"], profile, item["source"], item["distance"])
+            record_timing(item["analysis"], item["timer"])
+
+        healthy = [item["result"] for item in stored if item["timer"].degraded is None]
+        skin_profile = combine_skin_profiles(healthy) if healthy else None
+        if skin_profile is not None:
+            update_skin_profile(db, user.id, skin_profile["skin_type"], skin_profile["concerns"])
+    with timer.span("db_commit"):
+        db.commit()
+        for item in stored:
+            db.refresh(item["analysis"])
+
+    for item in stored:
+        if item["timer"].degraded is None:
+            image_hash_index.add(user.id, item["analysis"].id, item["image_hash"],
+                                 to_timestamp(item["analysis"].created_at), item["analysis"].image_hash.profile)
+
+    with timer.span("catalog_harvest"):
+        if context:
+            record_catalog_products(db, user.country, {
+                "skin_type": findings["skin_type"],
+                "concerns": [{"name": name} for name in findings["concerns"]],
+                "skincare_products": context.get("skincare_products"),
+            })
+        elif not shared_context:
+            for item in analyzed:
+                record_catalog_products(db, user.country, item["result"])
+
+    results = [{"analysis": item["analysis"], "error": item["error"]} for item in items]
+    return results, skin_profile
+
+
+def analyze_batch_image(item: dict, user_api_key: str, country: str, journals_list: list):
+    """Run the image part of one photo of a batch, in a batch worker thread"""
+    timer = item["timer"]
+    try:
+        normalize_started = time.perf_counter()
+        with normalized_image(item["image_path"]) as model_image_path:
+            timer.add_stage("image_normalize", time.perf_counter() - normalize_started)
+            metrics = None
+            if settings.QUICK_SCAN_GROUNDING:
+                with timer.span("quick_scan"):
+                    metrics = compute_skin_metrics(model_image_path)
+            analysis_result = analyze_skin(
+                model_image_path, user_api_key, country, journals_list, profile="fast", metrics=metrics, timer=timer
+            )
+        with timer.span("result_parse"):
+            item["result"] = parse_analysis_result(analysis_result)
+    except Exception as e:
+        logger.exception("Batch analysis of %s failed", item["image_path"])
+        item["error"] = e
+
+
+def release_upload(db: Session, image_url: str):
+    """Drop the reference of a failed analysis to its uploaded image, deleting an unused blob"""
+    db.rollback()
+    blob_store.release(db, image_url)
+    db.commit()
+
+
+def create_job(db: Session, user_id: int, image_path: str, image_url: str, profile: str = None) -> AnalysisJob:
+    """Persist a pending job and hand it to the worker pool"""
+    job = AnalysisJob(
+        id=uuid.uuid4().hex,
+        user_id=user_id,
+        status=PENDING,
+        image_path=image_path,
+        image_url=image_url,
+        profile=profile
+    )
+    db.add(job)
+    db.commit()
+    db.refresh(job)
+
+    submit_job(job.id)
+    return job
+
+
+def submit_job(job_id: str):
+    executor.submit(run_job, job_id)
+
+
+def utcnow():
+    return datetime.now(timezone.utc)
+
+
+def claim_job(db: Session, job_id: str) -> bool:
+    """Take a pending job for this process and commit, False when another process has it or it is done"""
+    claimed = db.execute(
+        update(AnalysisJob)
+        .where(AnalysisJob.id == job_id, AnalysisJob.status == PENDING)
+        .values(status=RUNNING, owner=WORKER_ID, heartbeat_at=utcnow())
+    ).rowcount
+    db.commit()
+    return claimed == 1
+
+
+def finish_job(db: Session, job_id: str, status: str, **values) -> bool:
+    """Set the outcome of a job this process runs, without committing.
+
+    False when the job is gone with its account, or was requeued as stale.
+    """
+    return db.execute(
+        update(AnalysisJob)
+        .where(AnalysisJob.id == job_id, AnalysisJob.status == RUNNING, AnalysisJob.owner == WORKER_ID)
+        .values(status=status, **values)
+    ).rowcount == 1
+
+
+def send_heartbeats(stop: threading.Event):
+    """Refresh the heartbeat of the jobs this process runs until ``stop`` is set"""
+    while not stop.wait(settings.ANALYSIS_JOB_HEARTBEAT_SECONDS):
+        db = SessionLocal()
+        try:
+            db.execute(
+                update(AnalysisJob)
+                .where(AnalysisJob.owner == WORKER_ID, AnalysisJob.status == RUNNING)
+                .values(heartbeat_at=utcnow())
+            )
+            db.commit()
+        except Exception:
+            logger.warning("Could not refresh the analysis job heartbeats", exc_info=True)
+        finally:
+            db.close()
+
+
+_heartbeat_stop = threading.Event()
+_heartbeat_thread = None
+_heartbeat_lock = threading.Lock()
+
+
+def ensure_heartbeat():
+    global _heartbeat_thread
+    with _heartbeat_lock:
+        if _heartbeat_thread is None:
+            _heartbeat_thread = threading.Thread(
+                target=send_heartbeats, args=(_heartbeat_stop,), name="analysis-job-heartbeat", daemon=True
+            )
+            _heartbeat_thread.start()
+
+
+def run_job(job_id: str):
+    """Run one analysis job in a worker thread with its own database session.
+
+    The job is claimed atomically first, a job submitted by several
+    processes runs in only one of them.
+    """
+    db = SessionLocal()
+    try:
+        if not claim_job(db, job_id):
+            return
+        ensure_heartbeat()
+        job = db.query(AnalysisJob).filter(AnalysisJob.id == job_id).first()
+        image_url = job.image_url
+
+        timer = StageTimer()
+        timer.add_stage("queue_wait", max(time.time() - to_timestamp(job.created_at), 0.0))
+
+        user = db.query(User).filter(User.id == job.user_id).first()
+        try:
+            analysis = analyze_upload(db, user, job.image_path, image_url, timer=timer, profile=job.profile)
+        except Exception as e:
+            db.rollback()
+            logger.exception("Analysis job %s failed", job_id)
+            # A deleted job's upload was released with its account, a requeued one still needs it
+            if finish_job(db, job_id, FAILED, error=f"Analysis failed: {str(e)}"):
+                blob_store.release(db, image_url)
+            db.commit()
+            return
+        if not finish_job(db, job_id, COMPLETED, analysis_id=analysis.id):
+            # The upload's reference went with the account or stays with the requeued job
+            image_hash_index.discard(analysis.user_id, analysis.id)
+            db.delete(analysis)
+        db.commit()
+    finally:
+        db.close()
+
+
+def resume_jobs():
+    """Requeue running jobs whose process stopped reporting in, and submit every pending job.
+
+    Jobs other live processes run keep a fresh heartbeat and are left alone.
+    Pending jobs may be submitted by several processes, only one claims each.
+    """
+    db = SessionLocal()
+    try:
+        stale_before = utcnow() - timedelta(seconds=settings.ANALYSIS_JOB_STALE_SECONDS)
+        db.execute(
+            update(AnalysisJob)
+            .where(
+                AnalysisJob.status == RUNNING,
+                or_(AnalysisJob.heartbeat_at.is_(None), AnalysisJob.heartbeat_at < stale_before)
+            )
+            .values(status=PENDING, owner=None, heartbeat_at=None)
+        )
+        db.commit()
+        job_ids = [
+            job_id for (job_id,) in db.query(AnalysisJob.id)
+            .filter(AnalysisJob.status == PENDING)
+            .order_by(AnalysisJob.created_at)
+        ]
+    finally:
+        db.close()
+
+    for job_id in job_ids:
+        submit_job(job_id)
+    return job_ids
+
+
+def shutdown():
+    _heartbeat_stop.set()
+    executor.shutdown(wait=False, cancel_futures=True)
+    profile_limiter.shutdown()
@@ -0,0 +1,127 @@
+import json
+import re
+
+from agno.run.response import RunEvent
+
+from app.services.timing import FORWARD_TOOL
+
+# Top-level fields of SkinAnalysisResponse, in the order they are reported
+SECTIONS = ["overall_health", "skin_type", "concerns", "analysis_metrics", "recommendations", "skincare_products"]
+
+_decoder = json.JSONDecoder()
+
+
+def format_sse(event: str, data=None) -> str:
+    """Format one Server-Sent Event"""
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+
+def extract_json(text: str) -> str:
+    """Return the first JSON object with analysis sections in a model response.
+
+    Skips markdown fences and any chatter the team adds around the member's
+    answer.
+    """
+    start = text.find("{")
+    while start != -1:
+        try:
+            value, end = _decoder.raw_decode(text, start)
+        except ValueError:
+            value = None
+        if isinstance(value, dict) and SECTIONS[0] in value:
+            return text[start:end]
+        start = text.find("{", start + 1)
+    raise ValueError("No analysis JSON object in the model response")
+
+
+class SectionParser:
+    """Pull completed top-level sections out of a JSON document as it streams in.
+
+    Each call to ``feed`` appends text and returns the ``(name, value)`` pairs
+    whose values became complete, so every section is reported exactly once.
+    """
+
+    def __init__(self, sections=SECTIONS):
+        self.buffer = ""
+        self.pending = list(sections)
+        self._patterns = {name: re.compile(rf'"{name}"\s*:\s*') for name in sections}
+
+    def feed(self, text: str):
+        self.buffer += text
+        completed = []
+        for name in list(self.pending):
+            match = self._patterns[name].search(self.buffer)
+            if match is None:
+                continue
+            try:
+                value, _ = _decoder.raw_decode(self.buffer, match.end())
+            except ValueError:
+                # Value is still streaming in
+                continue
+            self.pending.remove(name)
+            completed.append((name, value))
+        return completed
+
+
+def emit_sections(on_event, analysis_result: dict):
+    """Report every section of a finished analysis result"""
+    for name in SECTIONS:
+        if name in analysis_result:
+            on_event("section", {"name": name, "value": analysis_result[name]})
+
+
+def run_team_streaming(team, message, images, on_event, response_model):
+    """Run a team or single agent with agno's streaming API and report progress through ``on_event``.
+
+    agno disables streaming when a team parses its response model, or when an
+    agent has one at all, so the raw JSON is streamed instead and validated
+    against ``response_model`` at the end. Returns the validated response as JSON.
+    """
+    parser = SectionParser()
+    started = set()
+    completed = set()
+
+    saved = {"parse_response": team.parse_response}
+    if not hasattr(team, "members"):
+        saved["response_model"] = team.response_model
+        team.response_model = None
+    team.parse_response = False
+    try:
+        for chunk in team.run(message, images=images, stream=True, stream_intermediate_steps=True):
+            if chunk.event == RunEvent.run_started.value:
+                on_event("run_started", None)
+            elif chunk.event in (RunEvent.tool_call_started.value, RunEvent.tool_call_completed.value):
+                for tool in chunk.tools or []:
+                    _report_tool(tool, started, completed, on_event)
+            elif chunk.event == RunEvent.run_response.value and isinstance(chunk.content, str):
+                for name, value in parser.feed(chunk.content):
+                    on_event("section", {"name": name, "value": value})
+    finally:
+        for name, value in saved.items():
+            setattr(team, name, value)
+
+    response = response_model.model_validate_json(extract_json(parser.buffer))
+    return response.model_dump_json(indent=2)
+
+
+def _report_tool(tool: dict, started: set, completed: set, on_event):
+    tool_call_id = tool.get("tool_call_id")
+    name = tool.get("tool_name")
+    args = tool.get("tool_args") or {}
+    is_forward = name == FORWARD_TOOL
+
+    if tool_call_id not in started:
+        started.add(tool_call_id)
+        if is_forward:
+            on_event("member_started", {"member": args.get("agent_name")})
+        else:
+            on_event("tool_call_started", {"tool": name, "args": args})
+
+    # Completed tool calls carry their result and metrics
+    if tool_call_id not in completed and "metrics" in tool:
+        completed.add(tool_call_id)
+        data = {"error": bool(tool.get("tool_call_error"))}
+        if is_forward:
+            on_event("member_finished", {"member": args.get("agent_name"), **data})
+        else:
+            on_event("tool_call_completed", {"tool": name, **data})
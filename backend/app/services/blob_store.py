@@ -0,0 +1,157 @@
+import glob
+import os
+import re
+import uuid
+
+import aiofiles.os
+from fastapi import UploadFile
+from sqlalchemy import event
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.models.stored_blobs import StoredBlob
+from app.services.uploads import save_upload
+
+SHA256_PATTERN = re.compile(r"[0-9a-f]{64}")
+# Session.info key of the files to remove once the session commits
+RELEASED_FILES = "blob_store_released_files"
+EXTENSION_PATTERN = re.compile(r"\.[a-z0-9]{1,10}")
+
+
+def blob_extension(filename) -> str:
+    """Lowercased extension of an uploaded filename, empty when it is missing or unusual"""
+    extension = os.path.splitext(filename or "")[1].lower()
+    return extension if EXTENSION_PATTERN.fullmatch(extension) else ""
+
+
+class BlobStore:
+    """Content-addressed store for uploaded files below ``root``.
+
+    A blob is named by the SHA-256 of its content and sharded by its leading
+    hex digits (``blobs/ab/cd/abcd...jpg``), so identical uploads share one
+    file and no directory grows without bound. ``stored_blobs`` counts the
+    references to every blob, the file is deleted with the last one.
+    """
+
+    def __init__(self, root: str = "uploads", url_prefix: str = "/uploads", shard_depth: int = 2,
+                 shard_width: int = 2):
+        self.root = root
+        self.url_prefix = url_prefix.rstrip("/")
+        self.shard_depth = shard_depth
+        self.shard_width = shard_width
+
+    def relative_path(self, sha256: str, extension: str = "") -> str:
+        shards = [sha256[i * self.shard_width:(i + 1) * self.shard_width] for i in range(self.shard_depth)]
+        return "/".join(["blobs", *shards, f"{sha256}{extension}"])
+
+    def derived_relative_path(self, sha256: str, name: str, extension: str) -> str:
+        """Path of a derivative (thumbnail, preview) of a blob, sharded like the blob"""
+        return self.relative_path(sha256).replace("blobs/", "derived/", 1) + f"_{name}{extension}"
+
+    def path(self, blob: StoredBlob) -> str:
+        """Filesystem path of a blob"""
+        return os.path.join(self.root, *blob.path.split("/"))
+
+    def url(self, blob: StoredBlob) -> str:
+        """URL path of a blob, below the static ``/uploads`` mount"""
+        return f"{self.url_prefix}/{blob.path}"
+
+    def sha256_from(self, url_or_path):
+        """SHA-256 of the blob an image URL or path points at, None when it is outside the store"""
+        if not url_or_path or "/blobs/" not in url_or_path.replace(os.sep, "/"):
+            return None
+        name = os.path.splitext(os.path.basename(url_or_path.split("?", 1)[0]))[0]
+        return name if SHA256_PATTERN.fullmatch(name) else None
+
+    async def put(self, db: AsyncSession, upload: UploadFile) -> StoredBlob:
+        """Store an upload and take a reference to its blob, committing it.
+
+        The upload is streamed to ``incoming/`` under a random name and hashed
+        on the way, then renamed onto its content address. The reference is
+        committed before the rename, so a concurrent release of the same blob
+        cannot delete the file afterwards. When the rename fails, the
+        reference is released again.
+        """
+        saved = await save_upload(upload, os.path.join(self.root, "incoming"), f"{uuid.uuid4().hex}.part")
+        blob = None
+        try:
+            blob = await db.run_sync(self.add_reference, saved.sha256, saved.size, blob_extension(upload.filename))
+            path = self.path(blob)
+            await aiofiles.os.makedirs(os.path.dirname(path), exist_ok=True)
+            # Identical content, replacing an existing file is harmless
+            await aiofiles.os.replace(saved.path, path)
+        except BaseException:
+            if os.path.exists(saved.path):
+                await aiofiles.os.remove(saved.path)
+            if blob is not None:
+                await db.run_sync(self.release, self.url(blob))
+                await db.commit()
+            raise
+        return blob
+
+    def add_reference(self, db: Session, sha256: str, size: int, extension: str = "") -> StoredBlob:
+        """Count one more reference to a blob, creating its row on the first one, and commit"""
+        for attempt in range(3):
+            blob = db.query(StoredBlob).filter(StoredBlob.sha256 == sha256).first()
+            if blob is None:
+                blob = StoredBlob(sha256=sha256, path=self.relative_path(sha256, extension), size=size, ref_count=1)
+                db.add(blob)
+            else:
+                updated = db.query(StoredBlob).filter(StoredBlob.id == blob.id).update(
+                    {StoredBlob.ref_count: StoredBlob.ref_count + 1}, synchronize_session=False
+                )
+                if not updated:
+                    # Released and deleted since the query, create it again
+                    db.rollback()
+                    continue
+            try:
+                db.commit()
+            except IntegrityError:
+                # Another upload of the same content created the row first
+                db.rollback()
+                continue
+            db.refresh(blob)
+            return blob
+        raise RuntimeError(f"Could not store blob {sha256}")
+
+    def release(self, db: Session, url_or_path) -> bool:
+        """Drop one reference to the blob an image URL or path points at, without committing.
+
+        The last reference deletes the row, and the file and its derivatives
+        once the caller's transaction commits; a rollback keeps them for the
+        restored row. Returns False when the URL does not point into the store.
+        """
+        sha256 = self.sha256_from(url_or_path)
+        if sha256 is None:
+            return False
+        db.query(StoredBlob).filter(StoredBlob.sha256 == sha256, StoredBlob.ref_count > 0).update(
+            {StoredBlob.ref_count: StoredBlob.ref_count - 1}, synchronize_session=False
+        )
+        blob = db.query(StoredBlob).filter(StoredBlob.sha256 == sha256, StoredBlob.ref_count <= 0).first()
+        if blob is not None:
+            db.delete(blob)
+            db.flush()
+            db.info.setdefault(RELEASED_FILES, []).append((self, blob.path, sha256))
+        return True
+
+    def remove_files(self, relative_path: str, sha256: str):
+        """Delete a blob's file and its derivatives"""
+        derived = glob.glob(os.path.join(self.root, *self.derived_relative_path(sha256, "*", "").split("/")))
+        for path in [os.path.join(self.root, *relative_path.split("/")), *derived]:
+            if os.path.exists(path):
+                os.remove(path)
+
+
+@event.listens_for(Session, "after_commit")
+def remove_released_files(session):
+    for store, relative_path, sha256 in session.info.pop(RELEASED_FILES, []):
+        store.remove_files(relative_path, sha256)
+
+
+@event.listens_for(Session, "after_rollback")
+def keep_released_files(session):
+    session.info.pop(RELEASED_FILES, None)
+
+
+blob_store = BlobStore()
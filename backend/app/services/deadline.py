@@ -0,0 +1,98 @@
+import functools
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from contextlib import contextmanager
+from contextvars import ContextVar, copy_context
+
+from app.core.config import settings
+
+# Reasons an analysis result is flagged as degraded
+TOOLS_CUT = "tools_cut"
+DEADLINE_EXCEEDED = "deadline_exceeded"
+
+TOOL_SKIPPED_MESSAGE = "Skipped: the analysis time budget is used up. Answer with the information you already have."
+TOOL_TIMEOUT_MESSAGE = "Timed out: the analysis time budget ran out. Answer with the information you already have."
+
+_current_deadline = ContextVar("analysis_deadline", default=None)
+
+# Tool calls run here so a slow one can be abandoned when its budget runs out
+_tool_executor = ThreadPoolExecutor(max_workers=settings.ANALYSIS_TOOL_WORKERS, thread_name_prefix="analysis-tool")
+
+
+class Deadline:
+    """Time budget of one analysis.
+
+    The whole budget is enforced by the profile limiter. Tool calls may only
+    use the first ``tool_fraction`` of it and at most ``tool_timeout`` seconds
+    each, the rest is left for the members and the team to write the answer.
+    Tool calls that are skipped or abandoned are counted in ``cut_tools``.
+    """
+
+    def __init__(self, seconds: float, tool_fraction: float = None, tool_timeout: float = None):
+        tool_fraction = settings.ANALYSIS_TOOL_BUDGET_FRACTION if tool_fraction is None else tool_fraction
+        self.tools_expire_at = time.monotonic() + seconds * tool_fraction
+        self.tool_timeout = settings.ANALYSIS_TOOL_TIMEOUT_SECONDS if tool_timeout is None else tool_timeout
+        self.cut_tools = []
+        self._abandoned = threading.Event()
+        self._lock = threading.Lock()
+
+    def tool_remaining(self) -> float:
+        return max(min(self.tools_expire_at - time.monotonic(), self.tool_timeout), 0.0)
+
+    def cut(self, tool: str):
+        with self._lock:
+            self.cut_tools.append(tool)
+
+    def abandon(self):
+        """Mark the run as given up on, its remaining tool calls are skipped"""
+        self._abandoned.set()
+        self.tools_expire_at = 0.0
+
+    @property
+    def abandoned(self) -> bool:
+        return self._abandoned.is_set()
+
+
+@contextmanager
+def deadline_scope(deadline: Deadline):
+    """Make ``deadline`` the budget of every tool call in the current thread"""
+    token = _current_deadline.set(deadline)
+    try:
+        yield deadline
+    finally:
+        _current_deadline.reset(token)
+
+
+def deadline_toolkit(toolkit):
+    """Bound every function of an agno toolkit by the current analysis deadline.
+
+    Outside a ``deadline_scope`` the functions run unchanged. Wrap the toolkit
+    after ``cached_toolkit`` so the budget messages never end up in the cache.
+    """
+    for function in toolkit.functions.values():
+        function.entrypoint = _deadline_entrypoint(function.name, function.entrypoint)
+    return toolkit
+
+
+def _deadline_entrypoint(tool, entrypoint):
+    @functools.wraps(entrypoint)
+    def wrapper(*args, **kwargs):
+        deadline = _current_deadline.get()
+        if deadline is None:
+            return entrypoint(*args, **kwargs)
+
+        remaining = deadline.tool_remaining()
+        if remaining <= 0:
+            deadline.cut(tool)
+            return TOOL_SKIPPED_MESSAGE
+
+        future = _tool_executor.submit(copy_context().run, entrypoint, *args, **kwargs)
+        try:
+            return future.result(timeout=remaining)
+        except FutureTimeoutError:
+            # The call keeps running in the background, its result is dropped
+            deadline.cut(tool)
+            return TOOL_TIMEOUT_MESSAGE
+
+    return wrapper
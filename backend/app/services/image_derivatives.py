@@ -0,0 +1,130 @@
+import logging
+import multiprocessing
+import os
+import re
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+from PIL import features
+
+from app.core.config import settings
+from app.db.database import SessionLocal
+from app.models.stored_blobs import StoredBlob
+from app.services.blob_store import blob_store
+from app.services.image_processing import write_derivatives
+
+logger = logging.getLogger(__name__)
+
+# Derivatives are named by blob, kind and size, so a new size never reuses a cached URL
+DERIVED_NAME_PATTERN = re.compile(r"(?P<sha256>[0-9a-f]{64})_(?P<name>[a-z]+)(?P<size>[0-9]+)\.(?:webp|jpg)")
+
+
+def derivative_format():
+    """Pillow format and file extension of the derivatives"""
+    if settings.IMAGE_DERIVATIVE_FORMAT.lower() == "webp" and features.check("webp"):
+        return "WEBP", ".webp"
+    return "JPEG", ".jpg"
+
+
+def derivative_specs():
+    """Derivative name -> (size, crop): square thumbnails for cards, previews bounded by their longest edge"""
+    return {
+        "thumbnail": (settings.IMAGE_THUMBNAIL_SIZE, True),
+        "preview": (settings.IMAGE_PREVIEW_MAX_EDGE, False),
+    }
+
+
+def derivative_relative_path(sha256: str, name: str, size: int) -> str:
+    _, extension = derivative_format()
+    return blob_store.derived_relative_path(sha256, f"{name}{size}", extension)
+
+
+def derivative_outputs(sha256: str):
+    """``write_derivatives`` arguments for every derivative of a blob"""
+    image_format, _ = derivative_format()
+    return [
+        (
+            os.path.join(blob_store.root, *derivative_relative_path(sha256, name, size).split("/")),
+            size, crop, image_format, settings.IMAGE_DERIVATIVE_QUALITY
+        )
+        for name, (size, crop) in derivative_specs().items()
+    ]
+
+
+def derivative_urls(image_url):
+    """``thumbnail_url`` and ``preview_url`` of an image URL, None for images outside the blob store"""
+    sha256 = blob_store.sha256_from(image_url) if settings.IMAGE_DERIVATIVES_ENABLED else None
+    if sha256 is None:
+        return {f"{name}_url": None for name in derivative_specs()}
+
+    # Keep the host of absolute URLs
+    base = image_url[:image_url.index(blob_store.url_prefix + "/")]
+    return {
+        f"{name}_url": f"{base}{blob_store.url_prefix}/{derivative_relative_path(sha256, name, size)}"
+        for name, (size, _) in derivative_specs().items()
+    }
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_pool() -> ProcessPoolExecutor:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            # Spawned, forking a process that runs threads is unsafe
+            _pool = ProcessPoolExecutor(
+                max_workers=settings.IMAGE_DERIVATIVE_WORKERS, mp_context=multiprocessing.get_context("spawn")
+            )
+        return _pool
+
+
+def schedule_derivatives(blob: StoredBlob):
+    """Render the derivatives of a newly stored blob in the background"""
+    if not settings.IMAGE_DERIVATIVES_ENABLED:
+        return
+    outputs = [output for output in derivative_outputs(blob.sha256) if not os.path.exists(output[0])]
+    if not outputs:
+        return
+    sha256 = blob.sha256
+
+    def log_failure(future):
+        if future.exception() is not None:
+            # Rendered again on the first request
+            logger.warning("Could not render derivatives of blob %s", sha256, exc_info=future.exception())
+
+    get_pool().submit(write_derivatives, blob_store.path(blob), outputs).add_done_callback(log_failure)
+
+
+def ensure_derivatives(sha256: str) -> bool:
+    """Render the missing derivatives of a blob in this process, False when the blob is unknown or unreadable"""
+    db = SessionLocal()
+    try:
+        blob = db.query(StoredBlob).filter(StoredBlob.sha256 == sha256).first()
+    finally:
+        db.close()
+    if blob is None or not os.path.exists(blob_store.path(blob)):
+        return False
+    try:
+        write_derivatives(blob_store.path(blob), derivative_outputs(sha256))
+    except OSError:
+        logger.warning("Could not render derivatives of blob %s", sha256, exc_info=True)
+        return False
+    return True
+
+
+def derivative_blob(filename: str):
+    """SHA-256 of the blob a current derivative filename belongs to, None for any other name"""
+    match = DERIVED_NAME_PATTERN.fullmatch(filename)
+    if match is None or match["name"] not in derivative_specs():
+        return None
+    return match["sha256"] if derivative_specs()[match["name"]][0] == int(match["size"]) else None
+
+
+def shutdown():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+            _pool = None
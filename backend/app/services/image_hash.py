@@ -0,0 +1,182 @@
+import threading
+import time
+from datetime import timezone
+
+import numpy as np
+from PIL import Image, ImageOps
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.models.analysis import Analysis
+from app.models.image_hashes import AnalysisImageHash
+
+HASH_SIZE = 8
+
+
+def compute_dhash(image_path: str) -> int:
+    """Compute a 64-bit difference hash (dHash) of an image.
+
+    The image is EXIF-transposed, converted to grayscale and shrunk to 9x8, and
+    each bit records whether a pixel is brighter than its right neighbour. Small
+    re-encodes, resizes and brightness changes only flip a few bits.
+    """
+    with Image.open(image_path) as image:
+        image = ImageOps.exif_transpose(image).convert("L")
+        image = image.resize((HASH_SIZE + 1, HASH_SIZE), Image.Resampling.LANCZOS)
+        pixels = np.asarray(image, dtype=np.int16)
+
+    bits = (pixels[:, 1:] > pixels[:, :-1]).flatten()
+    return int(np.packbits(bits).view(">u8")[0])
+
+
+def hash_to_hex(image_hash: int) -> str:
+    return f"{image_hash:016x}"
+
+
+def to_timestamp(created_at) -> float:
+    """Convert a stored ``created_at`` to a POSIX timestamp, naive values are UTC"""
+    if created_at is None:
+        return 0.0
+    if created_at.tzinfo is None:
+        created_at = created_at.replace(tzinfo=timezone.utc)
+    return created_at.timestamp()
+
+
+class ImageHashIndex:
+    """In-memory per-user index of image hashes.
+
+    Each user's hashes live in a NumPy ``uint64`` array, so a lookup is one
+    vectorized XOR and popcount over all of them. Users are loaded lazily from
+    ``analysis_image_hashes`` on their first lookup.
+    """
+
+    def __init__(self):
+        # user_id -> (hashes, analysis ids, created_at timestamps, team profiles)
+        self._users = {}
+        self._lock = threading.Lock()
+
+    def lookup(self, db: Session, user_id: int, image_hash: int, max_distance: int, max_age_seconds: float,
+               profiles=None):
+        """Return ``(analysis_id, distance)`` of the closest recent match, or None.
+
+        With ``profiles``, only analyses made by one of these team profiles match.
+        """
+        hashes, analysis_ids, created, analysis_profiles = self._get_user(db, user_id)
+        if not len(hashes):
+            return None
+
+        distances = np.bitwise_count(hashes ^ np.uint64(image_hash))
+        candidates = (distances <= max_distance) & (created >= time.time() - max_age_seconds)
+        if profiles is not None:
+            candidates &= np.isin(analysis_profiles, list(profiles))
+        if not candidates.any():
+            return None
+
+        distances = np.where(candidates, distances, np.iinfo(distances.dtype).max)
+        best = int(np.argmin(distances))
+        return int(analysis_ids[best]), int(distances[best])
+
+    def add(self, user_id: int, analysis_id: int, image_hash: int, created_at: float, profile: str = None):
+        with self._lock:
+            if user_id not in self._users:
+                # Not loaded yet, the next lookup reads it from the database
+                return
+            hashes, analysis_ids, created, profiles = self._users[user_id]
+            self._users[user_id] = (
+                np.append(hashes, np.uint64(image_hash)),
+                np.append(analysis_ids, analysis_id),
+                np.append(created, created_at),
+                np.append(profiles, np.array([profile], dtype=object)),
+            )
+
+    def discard(self, user_id: int, analysis_id: int):
+        with self._lock:
+            if user_id not in self._users:
+                return
+            keep = self._users[user_id][1] != analysis_id
+            self._users[user_id] = tuple(values[keep] for values in self._users[user_id])
+
+    def clear(self):
+        with self._lock:
+            self._users.clear()
+
+    def _get_user(self, db: Session, user_id: int):
+        with self._lock:
+            if user_id in self._users:
+                return self._users[user_id]
+
+        rows = db.query(AnalysisImageHash.image_hash, AnalysisImageHash.analysis_id, Analysis.created_at,
+                        AnalysisImageHash.profile)\
+            .join(Analysis, Analysis.id == AnalysisImageHash.analysis_id)\
+            .filter(AnalysisImageHash.user_id == user_id)\
+            .all()
+        entry = (
+            np.array([int(row.image_hash, 16) for row in rows], dtype=np.uint64),
+            np.array([row.analysis_id for row in rows], dtype=np.int64),
+            np.array([to_timestamp(row.created_at) for row in rows], dtype=np.float64),
+            np.array([row.profile for row in rows], dtype=object),
+        )
+        with self._lock:
+            return self._users.setdefault(user_id, entry)
+
+
+image_hash_index = ImageHashIndex()
+
+
+def find_cached_analysis(db: Session, user_id: int, image_hash: int, profiles=None):
+    """Return ``(analysis, distance)`` for a recent near-duplicate upload, or None.
+
+    ``profiles`` are the team profiles whose analyses may be reused, all by default.
+    """
+    if not settings.IMAGE_HASH_CACHE_ENABLED:
+        return None
+
+    match = image_hash_index.lookup(
+        db,
+        user_id,
+        image_hash,
+        max_distance=settings.IMAGE_HASH_MAX_DISTANCE,
+        max_age_seconds=settings.IMAGE_HASH_MAX_AGE_HOURS * 3600,
+        profiles=profiles,
+    )
+    if match is None:
+        return None
+
+    analysis_id, distance = match
+    analysis = db.query(Analysis).filter(
+        Analysis.id == analysis_id,
+        Analysis.user_id == user_id
+    ).first()
+    if not analysis:
+        image_hash_index.discard(user_id, analysis_id)
+        return None
+    return analysis, distance
+
+
+def record_image_hash(analysis: Analysis, image_hash: int, profile: str, source: Analysis = None,
+                      distance: int = None):
+    """Attach the upload's hash to a new analysis, without committing.
+
+    ``profile`` is the team profile that made the analysis, a clone keeps its source's.
+    """
+    if source is not None and source.image_hash is not None:
+        profile = source.image_hash.profile
+    analysis.image_hash = AnalysisImageHash(
+        user_id=analysis.user_id,
+        image_hash=hash_to_hex(image_hash),
+        profile=profile,
+        source_analysis_id=source.id if source is not None else None,
+        distance=distance
+    )
+
+
+def cache_info(analysis: Analysis):
+    """Describe whether an analysis was served from the image hash cache"""
+    image_hash = analysis.image_hash
+    if image_hash is None or image_hash.source_analysis_id is None:
+        return {"hit": False}
+    return {
+        "hit": True,
+        "source_analysis_id": image_hash.source_analysis_id,
+        "distance": image_hash.distance
+    }
@@ -0,0 +1,89 @@
+import os
+import tempfile
+from contextlib import contextmanager
+
+from PIL import Image, ImageOps
+
+from app.core.config import settings
+
+
+def normalize_image(image_path: str, output_path: str, max_edge: int = None, quality: int = None) -> str:
+    """Write a model-ready copy of an uploaded image.
+
+    Applies the EXIF orientation, drops all metadata, flattens transparency,
+    downscales so the longest edge is at most ``max_edge`` and re-encodes as
+    JPEG at ``quality``.
+    """
+    max_edge = max_edge or settings.IMAGE_MAX_EDGE
+    quality = quality or settings.IMAGE_JPEG_QUALITY
+
+    with Image.open(image_path) as image:
+        image = ImageOps.exif_transpose(image)
+        if image.mode in ("RGBA", "LA") or (image.mode == "P" and "transparency" in image.info):
+            image = image.convert("RGBA")
+            background = Image.new("RGB", image.size, (255, 255, 255))
+            background.paste(image, mask=image.getchannel("A"))
+            image = background
+        else:
+            image = image.convert("RGB")
+
+        image.thumbnail((max_edge, max_edge), Image.Resampling.LANCZOS)
+        # Saving without exif/icc_profile strips the metadata
+        image.save(output_path, "JPEG", quality=quality, optimize=True)
+
+    return output_path
+
+
+@contextmanager
+def normalized_image(image_path: str):
+    """Yield the path of a temporary normalized copy of ``image_path``"""
+    if not settings.IMAGE_NORMALIZE_ENABLED:
+        yield image_path
+        return
+
+    fd, output_path = tempfile.mkstemp(suffix=".jpg", prefix="normalized-")
+    os.close(fd)
+    try:
+        yield normalize_image(image_path, output_path)
+    finally:
+        if os.path.exists(output_path):
+            os.remove(output_path)
+
+
+def write_derivative(image_path: str, output_path: str, size: int, crop: bool, image_format: str, quality: int):
+    """Write a smaller copy of an image for display.
+
+    Cropped derivatives are exactly ``size`` x ``size`` around the center,
+    the others are downscaled so the longest edge is at most ``size``. The
+    copy is written next to ``output_path`` and renamed into place.
+    """
+    with Image.open(image_path) as image:
+        image = ImageOps.exif_transpose(image)
+        image = image.convert("RGBA" if image_format == "WEBP" and image.mode in ("RGBA", "LA", "P") else "RGB")
+        if crop:
+            image = ImageOps.fit(image, (size, size), Image.Resampling.LANCZOS)
+        else:
+            image.thumbnail((size, size), Image.Resampling.LANCZOS)
+
+        os.makedirs(os.path.dirname(output_path), exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(output_path), suffix=".part")
+        os.close(fd)
+        try:
+            image.save(temp_path, image_format, quality=quality)
+            os.replace(temp_path, output_path)
+        finally:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+    return output_path
+
+
+def write_derivatives(image_path: str, outputs) -> list:
+    """Write the missing derivatives of an image, ``outputs`` holds ``(output_path, size, crop, format, quality)``.
+
+    Runs in the derivative process pool, so it only takes plain arguments.
+    """
+    written = []
+    for output_path, size, crop, image_format, quality in outputs:
+        if not os.path.exists(output_path):
+            written.append(write_derivative(image_path, output_path, size, crop, image_format, quality))
+    return written
@@ -0,0 +1,220 @@
+import asyncio
+import json
+import math
+import random
+import time
+import uuid
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
+
+from agno.exceptions import ModelProviderError
+from agno.models.base import Model
+from agno.models.google import Gemini
+from agno.models.message import Message
+from agno.models.response import ModelResponse
+
+from app.core.config import settings
+from app.services.rate_limit import estimate_tokens, rate_key, rate_limiter, response_tokens
+from app.services.timing import FORWARD_TOOL
+
+FAKE_RESPONSE_PATH = Path(__file__).parent / "resultResponse.json"
+
+# Member the fake routes to with the forward tool in route mode
+FORWARD_MEMBER = "Skin Dermatologist"
+
+_fake_response = None
+
+
+def fake_response_json() -> str:
+    """The canned analysis served by the fake model, compacted and read once"""
+    global _fake_response
+    if _fake_response is None:
+        _fake_response = json.dumps(json.loads(FAKE_RESPONSE_PATH.read_text()))
+    return _fake_response
+
+
+def create_model(api_key: Optional[str] = None) -> Model:
+    """Create the chat model configured by ``settings.MODEL_PROVIDER``.
+
+    With ``RATE_LIMIT_ENABLED`` every call of the model is charged to the
+    rate limit of ``api_key``.
+    """
+    limited = settings.RATE_LIMIT_ENABLED
+    if settings.MODEL_PROVIDER == "gemini":
+        if limited:
+            return RateLimitedGemini(id=settings.MODEL_ID, api_key=api_key, rate_limit_key=rate_key(api_key))
+        return Gemini(id=settings.MODEL_ID, api_key=api_key)
+    if settings.MODEL_PROVIDER == "fake":
+        model_class = RateLimitedFakeGemini if limited else FakeGemini
+        extra = {"rate_limit_key": rate_key(api_key)} if limited else {}
+        return model_class(
+            latency_distribution=settings.FAKE_MODEL_LATENCY_DISTRIBUTION,
+            latency_mean_ms=settings.FAKE_MODEL_LATENCY_MEAN_MS,
+            latency_stddev_ms=settings.FAKE_MODEL_LATENCY_STDDEV_MS,
+            error_rate=settings.FAKE_MODEL_ERROR_RATE,
+            input_tokens=settings.FAKE_MODEL_INPUT_TOKENS,
+            output_tokens=settings.FAKE_MODEL_OUTPUT_TOKENS,
+            seed=settings.FAKE_MODEL_SEED,
+            **extra,
+        )
+    raise ValueError(f"Unknown model provider: {settings.MODEL_PROVIDER}")
+
+
+@dataclass
+class FakeGemini(Model):
+    """Offline stand-in for Gemini used for load testing and profiling.
+
+    It never touches the network. A team leader with the route tool forwards
+    the task to the dermatologist member, and every other call answers with
+    the analysis in ``resultResponse.json``. Latency is sampled from a
+    configurable distribution, a share of calls fail with
+    ``ModelProviderError`` and token usage is reported as configured. Set
+    ``AGNO_TELEMETRY=false`` to keep agno itself offline as well.
+    """
+
+    id: str = "fake-gemini"
+    name: str = "FakeGemini"
+    provider: str = "Fake"
+
+    # constant, uniform, normal or lognormal
+    latency_distribution: str = "lognormal"
+    latency_mean_ms: float = 800.0
+    latency_stddev_ms: float = 300.0
+    error_rate: float = 0.0
+    input_tokens: int = 1500
+    output_tokens: int = 600
+    seed: Optional[int] = None
+    stream_chunks: int = 8
+
+    def __post_init__(self):
+        self._random = random.Random(self.seed)
+
+    def sample_latency(self) -> float:
+        """Sample one call latency in seconds"""
+        mean = self.latency_mean_ms
+        stddev = self.latency_stddev_ms
+        if self.latency_distribution == "constant" or stddev <= 0 or mean <= 0:
+            latency = mean
+        elif self.latency_distribution == "uniform":
+            half_width = stddev * math.sqrt(3)
+            latency = self._random.uniform(mean - half_width, mean + half_width)
+        elif self.latency_distribution == "normal":
+            latency = self._random.gauss(mean, stddev)
+        elif self.latency_distribution == "lognormal":
+            sigma = math.sqrt(math.log(1 + (stddev / mean) ** 2))
+            mu = math.log(mean) - sigma ** 2 / 2
+            latency = self._random.lognormvariate(mu, sigma)
+        else:
+            raise ValueError(f"Unknown latency distribution: {self.latency_distribution}")
+        return max(latency, 0.0) / 1000
+
+    def _call(self, messages: List[Message]) -> Dict[str, Any]:
+        time.sleep(self.sample_latency())
+        if self._random.random() < self.error_rate:
+            raise ModelProviderError("Fake provider error", status_code=503, model_name=self.name, model_id=self.id)
+
+        usage = {"input_tokens": self.input_tokens, "output_tokens": self.output_tokens}
+        last_role = messages[-1].role if messages else None
+        if self._functions and FORWARD_TOOL in self._functions and last_role != self.tool_message_role:
+            tool_call = {
+                "id": f"call_{uuid.uuid4().hex[:12]}",
+                "type": "function",
+                "function": {"name": FORWARD_TOOL, "arguments": json.dumps({"agent_name": FORWARD_MEMBER})},
+            }
+            return {"content": None, "tool_calls": [tool_call], "usage": usage}
+
+        return {"content": fake_response_json(), "tool_calls": [], "usage": usage}
+
+    def invoke(self, messages: List[Message]) -> Dict[str, Any]:
+        return self._call(messages)
+
+    async def ainvoke(self, messages: List[Message]) -> Dict[str, Any]:
+        return self._call(messages)
+
+    def invoke_stream(self, messages: List[Message]) -> Iterator[Dict[str, Any]]:
+        response = self._call(messages)
+        content = response["content"]
+        if not content:
+            yield response
+            return
+
+        size = math.ceil(len(content) / self.stream_chunks)
+        for start in range(0, len(content), size):
+            yield {"content": content[start:start + size], "tool_calls": [], "usage": None}
+        yield {"content": None, "tool_calls": [], "usage": response["usage"]}
+
+    async def ainvoke_stream(self, messages: List[Message]):
+        for delta in self.invoke_stream(messages):
+            yield delta
+
+    def parse_provider_response(self, response: Dict[str, Any]) -> ModelResponse:
+        return ModelResponse(
+            role=self.assistant_message_role,
+            content=response["content"],
+            tool_calls=response["tool_calls"],
+            response_usage=response["usage"],
+        )
+
+    def parse_provider_response_delta(self, response: Dict[str, Any]) -> ModelResponse:
+        return ModelResponse(
+            role=self.assistant_message_role,
+            content=response["content"],
+            tool_calls=response["tool_calls"] or None,
+            response_usage=response["usage"],
+        )
+
+
+class RateLimitedModel:
+    """Mixin charging every call of a model to the rate limit of its API key.
+
+    A call reserves one request and its estimated tokens, waiting up to
+    ``RATE_LIMIT_MAX_WAIT_SECONDS`` for the key's buckets to refill, and
+    raises ``RateLimitExceeded`` when that is not enough. The estimate is then
+    corrected with the usage the provider reports.
+    """
+
+    rate_limit_key: Optional[str] = None
+
+    def invoke(self, messages: List[Message]):
+        reserved = estimate_tokens(messages)
+        rate_limiter.acquire(self.rate_limit_key, reserved)
+        response = super().invoke(messages)
+        rate_limiter.settle(self.rate_limit_key, reserved, response_tokens(response))
+        return response
+
+    async def ainvoke(self, messages: List[Message]):
+        reserved = estimate_tokens(messages)
+        await asyncio.to_thread(rate_limiter.acquire, self.rate_limit_key, reserved)
+        response = await super().ainvoke(messages)
+        rate_limiter.settle(self.rate_limit_key, reserved, response_tokens(response))
+        return response
+
+    def invoke_stream(self, messages: List[Message]):
+        reserved = estimate_tokens(messages)
+        rate_limiter.acquire(self.rate_limit_key, reserved)
+        used = None
+        for delta in super().invoke_stream(messages):
+            # Usage comes with the last delta, or cumulatively with each of them
+            used = response_tokens(delta) or used
+            yield delta
+        rate_limiter.settle(self.rate_limit_key, reserved, used)
+
+    async def ainvoke_stream(self, messages: List[Message]):
+        reserved = estimate_tokens(messages)
+        await asyncio.to_thread(rate_limiter.acquire, self.rate_limit_key, reserved)
+        used = None
+        async for delta in super().ainvoke_stream(messages):
+            used = response_tokens(delta) or used
+            yield delta
+        rate_limiter.settle(self.rate_limit_key, reserved, used)
+
+
+@dataclass
+class RateLimitedGemini(RateLimitedModel, Gemini):
+    rate_limit_key: Optional[str] = None
+
+
+@dataclass
+class RateLimitedFakeGemini(RateLimitedModel, FakeGemini):
+    rate_limit_key: Optional[str] = None
@@ -0,0 +1,98 @@
+import base64
+import binascii
+import json
+from datetime import datetime
+from typing import List, NamedTuple, Optional
+
+from sqlalchemy import String, tuple_, type_coerce
+from sqlalchemy.ext.asyncio import AsyncSession
+
+NEXT = "next"
+PREV = "prev"
+
+
+class InvalidCursor(ValueError):
+    """A pagination cursor that was not issued by ``keyset_page``"""
+
+    def __init__(self):
+        super().__init__("Invalid pagination cursor")
+
+
+class Page(NamedTuple):
+    items: List
+    next_cursor: Optional[str]
+    prev_cursor: Optional[str]
+
+
+def sort_column(dialect_name: str, model):
+    """``created_at`` of ``model`` as compared in the database.
+
+    SQLite stores timestamps as text, server defaults without microseconds and
+    bound datetimes with them, so cursors there carry the stored text as is.
+    """
+    if dialect_name == "sqlite":
+        return type_coerce(model.created_at, String)
+    return model.created_at
+
+
+def encode_cursor(direction: str, created_at, row_id: int) -> str:
+    value = created_at.isoformat() if isinstance(created_at, datetime) else created_at
+    payload = json.dumps([direction, value, row_id], separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, raw_text: bool):
+    """``(direction, created_at, id)`` of a cursor, raises ``InvalidCursor`` for anything else"""
+    try:
+        payload = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        direction, value, row_id = json.loads(payload)
+        if direction not in (NEXT, PREV) or not isinstance(value, str) or not isinstance(row_id, int):
+            raise InvalidCursor()
+        return direction, value if raw_text else datetime.fromisoformat(value), row_id
+    except (binascii.Error, UnicodeDecodeError, ValueError, TypeError):
+        raise InvalidCursor()
+
+
+def keyset_statement(dialect_name: str, query, model, limit: int, cursor: str = None):
+    """``(statement, direction, key)`` of a page: ``query`` with the key filter, the order and one extra row"""
+    column = sort_column(dialect_name, model)
+    direction, key = NEXT, None
+    if cursor:
+        direction, created_at, row_id = decode_cursor(cursor, raw_text=dialect_name == "sqlite")
+        key = (created_at, row_id)
+        sort_key = tuple_(column, model.id)
+        query = query.where(sort_key < key if direction == NEXT else sort_key > key)
+
+    if direction == NEXT:
+        query = query.order_by(column.desc(), model.id.desc())
+    else:
+        query = query.order_by(column.asc(), model.id.asc())
+    # One extra row tells whether there is a page beyond this one
+    return query.add_columns(column.label("sort_key")).limit(limit + 1), direction, key
+
+
+async def keyset_page(db: AsyncSession, query, model, limit: int, cursor: str = None) -> Page:
+    """One page of ``query`` (a select of ``model``), newest first, after or before a cursor.
+
+    Rows are ordered by ``(created_at, id)`` descending and filtered on that
+    key, so a deep page costs the same as the first one. ``next_cursor`` pages
+    to older rows, ``prev_cursor`` back to newer ones, None at either end.
+    """
+    statement, direction, key = keyset_statement(db.bind.dialect.name, query, model, limit, cursor)
+    rows = (await db.execute(statement)).all()
+    more = len(rows) > limit
+    rows = rows[:limit]
+    if direction == PREV:
+        rows.reverse()
+
+    # Paging back there is at least the cursor row further on, paging on at least the one before
+    has_older = more if direction == NEXT else True
+    has_newer = more if direction == PREV else key is not None
+    next_cursor = prev_cursor = None
+    if rows:
+        first, last = rows[0], rows[-1]
+        if has_older:
+            next_cursor = encode_cursor(NEXT, last[-1], last[0].id)
+        if has_newer:
+            prev_cursor = encode_cursor(PREV, first[-1], first[0].id)
+    return Page([row[0] for row in rows], next_cursor, prev_cursor)
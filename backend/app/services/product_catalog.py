@@ -0,0 +1,270 @@
+import json
+import logging
+import threading
+from typing import List
+from urllib.parse import urlsplit
+
+from agno.tools import Toolkit
+from sqlalchemy.exc import IntegrityError, SQLAlchemyError
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.db.database import SessionLocal
+from app.models.analysis import Analysis
+from app.models.catalog_products import CatalogProduct
+from app.models.users import User
+
+try:
+    from prometheus_client import Counter
+except ImportError:  # prometheus_client is optional, the catalog works without its metrics
+    Counter = None
+
+logger = logging.getLogger(__name__)
+
+if Counter is not None:
+    CATALOG_CONCERNS_TOTAL = Counter(
+        "skin_doctor_product_catalog_concerns_total", "Concerns searched in the product catalog", ["result"]
+    )
+else:
+    CATALOG_CONCERNS_TOTAL = None
+
+# Product details kept from the analyses, the latest recommendation wins
+PRODUCT_FIELDS = ["title", "description", "link", "price", "how_to_use", "benefits", "side_effects", "dosage"]
+
+
+def normalize_term(value) -> str:
+    """Lowercase and collapse whitespace, so "Acne " and "acne" index together"""
+    return " ".join(str(value or "").lower().split())
+
+
+def product_key(product: dict):
+    """Dedupe key of a recommended product: its link without scheme, www and query, else its title"""
+    link = str(product.get("link") or "").strip()
+    parts = urlsplit(link if "//" in link else f"//{link}")
+    host = parts.netloc.lower().removeprefix("www.")
+    path = parts.path.rstrip("/").lower()
+    # A bare shop domain does not identify a product
+    if "." in host and path:
+        return f"link:{host}{path}"
+
+    title = normalize_term(product.get("title"))
+    return f"title:{title}" if title else None
+
+
+def catalog_entry(product: CatalogProduct) -> dict:
+    return {
+        **{field: getattr(product, field) for field in PRODUCT_FIELDS},
+        "key": product.product_key,
+        "concerns": list(product.concerns or []),
+        "skin_types": list(product.skin_types or []),
+        "times_recommended": product.times_recommended or 0,
+    }
+
+
+def harvest_products(db: Session, country: str, analysis_result: dict) -> List[dict]:
+    """Upsert the products of an analysis into the country's catalog and flush, without committing.
+
+    Each product is tagged with the analysis' concerns and skin type. Returns
+    the catalog entries of the products, for ``ProductCatalogIndex.add``.
+    """
+    country = normalize_term(country)
+    concerns = {normalize_term(concern.get("name")) for concern in analysis_result.get("concerns") or []}
+    concerns.discard("")
+    skin_type = normalize_term(analysis_result.get("skin_type"))
+    skin_types = {skin_type} if skin_type not in ("", "unknown") else set()
+
+    products = {}
+    for product in analysis_result.get("skincare_products") or []:
+        key = product_key(product)
+        if key is not None:
+            products.setdefault(key, product)
+    if not products:
+        return []
+
+    existing = {
+        row.product_key: row
+        for row in db.query(CatalogProduct).filter(
+            CatalogProduct.country == country,
+            CatalogProduct.product_key.in_(list(products))
+        )
+    }
+    rows = []
+    for key, product in products.items():
+        row = existing.get(key)
+        if row is None:
+            row = CatalogProduct(country=country, product_key=key, concerns=[], skin_types=[], times_recommended=0)
+            db.add(row)
+        for field in PRODUCT_FIELDS:
+            if product.get(field):
+                setattr(row, field, str(product[field]))
+        # Reassigned, in-place changes of JSON columns are not tracked
+        row.concerns = sorted(set(row.concerns or []) | concerns)
+        row.skin_types = sorted(set(row.skin_types or []) | skin_types)
+        row.times_recommended = (row.times_recommended or 0) + 1
+        rows.append(row)
+
+    db.flush()
+    return [catalog_entry(row) for row in rows]
+
+
+class ProductCatalogIndex:
+    """In-memory per-country index of the product catalog.
+
+    Entries are keyed by their dedupe key and indexed by concern and skin
+    type. Countries are loaded lazily from ``catalog_products`` on their first
+    search. ``skin_doctor_product_catalog_concerns_total`` counts the concerns
+    a search could and could not answer.
+    """
+
+    def __init__(self):
+        # country -> (entries by key, keys by concern, keys by skin type)
+        self._countries = {}
+        self._lock = threading.Lock()
+
+    def search(self, country: str, concerns: List[str], skin_type: str = None, limit: int = 3, db: Session = None):
+        """Return ``(products, missing_concerns)`` for the concerns of an analysis.
+
+        Up to ``limit`` products are picked per concern, those recommended
+        for the same skin type and recommended most often first.
+        """
+        entries, by_concern, by_skin_type = self._get_country(normalize_term(country), db)
+        concerns = list(dict.fromkeys(term for term in map(normalize_term, concerns or []) if term))
+        same_skin_type = by_skin_type.get(normalize_term(skin_type), set())
+
+        def rank(key):
+            return (key in same_skin_type, entries[key]["times_recommended"])
+
+        picked = {}
+        missing = []
+        for concern in concerns:
+            keys = sorted(by_concern.get(concern, ()), key=rank, reverse=True)[:limit]
+            if not keys:
+                missing.append(concern)
+            for key in keys:
+                picked.setdefault(key, entries[key])
+        if not concerns:
+            for key in sorted(same_skin_type, key=rank, reverse=True)[:limit]:
+                picked[key] = entries[key]
+
+        if CATALOG_CONCERNS_TOTAL is not None:
+            CATALOG_CONCERNS_TOTAL.labels("hit").inc(len(concerns) - len(missing))
+            CATALOG_CONCERNS_TOTAL.labels("miss").inc(len(missing))
+        return list(picked.values()), missing
+
+    def add(self, country: str, products: List[dict]):
+        with self._lock:
+            catalog = self._countries.get(normalize_term(country))
+            if catalog is None:
+                # Not loaded yet, the next search reads it from the database
+                return
+            for product in products:
+                self._index(catalog, product)
+
+    def clear(self):
+        with self._lock:
+            self._countries.clear()
+
+    def _get_country(self, country: str, db: Session = None):
+        with self._lock:
+            if country in self._countries:
+                return self._countries[country]
+
+        session = db or SessionLocal()
+        try:
+            rows = session.query(CatalogProduct).filter(CatalogProduct.country == country).all()
+            catalog = ({}, {}, {})
+            for row in rows:
+                self._index(catalog, catalog_entry(row))
+        finally:
+            if db is None:
+                session.close()
+        with self._lock:
+            return self._countries.setdefault(country, catalog)
+
+    @staticmethod
+    def _index(catalog, product: dict):
+        entries, by_concern, by_skin_type = catalog
+        entries[product["key"]] = product
+        for concern in product["concerns"]:
+            by_concern.setdefault(concern, set()).add(product["key"])
+        for skin_type in product["skin_types"]:
+            by_skin_type.setdefault(skin_type, set()).add(product["key"])
+
+
+product_catalog_index = ProductCatalogIndex()
+
+
+def record_catalog_products(db: Session, country: str, analysis_result: dict):
+    """Harvest the products of a committed analysis into the catalog and commit.
+
+    A concurrent analysis may insert the same product first, then the harvest
+    is retried once against its row. The analysis itself is already stored, so
+    catalog errors are only logged.
+    """
+    if not settings.PRODUCT_CATALOG_ENABLED:
+        return
+    for attempt in range(2):
+        try:
+            products = harvest_products(db, country, analysis_result)
+            db.commit()
+        except IntegrityError:
+            db.rollback()
+            if attempt == 0:
+                continue
+            logger.warning("Could not record catalog products for %s", country, exc_info=True)
+            return
+        except SQLAlchemyError:
+            db.rollback()
+            logger.warning("Could not record catalog products for %s", country, exc_info=True)
+            return
+        product_catalog_index.add(country, products)
+        return
+
+
+def backfill_catalog(db: Session, batch_size: int = 500) -> int:
+    """Harvest the products of every stored analysis into an empty catalog, return the analyses read"""
+    if not settings.PRODUCT_CATALOG_ENABLED or db.query(CatalogProduct.id).first() is not None:
+        return 0
+
+    rows = db.query(
+        User.country, Analysis.skin_type, Analysis.concerns, Analysis.skincare_products
+    ).join(User, User.id == Analysis.user_id).order_by(Analysis.id).yield_per(batch_size)
+    count = 0
+    for row in rows:
+        harvest_products(db, row.country, {
+            "skin_type": row.skin_type,
+            "concerns": row.concerns,
+            "skincare_products": row.skincare_products,
+        })
+        count += 1
+    db.commit()
+    product_catalog_index.clear()
+    return count
+
+
+class ProductCatalogTools(Toolkit):
+    """Agent tool answering product searches from the country's catalog before the web"""
+
+    def __init__(self, country: str = None, index: ProductCatalogIndex = product_catalog_index, **kwargs):
+        super().__init__(name="product_catalog_tools", **kwargs)
+        self.country = country
+        self.index = index
+        self.register(self.search_product_catalog)
+
+    def search_product_catalog(self, concerns: List[str], skin_type: str = "") -> str:
+        """Use this function to find skincare products already recommended in the user's country for skin concerns.
+        Search the web for products only for the concerns listed in "missing_concerns".
+
+        Args:
+            concerns (List[str]): Names of the skin concerns, e.g. ["Acne", "Hyperpigmentation"].
+            skin_type (str, optional): Skin type (Oily/Dry/Combination/Normal).
+        Returns:
+            str: A JSON object with the matching "products" and the "missing_concerns" without products.
+        """
+        products, missing = self.index.search(
+            self.country, concerns, skin_type, limit=settings.PRODUCT_CATALOG_RESULTS_PER_CONCERN
+        )
+        return json.dumps({
+            "products": [{field: product[field] for field in PRODUCT_FIELDS} for product in products],
+            "missing_concerns": missing,
+        })
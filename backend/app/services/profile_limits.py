@@ -0,0 +1,61 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+
+
+class AnalysisBusy(Exception):
+    """No run slot of the profile became free before the deadline"""
+
+
+class AnalysisTimeout(Exception):
+    """The team run did not finish within the profile's timeout"""
+
+
+class ProfileLimiter:
+    """Bound the concurrent runs and the run time of each analysis profile.
+
+    ``limits`` maps a profile to ``{"timeout_seconds", "max_concurrency"}``.
+    A run first waits for one of the profile's slots, then runs on the
+    limiter's own worker threads. The caller stops waiting once the timeout
+    (counted from the call, slot wait included) has passed. The run itself
+    cannot be interrupted, so it keeps its slot until it really finishes and
+    a slow model cannot push more work than the limit onto the process.
+    """
+
+    def __init__(self, limits: dict):
+        self.limits = limits
+        self._slots = {
+            profile: threading.BoundedSemaphore(limit["max_concurrency"])
+            for profile, limit in limits.items()
+        }
+        self._executor = ThreadPoolExecutor(
+            max_workers=sum(limit["max_concurrency"] for limit in limits.values()),
+            thread_name_prefix="analysis-run"
+        )
+
+    def run(self, profile: str, fn, *args, **kwargs):
+        timeout = self.limits[profile]["timeout_seconds"]
+        deadline = time.monotonic() + timeout
+        slot = self._slots[profile]
+        if not slot.acquire(timeout=timeout):
+            raise AnalysisBusy(f"All {profile} analysis slots are busy, try again later")
+
+        def call():
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                slot.release()
+
+        try:
+            future = self._executor.submit(call)
+        except BaseException:
+            slot.release()
+            raise
+
+        try:
+            return future.result(timeout=max(deadline - time.monotonic(), 0))
+        except FutureTimeoutError:
+            raise AnalysisTimeout(f"The {profile} analysis did not finish within {timeout} seconds")
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
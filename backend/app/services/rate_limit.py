@@ -0,0 +1,275 @@
+import hashlib
+import math
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+from app.core.config import settings
+
+# Rough token cost of one image in a Gemini request
+IMAGE_TOKENS = 258
+
+USAGE_FIELDS = ["requests", "tokens", "rejected", "waited_seconds", "last_request_at"]
+
+
+class RateLimitExceeded(Exception):
+    """The key's request or token budget will not refill within the maximum wait.
+
+    ``retry_after`` is the time until a call would be admitted again.
+    """
+
+    def __init__(self, retry_after: float):
+        self.retry_after = retry_after
+        super().__init__(f"Gemini API key rate limit reached, retry in {self.retry_after_seconds} seconds")
+
+    @property
+    def retry_after_seconds(self) -> int:
+        """Whole seconds for the ``Retry-After`` header"""
+        return max(math.ceil(self.retry_after), 1)
+
+
+def rate_key(api_key) -> str:
+    """Keys are stored as hashes, users without a key share the server's key"""
+    return hashlib.sha256((api_key or "").encode()).hexdigest()
+
+
+def estimate_tokens(messages, output_tokens: int = None) -> int:
+    """Estimate the tokens of a model call before it is sent: ~4 characters per token plus the answer"""
+    output_tokens = settings.RATE_LIMIT_OUTPUT_TOKENS_ESTIMATE if output_tokens is None else output_tokens
+    characters = 0
+    images = 0
+    for message in messages:
+        content = message.content
+        characters += len(content) if isinstance(content, str) else len(str(content or ""))
+        images += len(message.images or [])
+    return characters // 4 + images * IMAGE_TOKENS + output_tokens
+
+
+def response_tokens(response):
+    """Tokens a provider reports for a call (a fake model dict or a Gemini response), or None"""
+    usage = response.get("usage") if isinstance(response, dict) else getattr(response, "usage_metadata", None)
+    if usage is None:
+        return None
+    if isinstance(usage, dict):
+        return (usage.get("input_tokens") or 0) + (usage.get("output_tokens") or 0)
+    total = getattr(usage, "total_token_count", None)
+    if total is not None:
+        return total
+    return (getattr(usage, "prompt_token_count", None) or 0) + (getattr(usage, "candidates_token_count", None) or 0)
+
+
+class MemoryBucketStore:
+    """Buckets and usage of this process only"""
+
+    def __init__(self):
+        self._buckets = {}
+        self._usage = {}
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def locked(self):
+        with self._lock:
+            yield
+
+    def load(self, key):
+        return self._buckets.get(key)
+
+    def save(self, key, state):
+        self._buckets[key] = state
+
+    def add_usage(self, key, **counts):
+        usage = self._usage.setdefault(key, dict.fromkeys(USAGE_FIELDS, 0))
+        for name, value in counts.items():
+            usage[name] = value if name == "last_request_at" else usage[name] + value
+
+    def usage(self, key):
+        with self._lock:
+            return dict(self._usage.get(key) or dict.fromkeys(USAGE_FIELDS, 0))
+
+
+class SQLiteBucketStore:
+    """Buckets and usage in a SQLite file, shared by every worker process on the host.
+
+    A reservation runs in one ``BEGIN IMMEDIATE`` transaction, so concurrent
+    workers take turns on the same key.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = None
+
+    def _connect(self):
+        if self._conn is None:
+            self._conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None, timeout=30)
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS rate_limit_buckets ("
+                "key TEXT PRIMARY KEY, requests REAL NOT NULL, tokens REAL NOT NULL, updated_at REAL NOT NULL)"
+            )
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS rate_limit_usage ("
+                "key TEXT PRIMARY KEY, requests INTEGER NOT NULL DEFAULT 0, tokens INTEGER NOT NULL DEFAULT 0, "
+                "rejected INTEGER NOT NULL DEFAULT 0, waited_seconds REAL NOT NULL DEFAULT 0, "
+                "last_request_at REAL NOT NULL DEFAULT 0)"
+            )
+        return self._conn
+
+    @contextmanager
+    def locked(self):
+        with self._lock:
+            conn = self._connect()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            conn.execute("COMMIT")
+
+    def load(self, key):
+        row = self._conn.execute(
+            "SELECT requests, tokens, updated_at FROM rate_limit_buckets WHERE key = ?", (key,)
+        ).fetchone()
+        return tuple(row) if row is not None else None
+
+    def save(self, key, state):
+        self._conn.execute(
+            "INSERT OR REPLACE INTO rate_limit_buckets (key, requests, tokens, updated_at) VALUES (?, ?, ?, ?)",
+            (key, *state),
+        )
+
+    def add_usage(self, key, **counts):
+        self._conn.execute("INSERT OR IGNORE INTO rate_limit_usage (key) VALUES (?)", (key,))
+        assignments = ", ".join(
+            f"{name} = ?" if name == "last_request_at" else f"{name} = {name} + ?" for name in counts
+        )
+        self._conn.execute(f"UPDATE rate_limit_usage SET {assignments} WHERE key = ?", (*counts.values(), key))
+
+    def usage(self, key):
+        with self._lock:
+            row = self._connect().execute(
+                f"SELECT {', '.join(USAGE_FIELDS)} FROM rate_limit_usage WHERE key = ?", (key,)
+            ).fetchone()
+        return dict(zip(USAGE_FIELDS, row)) if row is not None else dict.fromkeys(USAGE_FIELDS, 0)
+
+
+class KeyRateLimiter:
+    """Token-bucket rate limiter per Gemini API key.
+
+    Every key has a request bucket and a token bucket holding one minute of
+    budget, refilled continuously. A call reserves its request and estimated
+    tokens up front, buckets may go negative, and waits until they are paid
+    back. Calls that would wait longer than ``max_wait`` are rejected with
+    ``RateLimitExceeded`` instead and reserve nothing. A budget of 0 turns its
+    bucket off.
+    """
+
+    def __init__(self, store, requests_per_minute: int, tokens_per_minute: int, max_wait: float):
+        self.store = store
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self.max_wait = max_wait
+
+    def _refill(self, state, now):
+        if state is None:
+            return float(self.requests_per_minute), float(self.tokens_per_minute)
+        requests, tokens, updated_at = state
+        elapsed = max(now - updated_at, 0.0)
+        return (
+            min(self.requests_per_minute, requests + elapsed * self.requests_per_minute / 60),
+            min(self.tokens_per_minute, tokens + elapsed * self.tokens_per_minute / 60),
+        )
+
+    def _wait(self, requests, tokens, requests_needed, tokens_needed):
+        wait = 0.0
+        if self.requests_per_minute:
+            wait = max(wait, (requests_needed - requests) * 60 / self.requests_per_minute)
+        if self.tokens_per_minute:
+            # A call larger than the whole bucket only waits for a full bucket
+            tokens_needed = min(tokens_needed, self.tokens_per_minute)
+            wait = max(wait, (tokens_needed - tokens) * 60 / self.tokens_per_minute)
+        return wait
+
+    def acquire(self, key: str, tokens: int):
+        """Reserve one request and ``tokens`` for ``key``, sleeping until the buckets cover them"""
+        now = time.time()
+        with self.store.locked():
+            requests_level, tokens_level = self._refill(self.store.load(key), now)
+            wait = self._wait(requests_level, tokens_level, 1, tokens)
+            rejected = wait > self.max_wait
+            if rejected:
+                self.store.add_usage(key, rejected=1)
+            else:
+                self.store.save(key, (requests_level - 1, tokens_level - tokens, now))
+                self.store.add_usage(key, requests=1, waited_seconds=wait, last_request_at=now)
+        # Raised outside the store transaction, so the rejection is recorded
+        if rejected:
+            raise RateLimitExceeded(wait - self.max_wait)
+        if wait > 0:
+            time.sleep(wait)
+
+    def settle(self, key: str, reserved: int, used=None):
+        """Correct a reservation with the tokens the provider reported, and record them"""
+        used = reserved if used is None else used
+        now = time.time()
+        with self.store.locked():
+            requests_level, tokens_level = self._refill(self.store.load(key), now)
+            self.store.save(key, (requests_level, tokens_level - (used - reserved), now))
+            self.store.add_usage(key, tokens=used)
+
+    def retry_after(self, key: str, tokens: int = 0) -> float:
+        """Seconds until a call of ``tokens`` would be admitted without waiting too long, 0 when it is now"""
+        with self.store.locked():
+            requests_level, tokens_level = self._refill(self.store.load(key), time.time())
+        wait = self._wait(requests_level, tokens_level, 1, tokens)
+        return wait - self.max_wait if wait > self.max_wait else 0.0
+
+    def record_rejected(self, key: str):
+        with self.store.locked():
+            self.store.add_usage(key, rejected=1)
+
+    def status(self, key: str):
+        """Remaining budget and recorded usage of a key"""
+        with self.store.locked():
+            requests_level, tokens_level = self._refill(self.store.load(key), time.time())
+        return {
+            "requests_per_minute": self.requests_per_minute,
+            "tokens_per_minute": self.tokens_per_minute,
+            "requests_available": round(requests_level, 2),
+            "tokens_available": round(tokens_level),
+            "requests_used_ratio": self._used(requests_level, self.requests_per_minute),
+            "tokens_used_ratio": self._used(tokens_level, self.tokens_per_minute),
+            "usage": self.store.usage(key),
+        }
+
+    @staticmethod
+    def _used(level, capacity):
+        return round(min(max(1 - level / capacity, 0.0), 1.0), 3) if capacity else 0.0
+
+
+def create_store():
+    if settings.RATE_LIMIT_STORE == "memory":
+        return MemoryBucketStore()
+    if settings.RATE_LIMIT_STORE == "sqlite":
+        return SQLiteBucketStore(settings.RATE_LIMIT_STORE_PATH)
+    raise ValueError(f"Unknown rate limit store: {settings.RATE_LIMIT_STORE}")
+
+
+rate_limiter = KeyRateLimiter(
+    create_store(),
+    requests_per_minute=settings.RATE_LIMIT_REQUESTS_PER_MINUTE,
+    tokens_per_minute=settings.RATE_LIMIT_TOKENS_PER_MINUTE,
+    max_wait=settings.RATE_LIMIT_MAX_WAIT_SECONDS,
+)
+
+
+def check_rate_limit(api_key):
+    """Raise ``RateLimitExceeded`` up front when a new analysis for the key could not start in time"""
+    if not settings.RATE_LIMIT_ENABLED:
+        return
+    key = rate_key(api_key)
+    retry_after = rate_limiter.retry_after(key, settings.RATE_LIMIT_OUTPUT_TOKENS_ESTIMATE)
+    if retry_after > 0:
+        rate_limiter.record_rejected(key)
+        raise RateLimitExceeded(retry_after)
@@ -0,0 +1,66 @@
+import json
+
+from app.core.config import settings
+from app.services.tool_cache import ToolCache, normalize_query
+
+try:
+    from prometheus_client import Counter
+except ImportError:  # prometheus_client is optional, the cache works without its metrics
+    Counter = None
+
+if Counter is not None:
+    RECOMMENDATION_CACHE_TOTAL = Counter(
+        "skin_doctor_recommendation_cache_total", "Recommendation cache lookups", ["result"]
+    )
+else:
+    RECOMMENDATION_CACHE_TOTAL = None
+
+# Entries share the tool cache's storage format under this name
+CACHE_TOOL = "recommendations"
+
+SEVERITY_BUCKETS = ["mild", "moderate", "severe"]
+
+recommendation_cache = ToolCache(
+    settings.RECOMMENDATION_CACHE_PATH,
+    max_entries=settings.RECOMMENDATION_CACHE_MAX_ENTRIES,
+    default_ttl=settings.RECOMMENDATION_CACHE_TTL_SECONDS,
+)
+
+
+def severity_bucket(concerns) -> str:
+    """The highest severity among the concerns, "unknown" when none is recognized"""
+    ranks = [
+        SEVERITY_BUCKETS.index(severity)
+        for severity in (normalize_query(concern.get("severity") or "") for concern in concerns)
+        if severity in SEVERITY_BUCKETS
+    ]
+    return SEVERITY_BUCKETS[max(ranks)] if ranks else "unknown"
+
+
+def recommendation_key(skin_type, concerns, profile) -> dict:
+    """Skin profile the shared recommendations depend on: skin type, concern names, severity and team profile"""
+    return {
+        "skin_type": normalize_query(skin_type or ""),
+        "concerns": sorted({normalize_query(concern["name"]) for concern in concerns}),
+        "severity": severity_bucket(concerns),
+        "profile": profile,
+    }
+
+
+def get_recommendations(key: dict, country):
+    """Cached ``recommendations`` and ``skincare_products`` for a skin profile in a country, or None"""
+    if not settings.RECOMMENDATION_CACHE_ENABLED:
+        return None
+    result = recommendation_cache.get(CACHE_TOOL, recommendation_cache.make_key(CACHE_TOOL, key, country))
+    if RECOMMENDATION_CACHE_TOTAL is not None:
+        RECOMMENDATION_CACHE_TOTAL.labels("hit" if result is not None else "miss").inc()
+    return json.loads(result) if result is not None else None
+
+
+def set_recommendations(key: dict, country, context: dict):
+    if not settings.RECOMMENDATION_CACHE_ENABLED:
+        return
+    recommendation_cache.set(
+        CACHE_TOOL, recommendation_cache.make_key(CACHE_TOOL, key, country), json.dumps(context)
+    )
+
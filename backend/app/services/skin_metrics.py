@@ -0,0 +1,109 @@
+import numpy as np
+from PIL import Image, ImageOps
+from skimage.color import rgb2gray, rgb2hsv
+from skimage.feature import blob_dog, local_binary_pattern
+from skimage.filters import gaussian
+
+# Working resolution of the quick scan, larger images are downscaled first
+SCAN_MAX_EDGE = 384
+
+LBP_POINTS = 8
+LBP_RADIUS = 1
+
+
+def load_image(image) -> np.ndarray:
+    """Load a path or file object as an RGB float array in [0, 1] at scan resolution"""
+    with Image.open(image) as pil_image:
+        # Let the JPEG decoder downscale while decoding, much cheaper than a full decode
+        pil_image.draft("RGB", (SCAN_MAX_EDGE, SCAN_MAX_EDGE))
+        pil_image = ImageOps.exif_transpose(pil_image).convert("RGB")
+        pil_image.thumbnail((SCAN_MAX_EDGE, SCAN_MAX_EDGE), Image.Resampling.BILINEAR)
+        return np.asarray(pil_image, dtype=np.float32) / 255.0
+
+
+def skin_mask(rgb: np.ndarray) -> np.ndarray:
+    """Boolean mask of skin-coloured pixels using the classic YCbCr range rule.
+
+    Falls back to the whole image when too little skin is detected, e.g. for
+    close-ups with unusual lighting.
+    """
+    r, g, b = rgb[..., 0] * 255, rgb[..., 1] * 255, rgb[..., 2] * 255
+    cb = 128 - 0.168736 * r - 0.331264 * g + 0.5 * b
+    cr = 128 + 0.5 * r - 0.418688 * g - 0.081312 * b
+    mask = (cb >= 77) & (cb <= 127) & (cr >= 133) & (cr <= 173)
+    if mask.mean() < 0.05:
+        return np.ones(mask.shape, dtype=bool)
+    return mask
+
+
+def texture_features(gray: np.ndarray, mask: np.ndarray):
+    """Return (mean local standard deviation, normalized LBP histogram entropy)"""
+    mean = gaussian(gray, sigma=2)
+    mean_sq = gaussian(gray * gray, sigma=2)
+    local_std = np.sqrt(np.clip(mean_sq - mean * mean, 0, None))
+
+    lbp = local_binary_pattern((gray * 255).astype(np.uint8), LBP_POINTS, LBP_RADIUS, method="uniform")
+    bins = LBP_POINTS + 2
+    hist = np.bincount(lbp[mask].astype(np.int64), minlength=bins).astype(np.float64)
+    hist /= max(hist.sum(), 1.0)
+    nonzero = hist[hist > 0]
+    entropy = float(-(nonzero * np.log2(nonzero)).sum() / np.log2(bins))
+
+    return float(local_std[mask].mean()), entropy
+
+
+def pore_density(gray: np.ndarray, mask: np.ndarray) -> float:
+    """Dark blobs (pores, comedones) per 1000 skin pixels"""
+    blobs = blob_dog(1.0 - gray, min_sigma=0.7, max_sigma=3, threshold=0.03)
+    if not len(blobs):
+        return 0.0
+    rows = blobs[:, 0].astype(np.int64)
+    cols = blobs[:, 1].astype(np.int64)
+    count = int(mask[rows, cols].sum())
+    return 1000.0 * count / max(int(mask.sum()), 1)
+
+
+def specular_ratio(rgb: np.ndarray, mask: np.ndarray) -> float:
+    """Share of skin pixels that are bright, desaturated highlights (shine)"""
+    hsv = rgb2hsv(rgb)
+    highlights = (hsv[..., 2] > 0.85) & (hsv[..., 1] < 0.25)
+    return float(highlights[mask].mean())
+
+
+def _score(value: float, zero: float, full: float) -> int:
+    """Map ``value`` linearly onto 0-100, where ``zero`` scores 0 and ``full`` scores 100"""
+    fraction = (value - zero) / (full - zero)
+    return int(round(100 * min(max(fraction, 0.0), 1.0)))
+
+
+def compute_skin_metrics(image) -> dict:
+    """Compute deterministic ``AnalysisMetrics`` for an image path or file object.
+
+    The scores are proxies from classic image statistics, not a diagnosis:
+    texture uniformity from local variance and LBP entropy, pore visibility
+    from dark blob density, and hydration from the specular highlight ratio
+    (a healthy glow) penalized by micro-texture roughness.
+    """
+    rgb = load_image(image)
+    gray = rgb2gray(rgb)
+    mask = skin_mask(rgb)
+
+    local_std, lbp_entropy = texture_features(gray, mask)
+    pores = pore_density(gray, mask)
+    shine = specular_ratio(rgb, mask)
+
+    texture_uniformity = int(round(0.6 * _score(local_std, 0.08, 0.01) + 0.4 * _score(lbp_entropy, 0.95, 0.6)))
+    pore_visibility = _score(pores, 0.0, 4.0)
+    # Some shine reads as hydrated skin, a lot of it as oiliness
+    glow = _score(shine, 0.0, 0.05) if shine <= 0.05 else _score(shine, 0.25, 0.05)
+    skin_hydration = int(round(0.5 * glow + 0.5 * _score(local_std, 0.06, 0.01)))
+    overall_score = int(round(
+        0.35 * skin_hydration + 0.35 * texture_uniformity + 0.3 * (100 - pore_visibility)
+    ))
+
+    return {
+        "skin_hydration": skin_hydration,
+        "texture_uniformity": texture_uniformity,
+        "pore_visibility": pore_visibility,
+        "overall_score": overall_score,
+    }
@@ -0,0 +1,86 @@
+import os
+import re
+from mimetypes import guess_type
+
+from starlette.concurrency import run_in_threadpool
+from starlette.datastructures import Headers
+from starlette.exceptions import HTTPException
+from starlette.responses import FileResponse, Response
+from starlette.staticfiles import NotModifiedResponse, StaticFiles
+
+from app.core.config import settings
+from app.services.image_derivatives import derivative_blob, ensure_derivatives
+
+SERVE_MODES = ["direct", "x-accel", "x-sendfile"]
+
+# Blobs and derivatives never change under their name
+CONTENT_ADDRESSED_PATTERN = re.compile(r"(?:blobs|derived)/(?:[0-9a-f]+/)*(?P<name>[0-9a-f]{64}(?:_[a-z0-9]+)?)\.\w+")
+
+
+def content_etag(relative_path: str):
+    """Strong ETag of a content-addressed upload, its name, None for other files"""
+    match = CONTENT_ADDRESSED_PATTERN.fullmatch(relative_path)
+    return f'"{match["name"]}"' if match is not None else None
+
+
+class UploadStaticFiles(StaticFiles):
+    """Files of ``/uploads``: blobs, derivatives and legacy uploads.
+
+    Content-addressed files get their name as strong ETag and are cached as
+    immutable. Conditional requests are answered with 304 and ranges by
+    ``FileResponse``. In the ``x-accel`` and ``x-sendfile`` modes the body is
+    left to the front proxy, only headers leave the worker. A missing
+    derivative is rendered on its first request.
+    """
+
+    def __init__(self, *args, mode: str = None, x_accel_prefix: str = None, max_age: int = None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.mode = mode or settings.UPLOAD_SERVE_MODE
+        if self.mode not in SERVE_MODES:
+            raise ValueError(f"Unknown upload serve mode: {self.mode}")
+        self.x_accel_prefix = (x_accel_prefix or settings.UPLOAD_X_ACCEL_PREFIX).rstrip("/")
+        self.max_age = settings.UPLOAD_CACHE_MAX_AGE if max_age is None else max_age
+
+    async def get_response(self, path, scope):
+        try:
+            return await super().get_response(path, scope)
+        except HTTPException as e:
+            sha256 = derivative_blob(os.path.basename(path))
+            if e.status_code != 404 or sha256 is None or not settings.IMAGE_DERIVATIVES_ENABLED:
+                raise
+            if not await run_in_threadpool(ensure_derivatives, sha256):
+                raise
+        return await super().get_response(path, scope)
+
+    def file_response(self, full_path, stat_result, scope, status_code=200):
+        relative_path = os.path.relpath(full_path, self.directory).replace(os.sep, "/")
+        headers = {}
+        etag = content_etag(relative_path)
+        if etag is not None:
+            headers["etag"] = etag
+            headers["cache-control"] = f"public, max-age={self.max_age}, immutable"
+
+        if self.mode == "direct":
+            response = FileResponse(full_path, status_code=status_code, headers=headers, stat_result=stat_result)
+        else:
+            response = self.proxy_response(full_path, relative_path, stat_result, status_code, headers)
+
+        if self.is_not_modified(response.headers, Headers(scope=scope)):
+            return NotModifiedResponse(response.headers)
+        return response
+
+    def proxy_response(self, full_path, relative_path, stat_result, status_code, headers):
+        """Empty response telling the front proxy which file to send"""
+        if self.mode == "x-accel":
+            headers["x-accel-redirect"] = f"{self.x_accel_prefix}/{relative_path}"
+        else:
+            headers["x-sendfile"] = os.path.abspath(full_path)
+        # Validators for conditional requests, the proxy sets the length of the body
+        stat_headers = FileResponse(full_path, headers=headers, stat_result=stat_result).headers
+        headers.setdefault("etag", stat_headers["etag"])
+        headers["last-modified"] = stat_headers["last-modified"]
+        return Response(
+            status_code=status_code,
+            headers=headers,
+            media_type=guess_type(full_path)[0] or "application/octet-stream"
+        )
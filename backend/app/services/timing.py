@@ -0,0 +1,191 @@
+import threading
+import time
+from contextlib import contextmanager
+
+from app.models.analysis import Analysis
+from app.models.analysis_timings import AnalysisTiming
+
+try:
+    from prometheus_client import Counter, Histogram, make_asgi_app
+except ImportError:  # prometheus_client is optional, timings are still recorded on the analysis
+    Counter = Histogram = None
+    make_asgi_app = None
+
+# Tool the team leader uses in route mode to hand the task to a member
+FORWARD_TOOL = "forward_task_to_member"
+
+# Team runs take seconds to minutes, the other stages milliseconds
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60, 120)
+
+if Histogram is not None:
+    STAGE_SECONDS = Histogram(
+        "skin_doctor_analysis_stage_seconds", "Duration of each analysis stage", ["stage"], buckets=BUCKETS
+    )
+    MEMBER_SECONDS = Histogram(
+        "skin_doctor_agent_member_seconds", "Duration of team member runs", ["member"], buckets=BUCKETS
+    )
+    TOOL_SECONDS = Histogram(
+        "skin_doctor_agent_tool_seconds", "Duration of agent tool calls", ["tool"], buckets=BUCKETS
+    )
+    DEGRADED_TOTAL = Counter(
+        "skin_doctor_analysis_degraded_total", "Analyses answered in degraded mode", ["reason"]
+    )
+else:
+    STAGE_SECONDS = MEMBER_SECONDS = TOOL_SECONDS = DEGRADED_TOTAL = None
+
+
+def metrics_app():
+    """ASGI app serving the Prometheus metrics, or None when prometheus_client is missing"""
+    return make_asgi_app() if make_asgi_app is not None else None
+
+
+def _metric_time(metrics):
+    """Read the duration from agno metrics, a MessageMetrics object or a dictionary of lists"""
+    if metrics is None:
+        return 0.0
+    value = metrics.get("time") if isinstance(metrics, dict) else getattr(metrics, "time", None)
+    if isinstance(value, list):
+        return float(sum(value))
+    return float(value or 0.0)
+
+
+class StageTimer:
+    """Collect the timings of one analysis.
+
+    ``stages`` holds wall-clock seconds per stage of the request, ``members``
+    and ``tools`` the seconds spent per team member and tool as reported by
+    agno. Every measurement is also observed in the Prometheus histograms.
+    ``degraded`` is set when the answer was cut short by the deadline budget.
+
+    A run abandoned at its deadline may still report into the timer from its
+    worker thread, so updates are locked.
+    """
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.profile = None
+        self.degraded = None
+        self.stages = {}
+        self.members = {}
+        self.tools = {}
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def span(self, stage: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_stage(stage, time.perf_counter() - start)
+
+    def add_stage(self, stage: str, seconds: float):
+        with self._lock:
+            self.stages[stage] = self.stages.get(stage, 0.0) + seconds
+        if STAGE_SECONDS is not None:
+            STAGE_SECONDS.labels(stage).observe(seconds)
+
+    def add_member(self, member: str, seconds: float):
+        with self._lock:
+            self.members[member] = self.members.get(member, 0.0) + seconds
+        if MEMBER_SECONDS is not None:
+            MEMBER_SECONDS.labels(member).observe(seconds)
+
+    def add_tool(self, tool: str, seconds: float):
+        with self._lock:
+            self.tools[tool] = self.tools.get(tool, 0.0) + seconds
+        if TOOL_SECONDS is not None:
+            TOOL_SECONDS.labels(tool).observe(seconds)
+
+    def set_degraded(self, reason: str):
+        """Flag the analysis as degraded, the first reason wins"""
+        with self._lock:
+            if self.degraded is not None:
+                return
+            self.degraded = reason
+        if DEGRADED_TOTAL is not None:
+            DEGRADED_TOTAL.labels(reason).inc()
+
+    def merge(self, other: "StageTimer"):
+        """Add the measurements of work shared with other analyses, without observing them again"""
+        shared = other.to_dict()
+        with self._lock:
+            for name, target in (("stages", self.stages), ("members", self.members), ("tools", self.tools)):
+                for key, seconds in shared[name].items():
+                    target[key] = target.get(key, 0.0) + seconds
+
+    def record_run(self, run_response, team=None):
+        """Read member and tool timings from a finished agno run.
+
+        For a team the leader's own model time is recorded as the
+        ``team_routing`` stage. A member's time is its model time plus the
+        time spent in its tools. A single agent is recorded as one member.
+        """
+        if run_response is None:
+            return
+        if not hasattr(team, "members"):
+            self._record_member(getattr(team, "name", None) or run_response.agent_id, run_response)
+            return
+
+        self.add_stage("team_routing", _metric_time(run_response.metrics))
+        for tool in run_response.tools or []:
+            # Member runs are measured from their own responses below
+            if tool.get("tool_name") != FORWARD_TOOL:
+                self.add_tool(tool.get("tool_name"), _metric_time(tool.get("metrics")))
+
+        names = {member.agent_id: member.name for member in team.members}
+        for member_response in run_response.member_responses or []:
+            self._record_member(names.get(member_response.agent_id) or member_response.agent_id, member_response)
+
+    def _record_member(self, member, run_response):
+        seconds = _metric_time(run_response.metrics)
+        for tool in run_response.tools or []:
+            tool_seconds = _metric_time(tool.get("metrics"))
+            self.add_tool(tool.get("tool_name"), tool_seconds)
+            seconds += tool_seconds
+        self.add_member(member or "unknown", seconds)
+
+    def total(self) -> float:
+        """Seconds since the timer was created"""
+        return time.perf_counter() - self.started
+
+    def to_dict(self):
+        with self._lock:
+            return {
+                "stages": {stage: round(seconds, 4) for stage, seconds in self.stages.items()},
+                "members": {member: round(seconds, 4) for member, seconds in self.members.items()},
+                "tools": {tool: round(seconds, 4) for tool, seconds in self.tools.items()},
+            }
+
+
+def record_timing(analysis: Analysis, timer: StageTimer):
+    """Attach the timings collected so far to a new analysis, without committing"""
+    timings = timer.to_dict()
+    analysis.timing = AnalysisTiming(
+        profile=timer.profile,
+        degraded_reason=timer.degraded,
+        stages=timings["stages"],
+        members=timings["members"],
+        tools=timings["tools"],
+        total_seconds=round(timer.total(), 4)
+    )
+
+
+def timing_info(analysis: Analysis):
+    """Describe where the time of an analysis went, or None when it was not recorded"""
+    timing = analysis.timing
+    if timing is None:
+        return None
+    return {
+        "profile": timing.profile,
+        "degraded_reason": timing.degraded_reason,
+        "total_seconds": timing.total_seconds,
+        "stages": timing.stages,
+        "members": timing.members,
+        "tools": timing.tools
+    }
+
+
+def degraded_info(analysis: Analysis):
+    """Describe whether an analysis was cut short by its deadline budget"""
+    reason = analysis.timing.degraded_reason if analysis.timing is not None else None
+    return {"degraded": reason is not None, "reason": reason}
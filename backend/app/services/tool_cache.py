@@ -0,0 +1,140 @@
+import functools
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+
+from app.core.config import settings
+
+try:
+    from prometheus_client import Counter
+except ImportError:  # prometheus_client is optional, the cache works without its metrics
+    Counter = None
+
+if Counter is not None:
+    TOOL_CACHE_TOTAL = Counter("skin_doctor_tool_cache_total", "Tool cache lookups", ["tool", "result"])
+else:
+    TOOL_CACHE_TOTAL = None
+
+
+def normalize_query(value):
+    """Lowercase and collapse whitespace so trivially different queries share a key"""
+    if isinstance(value, str):
+        return " ".join(value.lower().split())
+    if isinstance(value, (list, tuple)):
+        return [normalize_query(item) for item in value]
+    return value
+
+
+class ToolCache:
+    """Persistent TTL cache for agent tool calls, stored in SQLite.
+
+    Entries are keyed by (tool, normalized arguments, country). Each tool has
+    its own TTL and the table is capped at ``max_entries`` rows, evicting the
+    least recently used entries first.
+    """
+
+    def __init__(self, path, max_entries=10000, ttls=None, default_ttl=86400):
+        self.path = path
+        self.max_entries = max_entries
+        self.ttls = ttls or {}
+        self.default_ttl = default_ttl
+        self._lock = threading.Lock()
+        self._conn = None
+
+    def _connect(self):
+        if self._conn is None:
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS tool_cache ("
+                "key TEXT PRIMARY KEY, tool TEXT NOT NULL, result TEXT NOT NULL, "
+                "created_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS ix_tool_cache_accessed_at ON tool_cache (accessed_at)")
+            self._conn.commit()
+        return self._conn
+
+    def make_key(self, tool, arguments, country):
+        payload = json.dumps(
+            [tool, {name: normalize_query(value) for name, value in sorted(arguments.items())}, normalize_query(country)],
+            default=str,
+        )
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+    def get(self, tool, key):
+        now = time.time()
+        ttl = self.ttls.get(tool, self.default_ttl)
+        with self._lock:
+            conn = self._connect()
+            row = conn.execute("SELECT result, created_at FROM tool_cache WHERE key = ?", (key,)).fetchone()
+            if row is None or now - row[1] > ttl:
+                if row is not None:
+                    conn.execute("DELETE FROM tool_cache WHERE key = ?", (key,))
+                    conn.commit()
+                self._count(tool, "miss")
+                return None
+            conn.execute("UPDATE tool_cache SET accessed_at = ? WHERE key = ?", (now, key))
+            conn.commit()
+            self._count(tool, "hit")
+            return row[0]
+
+    def set(self, tool, key, result):
+        now = time.time()
+        with self._lock:
+            conn = self._connect()
+            conn.execute(
+                "INSERT OR REPLACE INTO tool_cache (key, tool, result, created_at, accessed_at) VALUES (?, ?, ?, ?, ?)",
+                (key, tool, result, now, now),
+            )
+            (count,) = conn.execute("SELECT COUNT(*) FROM tool_cache").fetchone()
+            if count > self.max_entries:
+                conn.execute(
+                    "DELETE FROM tool_cache WHERE key IN "
+                    "(SELECT key FROM tool_cache ORDER BY accessed_at LIMIT ?)",
+                    (count - self.max_entries,),
+                )
+            conn.commit()
+
+    @staticmethod
+    def _count(tool, result):
+        if TOOL_CACHE_TOTAL is not None:
+            TOOL_CACHE_TOTAL.labels(tool, result).inc()
+
+
+tool_cache = ToolCache(
+    settings.TOOL_CACHE_PATH,
+    max_entries=settings.TOOL_CACHE_MAX_ENTRIES,
+    ttls=settings.TOOL_CACHE_TTLS,
+    default_ttl=settings.TOOL_CACHE_DEFAULT_TTL_SECONDS,
+)
+
+
+def cached_toolkit(toolkit, country=None, cache=tool_cache):
+    """Wrap every function registered on an agno toolkit with the tool cache.
+
+    The wrapper keeps the original signature and docstring, so the schema the
+    model sees does not change.
+    """
+    if not settings.TOOL_CACHE_ENABLED:
+        return toolkit
+
+    for function in toolkit.functions.values():
+        function.entrypoint = _cached_entrypoint(function.name, function.entrypoint, country, cache)
+    return toolkit
+
+
+def _cached_entrypoint(tool, entrypoint, country, cache):
+    @functools.wraps(entrypoint)
+    def wrapper(*args, **kwargs):
+        key = cache.make_key(tool, {"args": list(args), **kwargs}, country)
+        result = cache.get(tool, key)
+        if result is not None:
+            return result
+
+        result = entrypoint(*args, **kwargs)
+        if isinstance(result, str):
+            cache.set(tool, key, result)
+        return result
+
+    return wrapper
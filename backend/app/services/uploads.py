@@ -0,0 +1,95 @@
+import hashlib
+import os
+import tempfile
+from typing import NamedTuple
+
+import aiofiles
+import aiofiles.os
+from fastapi import UploadFile, status
+from fastapi.responses import JSONResponse
+
+from app.core.config import settings
+
+# Room for the multipart boundaries and form fields around the files
+MULTIPART_OVERHEAD_BYTES = 64 * 1024
+
+
+class UploadTooLarge(Exception):
+    """An uploaded file, or the whole request, is larger than allowed"""
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        super().__init__(f"Upload is larger than {round(max_bytes / (1024 * 1024), 1):g} MB")
+
+
+class SavedUpload(NamedTuple):
+    path: str
+    size: int
+    sha256: str
+
+
+class UploadSizeLimitMiddleware:
+    """Answer 413 to requests that declare a body larger than ``max_bytes`` before it is read.
+
+    The exact per-file limit is enforced by ``save_upload``, this only stops
+    oversized bodies from being parsed and spooled at all.
+    """
+
+    def __init__(self, app, max_bytes: int):
+        self.app = app
+        self.max_bytes = max_bytes
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http":
+            content_length = dict(scope["headers"]).get(b"content-length", b"")
+            if content_length.isdigit() and int(content_length) > self.max_bytes:
+                response = JSONResponse(
+                    status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                    content={"detail": str(UploadTooLarge(self.max_bytes))}
+                )
+                await response(scope, receive, send)
+                return
+        await self.app(scope, receive, send)
+
+
+def max_request_bytes() -> int:
+    """Largest request body accepted: a full batch of images at the per-file limit"""
+    return settings.UPLOAD_MAX_BYTES * settings.ANALYSIS_BATCH_MAX_IMAGES + MULTIPART_OVERHEAD_BYTES
+
+
+async def save_upload(upload: UploadFile, directory: str, filename: str, max_bytes: int = None,
+                      chunk_size: int = None) -> SavedUpload:
+    """Stream an uploaded file to ``directory/filename`` in constant memory.
+
+    The file is copied in ``chunk_size`` pieces to a temporary file next to
+    its destination, hashed with SHA-256 on the way, and renamed into place
+    once complete, so a reader never sees a partial file. Raises
+    ``UploadTooLarge`` as soon as more than ``max_bytes`` were read.
+    """
+    max_bytes = max_bytes or settings.UPLOAD_MAX_BYTES
+    chunk_size = chunk_size or settings.UPLOAD_CHUNK_BYTES
+    # Starlette knows the size of a fully received part, no need to copy an oversized one
+    if upload.size is not None and upload.size > max_bytes:
+        raise UploadTooLarge(max_bytes)
+
+    await aiofiles.os.makedirs(directory, exist_ok=True)
+    fd, temp_path = tempfile.mkstemp(dir=directory, prefix=".upload-", suffix=".part")
+    os.close(fd)
+
+    digest = hashlib.sha256()
+    size = 0
+    try:
+        async with aiofiles.open(temp_path, "wb") as out_file:
+            while chunk := await upload.read(chunk_size):
+                size += len(chunk)
+                if size > max_bytes:
+                    raise UploadTooLarge(max_bytes)
+                digest.update(chunk)
+                await out_file.write(chunk)
+        path = os.path.join(directory, filename)
+        await aiofiles.os.replace(temp_path, path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            await aiofiles.os.remove(temp_path)
+        raise
+    return SavedUpload(path, size, digest.hexdigest())
@@ -0,0 +1,339 @@
+"""End-to-end benchmark of the API hot paths.
+
+Seeds a database, drives the real FastAPI app in-process over ASGI with the
+fake model provider, and writes throughput, latency percentiles and
+allocations per request for every scenario to a JSON file.
+
+Run from the ``backend`` directory::
+
+    python -m benchmarks.run --users 20 --analyses 50 --output bench.json
+    python -m benchmarks.run --compare bench.json --output bench-new.json
+
+Without ``--database-url`` a throwaway SQLite database is used. Point it at a
+dedicated Postgres database to benchmark that instead, seeded users are
+prefixed per run so existing rows are left alone.
+"""
+import argparse
+import asyncio
+import io
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+import uuid
+from datetime import datetime, timezone
+from pathlib import Path
+
+import numpy as np
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+PASSWORD = "Benchmark123!"
+SCENARIOS = ["login", "analyze", "history", "progress", "journals", "products"]
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the Skin Doctor API in-process")
+    parser.add_argument("--database-url", help="Database to seed and benchmark (default: temporary SQLite file)")
+    parser.add_argument("--users", type=int, default=10)
+    parser.add_argument("--analyses", type=int, default=20, help="Analyses per user")
+    parser.add_argument("--journals", type=int, default=10, help="Journals per user")
+    parser.add_argument("--products", type=int, default=10, help="Products per user")
+    parser.add_argument("--scenarios", nargs="+", choices=SCENARIOS, default=SCENARIOS)
+    parser.add_argument("--requests", type=int, default=200, help="Timed requests per read scenario")
+    parser.add_argument("--login-requests", type=int, default=20, help="Timed logins (bcrypt bound)")
+    parser.add_argument("--analyze-requests", type=int, default=40, help="Timed image analyses")
+    parser.add_argument("--alloc-requests", type=int, default=10, help="Requests traced for allocations")
+    parser.add_argument("--warmup", type=int, default=5, help="Untimed requests before each scenario")
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--image-size", type=int, default=512, help="Edge of the uploaded test images")
+    parser.add_argument("--model-latency-ms", type=float, default=0.0, help="Mean latency of the fake model")
+    parser.add_argument("--model-latency-stddev-ms", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default="benchmark_results.json")
+    parser.add_argument("--compare", help="Previous results file to print deltas against")
+    return parser.parse_args(argv)
+
+
+def configure_environment(args):
+    """Point the settings at the benchmark database and the fake model, before the app is imported"""
+    workdir = tempfile.mkdtemp(prefix="skin-doctor-bench-")
+    os.chdir(workdir)
+    os.makedirs("uploads", exist_ok=True)
+
+    os.environ["DATABASE_URL"] = args.database_url or f"sqlite:///{workdir}/benchmark.db"
+    os.environ["MODEL_PROVIDER"] = "fake"
+    os.environ["FAKE_MODEL_LATENCY_MEAN_MS"] = str(args.model_latency_ms)
+    os.environ["FAKE_MODEL_LATENCY_STDDEV_MS"] = str(args.model_latency_stddev_ms)
+    os.environ["FAKE_MODEL_SEED"] = str(args.seed)
+    os.environ["TOOL_CACHE_PATH"] = os.path.join(workdir, "tool_cache.db")
+    os.environ["RECOMMENDATION_CACHE_PATH"] = os.path.join(workdir, "recommendation_cache.db")
+    os.environ["AGNO_TELEMETRY"] = "false"
+    # The fake model shares one key across all benchmark users, it must not be throttled
+    os.environ["RATE_LIMIT_ENABLED"] = "false"
+    os.environ.setdefault("GOOGLE_CSE_ID", "benchmark")
+
+    if str(BACKEND_DIR) not in sys.path:
+        sys.path.insert(0, str(BACKEND_DIR))
+    return workdir
+
+
+def make_images(count, size, seed):
+    """Distinct JPEG uploads, so none of them hits the re-upload cache"""
+    from PIL import Image
+
+    rng = np.random.default_rng(seed)
+    base = np.array([205, 160, 135], dtype=np.float32)
+    images = []
+    for _ in range(count):
+        pixels = base + rng.normal(0, 25, (size, size, 3))
+        buffer = io.BytesIO()
+        Image.fromarray(np.clip(pixels, 0, 255).astype(np.uint8)).save(buffer, "JPEG", quality=90)
+        images.append(buffer.getvalue())
+    return images
+
+
+def build_scenarios(args, users, tokens):
+    """Map each scenario to (request factory, timed request count)"""
+    images = make_images(args.warmup + args.analyze_requests + args.alloc_requests, args.image_size, args.seed)
+
+    def user_for(index):
+        return users[index % len(users)]
+
+    def headers_for(index):
+        return {"Authorization": f"Bearer {tokens[user_for(index)['email']]}"}
+
+    def login(client, index):
+        return client.post(
+            "/api/v1/auth/login",
+            data={"username": user_for(index)["email"], "password": PASSWORD},
+        )
+
+    def analyze(client, index):
+        return client.post(
+            "/api/v1/analysis/analyze",
+            files={"image": ("benchmark.jpg", images[index % len(images)], "image/jpeg")},
+            headers=headers_for(index),
+        )
+
+    def history(client, index):
+        return client.get("/api/v1/analysis/history", headers=headers_for(index))
+
+    def progress(client, index):
+        # The latest analysis is compared against the one before it
+        analysis_id = user_for(index)["analysis_ids"][-1]
+        return client.get(f"/api/v1/progress/metrics/{analysis_id}", headers=headers_for(index))
+
+    def journals(client, index):
+        return client.get("/api/v1/journals/get-journals", headers=headers_for(index))
+
+    def products(client, index):
+        return client.get("/api/v1/products/get-products", headers=headers_for(index))
+
+    scenarios = {
+        "login": (login, args.login_requests),
+        "analyze": (analyze, args.analyze_requests),
+        "history": (history, args.requests),
+        "progress": (progress, args.requests),
+        "journals": (journals, args.requests),
+        "products": (products, args.requests),
+    }
+    return {name: scenarios[name] for name in args.scenarios}
+
+
+def is_error(response):
+    if response.status_code >= 400:
+        return True
+    try:
+        body = response.json()
+    except ValueError:
+        return False
+    return isinstance(body, dict) and body.get("success") is False
+
+
+async def run_timed(client, make_request, count, concurrency, offset=0):
+    """Send ``count`` requests with ``concurrency`` in flight, return (latencies, errors, elapsed)"""
+    latencies = []
+    errors = 0
+    next_index = iter(range(offset, offset + count))
+
+    async def worker():
+        nonlocal errors
+        for index in next_index:
+            start = time.perf_counter()
+            response = await make_request(client, index)
+            latencies.append(time.perf_counter() - start)
+            if is_error(response):
+                errors += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(max(1, min(concurrency, count)))))
+    return latencies, errors, time.perf_counter() - start
+
+
+async def run_traced(client, make_request, count, offset=0):
+    """Send requests one by one under tracemalloc, return (peak bytes, retained bytes) lists"""
+    peaks = []
+    retained = []
+    tracemalloc.start()
+    try:
+        for index in range(offset, offset + count):
+            tracemalloc.reset_peak()
+            before, _ = tracemalloc.get_traced_memory()
+            await make_request(client, index)
+            current, peak = tracemalloc.get_traced_memory()
+            peaks.append(peak - before)
+            retained.append(current - before)
+    finally:
+        tracemalloc.stop()
+    return peaks, retained
+
+
+def summarize(latencies, errors, elapsed, peaks, retained):
+    latencies_ms = np.array(latencies) * 1000
+    summary = {
+        "requests": len(latencies),
+        "errors": errors,
+        "duration_s": round(elapsed, 4),
+        "throughput_rps": round(len(latencies) / elapsed, 2) if elapsed else None,
+        "latency_ms": {},
+        "allocations": {},
+    }
+    if len(latencies_ms):
+        summary["latency_ms"] = {
+            "mean": round(float(latencies_ms.mean()), 3),
+            "p50": round(float(np.percentile(latencies_ms, 50)), 3),
+            "p95": round(float(np.percentile(latencies_ms, 95)), 3),
+            "p99": round(float(np.percentile(latencies_ms, 99)), 3),
+            "max": round(float(latencies_ms.max()), 3),
+        }
+    if peaks:
+        summary["allocations"] = {
+            "requests": len(peaks),
+            "peak_kib_mean": round(float(np.mean(peaks)) / 1024, 1),
+            "peak_kib_max": round(float(np.max(peaks)) / 1024, 1),
+            "retained_kib_mean": round(float(np.mean(retained)) / 1024, 1),
+        }
+    return summary
+
+
+async def run_benchmark(args, app, users, tokens):
+    import httpx
+    from app.db.database import async_engine
+
+    results = {}
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://testserver", timeout=None) as client:
+        for name, (make_request, count) in build_scenarios(args, users, tokens).items():
+            await run_timed(client, make_request, args.warmup, args.concurrency)
+            latencies, errors, elapsed = await run_timed(
+                client, make_request, count, args.concurrency, offset=args.warmup
+            )
+            peaks, retained = await run_traced(
+                client, make_request, args.alloc_requests, offset=args.warmup + count
+            )
+            results[name] = summarize(latencies, errors, elapsed, peaks, retained)
+            print(format_row(name, results[name]), flush=True)
+    # The transport does not run the app's shutdown handlers
+    await async_engine.dispose()
+    return results
+
+
+def format_row(name, summary):
+    latency = summary["latency_ms"]
+    allocations = summary["allocations"]
+    return (
+        f"{name:<10} {summary['requests']:>6} req {summary['errors']:>4} err "
+        f"{summary['throughput_rps'] or 0:>9.1f} req/s "
+        f"p50 {latency.get('p50', 0):>8.2f} ms  p95 {latency.get('p95', 0):>8.2f} ms  "
+        f"p99 {latency.get('p99', 0):>8.2f} ms  peak {allocations.get('peak_kib_mean', 0):>9.1f} KiB"
+    )
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"], cwd=BACKEND_DIR, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def print_comparison(results, baseline):
+    """Print the relative change of throughput and latency percentiles against a previous run"""
+    print(f"\nCompared with {baseline['meta'].get('commit') or 'baseline'}:")
+    for name, summary in results.items():
+        previous = baseline["results"].get(name)
+        if not previous:
+            continue
+        changes = []
+        for label, current, old in [
+            ("req/s", summary["throughput_rps"], previous["throughput_rps"]),
+            *[
+                (key, summary["latency_ms"].get(key), previous["latency_ms"].get(key))
+                for key in ("p50", "p95", "p99")
+            ],
+        ]:
+            if current is None or not old:
+                continue
+            changes.append(f"{label} {100 * (current - old) / old:+.1f}%")
+        print(f"{name:<10} " + "  ".join(changes))
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    output_path = Path(args.output).resolve()
+    baseline = json.loads(Path(args.compare).read_text()) if args.compare else None
+    workdir = configure_environment(args)
+
+    from app.core.security import create_access_token
+    from app.db import migrate
+    from app.db.database import SessionLocal, engine
+    from app.main import app
+    from app.services import analysis_jobs
+    from benchmarks.seed import seed_database
+
+    prefix = f"bench-{uuid.uuid4().hex[:8]}"
+    # The in-process transport runs no startup events
+    migrate.upgrade()
+    start = time.perf_counter()
+    db = SessionLocal()
+    try:
+        users = seed_database(
+            db, prefix, args.users, args.analyses, args.journals, args.products, PASSWORD, seed=args.seed
+        )
+    finally:
+        db.close()
+    seed_seconds = time.perf_counter() - start
+    print(f"Seeded {args.users} users in {seed_seconds:.2f}s ({engine.dialect.name}, workdir {workdir})")
+
+    tokens = {user["email"]: create_access_token(data={"sub": user["email"]}) for user in users}
+    try:
+        results = asyncio.run(run_benchmark(args, app, users, tokens))
+    finally:
+        analysis_jobs.shutdown()
+
+    report = {
+        "meta": {
+            "commit": git_commit(),
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "database": engine.dialect.name,
+            "seed_seconds": round(seed_seconds, 3),
+            "args": {key: value for key, value in vars(args).items() if key not in ("output", "compare", "database_url")},
+        },
+        "results": results,
+    }
+    output_path.write_text(json.dumps(report, indent=2))
+    print(f"Results written to {output_path}")
+
+    if baseline is not None:
+        print_comparison(results, baseline)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+import json
+import random
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from sqlalchemy.orm import Session
+
+from app.core.security import pwd_context
+from app.models.analysis import Analysis
+from app.models.journals import Journals
+from app.models.products import Products
+from app.models.users import User
+
+RESULT_PATH = Path(__file__).resolve().parent.parent / "app" / "services" / "resultResponse.json"
+
+PRODUCT_CATEGORIES = ["Cleanser", "Toner", "Serum", "Moisturizer", "Sunscreen"]
+METRIC_NAMES = ["skin_hydration", "texture_uniformity", "pore_visibility", "overall_score"]
+
+
+def seed_database(db: Session, prefix: str, users: int, analyses: int, journals: int, products: int,
+                  password: str, seed: int = 0):
+    """Insert ``users`` users that each hold the given number of analyses, journals and products.
+
+    Emails start with ``prefix`` so repeated runs against the same database
+    do not collide. The password is hashed once and shared by every user,
+    bcrypt would otherwise dominate the seeding time. Returns one dictionary
+    per user with its id, email and analysis ids (oldest first).
+    """
+    rng = random.Random(seed)
+    result = json.loads(RESULT_PATH.read_text())
+    hashed_password = pwd_context.hash(password)
+    now = datetime.utcnow()
+
+    seeded = []
+    for index in range(users):
+        user = User(
+            name=f"Benchmark User {index}",
+            email=f"{prefix}-{index}@example.com",
+            country="Indonesia",
+            hashed_password=hashed_password,
+            gemini_api_key=f"{prefix}-key-{index}",
+        )
+        db.add(user)
+        db.flush()
+
+        user_analyses = [
+            Analysis(
+                user_id=user.id,
+                image_url=f"http://testserver/uploads/skin-images/{user.id}_{day}.jpg",
+                overall_health=result["overall_health"],
+                skin_type=result["skin_type"],
+                concerns=result["concerns"],
+                recommendations=result["recommendations"],
+                analysis_metrics={name: rng.randint(20, 95) for name in METRIC_NAMES},
+                skincare_products=result["skincare_products"],
+                created_at=now - timedelta(days=analyses - day),
+            )
+            for day in range(analyses)
+        ]
+        db.add_all(user_analyses)
+        db.add_all(
+            Journals(
+                user_id=user.id,
+                title=f"Day {day}",
+                content="Skin felt less oily today, applied sunscreen twice and skipped the exfoliant.",
+                created_at=now - timedelta(days=journals - day),
+            )
+            for day in range(journals)
+        )
+        db.add_all(
+            Products(
+                user_id=user.id,
+                product_name=f"Product {number}",
+                product_category=PRODUCT_CATEGORIES[number % len(PRODUCT_CATEGORIES)],
+                ai_recommendation=bool(number % 2),
+            )
+            for number in range(products)
+        )
+        db.flush()
+
+        seeded.append({
+            "id": user.id,
+            "email": user.email,
+            "analysis_ids": [analysis.id for analysis in user_analyses],
+        })
+
+    db.commit()
+    return seeded
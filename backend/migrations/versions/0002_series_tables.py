@@ -0,0 +1,136 @@
+"""Jobs, hashes, timings, catalog and blob tables
+
+The tables and columns added after the original schema, while the schema
+was still made by Base.metadata.create_all. That created missing tables on
+every start but never added columns, so a database may have any of these
+tables, in the shape of the release that created it. Missing tables are
+created and missing columns added, what exists is left alone.
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-17 00:48:40
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0002'
+down_revision: Union[str, None] = '0001'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def tables():
+    """Table name -> (columns and constraints, indexes as (name, columns, unique)), in creation order"""
+    return {
+        'analysis_jobs': ([
+            sa.Column('id', sa.String(), nullable=False),
+            sa.Column('user_id', sa.Integer(), nullable=False),
+            sa.Column('analysis_id', sa.Integer(), nullable=True),
+            sa.Column('status', sa.String(), nullable=False),
+            sa.Column('image_path', sa.String(), nullable=False),
+            sa.Column('image_url', sa.String(), nullable=False),
+            sa.Column('profile', sa.String(), nullable=True),
+            sa.Column('error', sa.Text(), nullable=True),
+            sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+            sa.Column('updated_at', sa.DateTime(timezone=True), nullable=True),
+            sa.ForeignKeyConstraint(['analysis_id'], ['analyses.id'], ondelete='SET NULL'),
+            sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+            sa.PrimaryKeyConstraint('id'),
+        ], [('ix_analysis_jobs_id', ['id'], False)]),
+        'analysis_image_hashes': ([
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('analysis_id', sa.Integer(), nullable=False),
+            sa.Column('user_id', sa.Integer(), nullable=False),
+            sa.Column('image_hash', sa.String(length=16), nullable=False),
+            sa.Column('source_analysis_id', sa.Integer(), nullable=True),
+            sa.Column('distance', sa.Integer(), nullable=True),
+            sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+            sa.ForeignKeyConstraint(['analysis_id'], ['analyses.id'], ondelete='CASCADE'),
+            sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+            sa.PrimaryKeyConstraint('id'),
+            sa.UniqueConstraint('analysis_id'),
+        ], [
+            ('ix_analysis_image_hashes_id', ['id'], False),
+            ('ix_analysis_image_hashes_user_id', ['user_id'], False),
+        ]),
+        'analysis_timings': ([
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('analysis_id', sa.Integer(), nullable=False),
+            sa.Column('profile', sa.String(), nullable=True),
+            sa.Column('degraded_reason', sa.String(), nullable=True),
+            sa.Column('stages', sa.JSON(), nullable=False),
+            sa.Column('members', sa.JSON(), nullable=True),
+            sa.Column('tools', sa.JSON(), nullable=True),
+            sa.Column('total_seconds', sa.Float(), nullable=False),
+            sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+            sa.ForeignKeyConstraint(['analysis_id'], ['analyses.id'], ondelete='CASCADE'),
+            sa.PrimaryKeyConstraint('id'),
+            sa.UniqueConstraint('analysis_id'),
+        ], [('ix_analysis_timings_id', ['id'], False)]),
+        'catalog_products': ([
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('country', sa.String(), nullable=False),
+            sa.Column('product_key', sa.String(), nullable=False),
+            sa.Column('title', sa.String(), nullable=False),
+            sa.Column('description', sa.Text(), nullable=True),
+            sa.Column('link', sa.String(), nullable=True),
+            sa.Column('price', sa.String(), nullable=True),
+            sa.Column('how_to_use', sa.Text(), nullable=True),
+            sa.Column('benefits', sa.Text(), nullable=True),
+            sa.Column('side_effects', sa.Text(), nullable=True),
+            sa.Column('dosage', sa.Text(), nullable=True),
+            sa.Column('concerns', sa.JSON(), nullable=False),
+            sa.Column('skin_types', sa.JSON(), nullable=False),
+            sa.Column('times_recommended', sa.Integer(), nullable=False),
+            sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+            sa.Column('updated_at', sa.DateTime(timezone=True), nullable=True),
+            sa.PrimaryKeyConstraint('id'),
+            sa.UniqueConstraint('country', 'product_key', name='uq_catalog_products_country_key'),
+        ], [
+            ('ix_catalog_products_country', ['country'], False),
+            ('ix_catalog_products_id', ['id'], False),
+        ]),
+        'stored_blobs': ([
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('sha256', sa.String(length=64), nullable=False),
+            sa.Column('path', sa.String(), nullable=False),
+            sa.Column('size', sa.Integer(), nullable=False),
+            sa.Column('ref_count', sa.Integer(), nullable=False),
+            sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+            sa.Column('updated_at', sa.DateTime(timezone=True), nullable=True),
+            sa.PrimaryKeyConstraint('id'),
+        ], [
+            ('ix_stored_blobs_id', ['id'], False),
+            ('ix_stored_blobs_sha256', ['sha256'], True),
+        ]),
+    }
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    inspector = sa.inspect(op.get_bind())
+    existing = set(inspector.get_table_names())
+    for name, (elements, indexes) in tables().items():
+        if name not in existing:
+            op.create_table(name, *elements)
+            for index_name, columns, unique in indexes:
+                op.create_index(index_name, name, columns, unique=unique)
+            continue
+        # Columns of later releases, all nullable, e.g. analysis_jobs.profile
+        present = {column['name'] for column in inspector.get_columns(name)}
+        for column in elements:
+            if isinstance(column, sa.Column) and column.name not in present:
+                op.add_column(name, column)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for name, (_, indexes) in reversed(list(tables().items())):
+        for index_name, _, _ in indexes:
+            op.drop_index(index_name, table_name=name)
+        op.drop_table(name)
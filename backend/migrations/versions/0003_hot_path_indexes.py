@@ -0,0 +1,46 @@
+"""Hot path indexes
+
+Per-user listings page on (user_id, created_at DESC, id DESC), the keyset
+of the cursors, so a page is an index range scan without a sort. Skin
+profiles are looked up by user and users by Gemini API key at registration.
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-17 00:48:54
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0003'
+down_revision: Union[str, None] = '0002'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Tables listed per user, newest first
+LISTED_TABLES = ['analyses', 'journals', 'products']
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    for table in LISTED_TABLES:
+        op.create_index(
+            f'ix_{table}_user_id_created_at', table,
+            ['user_id', sa.text('created_at DESC'), sa.text('id DESC')], unique=False
+        )
+    op.create_index('ix_analysis_jobs_user_id_status', 'analysis_jobs', ['user_id', 'status'], unique=False)
+    op.create_index(op.f('ix_skin_user_id'), 'skin', ['user_id'], unique=False)
+    op.create_index(op.f('ix_users_gemini_api_key'), 'users', ['gemini_api_key'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_users_gemini_api_key'), table_name='users')
+    op.drop_index(op.f('ix_skin_user_id'), table_name='skin')
+    op.drop_index('ix_analysis_jobs_user_id_status', table_name='analysis_jobs')
+    for table in reversed(LISTED_TABLES):
+        op.drop_index(f'ix_{table}_user_id_created_at', table_name=table)
@@ -0,0 +1,61 @@
+"""Analysis concern names
+
+The history lists the names of an analysis' concerns without loading the
+concerns JSON. Existing analyses are backfilled from their concerns.
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-17 01:20:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0004'
+down_revision: Union[str, None] = '0003'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+BACKFILL_BATCH_SIZE = 500
+
+analyses = sa.table(
+    'analyses',
+    sa.column('id', sa.Integer()),
+    sa.column('concerns', sa.JSON()),
+    sa.column('concern_names', sa.JSON()),
+)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('analyses', sa.Column('concern_names', sa.JSON(), nullable=True))
+
+    connection = op.get_bind()
+    last_id = 0
+    while True:
+        rows = connection.execute(
+            sa.select(analyses.c.id, analyses.c.concerns)
+            .where(analyses.c.id > last_id)
+            .order_by(analyses.c.id)
+            .limit(BACKFILL_BATCH_SIZE)
+        ).all()
+        if not rows:
+            break
+        connection.execute(
+            analyses.update().where(analyses.c.id == sa.bindparam('analysis_id')),
+            [
+                {'analysis_id': row.id, 'concern_names': [concern['name'] for concern in row.concerns or []]}
+                for row in rows
+            ]
+        )
+        last_id = rows[-1].id
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table('analyses', schema=None) as batch_op:
+        batch_op.drop_column('concern_names')
@@ -0,0 +1,34 @@
+"""Analysis job owner and heartbeat
+
+A job is claimed by the process that runs it, which keeps its heartbeat
+fresh. Only running jobs with a stale heartbeat are requeued at startup.
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-17 02:10:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0005'
+down_revision: Union[str, None] = '0004'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('analysis_jobs', sa.Column('owner', sa.String(), nullable=True))
+    op.add_column('analysis_jobs', sa.Column('heartbeat_at', sa.DateTime(timezone=True), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table('analysis_jobs', schema=None) as batch_op:
+        batch_op.drop_column('heartbeat_at')
+        batch_op.drop_column('owner')
@@ -0,0 +1,54 @@
+"""Image hash team profiles
+
+A near-duplicate upload only reuses an analysis made by the requested team
+profile or a deeper one. Existing hashes are backfilled with the profile
+in the timings of their analysis, or of its source for a clone. Hashes
+whose profile is unknown are no longer reused.
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-17 02:40:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0006'
+down_revision: Union[str, None] = '0005'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+image_hashes = sa.table(
+    'analysis_image_hashes',
+    sa.column('analysis_id', sa.Integer()),
+    sa.column('source_analysis_id', sa.Integer()),
+    sa.column('profile', sa.String()),
+)
+
+timings = sa.table(
+    'analysis_timings',
+    sa.column('analysis_id', sa.Integer()),
+    sa.column('profile', sa.String()),
+)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('analysis_image_hashes', sa.Column('profile', sa.String(), nullable=True))
+
+    made_by = sa.func.coalesce(image_hashes.c.source_analysis_id, image_hashes.c.analysis_id)
+    op.execute(
+        image_hashes.update().values(
+            profile=sa.select(timings.c.profile).where(timings.c.analysis_id == made_by).scalar_subquery()
+        )
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table('analysis_image_hashes', schema=None) as batch_op:
+        batch_op.drop_column('profile')
@@ -0,0 +1,51 @@
+import itertools
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+# The app's database, uploads and caches live in a scratch directory, analyses run on the fake model
+WORKDIR = tempfile.mkdtemp(prefix="skin-doctor-tests-")
+os.chdir(WORKDIR)
+os.makedirs("uploads", exist_ok=True)
+
+# Settings the app needs at import, the tests bring their own databases
+os.environ.setdefault("GOOGLE_CSE_ID", "test")
+os.environ.setdefault("AGNO_TELEMETRY", "false")
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{WORKDIR}/app.db")
+os.environ.setdefault("MODEL_PROVIDER", "fake")
+os.environ.setdefault("FAKE_MODEL_LATENCY_MEAN_MS", "10")
+os.environ.setdefault("FAKE_MODEL_LATENCY_STDDEV_MS", "0")
+
+# The database module registers every model, importing a model before it is circular
+import app.db.database  # noqa: E402,F401
+
+_users = itertools.count(1)
+
+
+@pytest.fixture(scope="session")
+def client():
+    from fastapi.testclient import TestClient
+
+    from app.main import app
+
+    with TestClient(app) as client:
+        yield client
+
+
+@pytest.fixture
+def auth_headers(client):
+    """Authorization header of a new user with an API key of their own"""
+    number = next(_users)
+    email = f"user{number}@example.com"
+    response = client.post("/api/v1/auth/register", json={
+        "name": f"User {number}", "email": email, "country": "Indonesia",
+        "password": "Passw0rd!", "gemini_api_key": f"key-{number}",
+    })
+    assert response.is_success, response.text
+    token = client.post("/api/v1/auth/login", data={"username": email, "password": "Passw0rd!"}).json()["access_token"]
+    return {"Authorization": f"Bearer {token}"}
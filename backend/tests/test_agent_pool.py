@@ -0,0 +1,123 @@
+from types import SimpleNamespace
+
+import pytest
+
+from app.services import agent_pool
+from app.services.agent_pool import TeamPool, reset_team
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(agent_pool, "time", SimpleNamespace(monotonic=clock))
+    return clock
+
+
+def make_pool(**options):
+    built = []
+
+    def factory(api_key, country, profile):
+        team = SimpleNamespace(name=f"{api_key}/{country}/{profile}/{len(built)}")
+        built.append(team)
+        return team
+
+    return TeamPool(factory, **options), built
+
+
+def lease(pool, api_key="key", country="Indonesia", profile="standard"):
+    with pool.lease(api_key, country, profile) as team:
+        return team
+
+
+def test_teams_are_reused_per_key_country_and_profile(clock):
+    pool, built = make_pool()
+
+    first = lease(pool)
+    assert lease(pool) is first
+    assert lease(pool, profile="deep") is not first
+    assert lease(pool, api_key="other") is not first
+    assert len(built) == 3
+    assert pool.size() == 3
+
+
+def test_concurrent_leases_get_their_own_team(clock):
+    pool, built = make_pool()
+
+    with pool.lease("key") as first, pool.lease("key") as second:
+        assert first is not second
+    assert pool.size() == 2
+
+
+def test_team_of_a_failed_run_is_not_returned(clock):
+    pool, built = make_pool()
+
+    with pytest.raises(RuntimeError):
+        with pool.lease("key"):
+            raise RuntimeError("run failed")
+
+    assert pool.size() == 0
+    lease(pool)
+    assert len(built) == 2
+
+
+def test_least_recently_used_teams_are_evicted_first(clock):
+    pool, built = make_pool(max_size=2)
+    a = lease(pool, "a")
+    clock.now += 1
+    b = lease(pool, "b")
+    clock.now += 1
+    assert lease(pool, "a") is a
+    clock.now += 1
+    lease(pool, "c")
+
+    # b was idle longest
+    assert pool.size() == 2
+    assert lease(pool, "a") is a
+    assert lease(pool, "b") is not b
+
+
+def test_idle_teams_expire(clock):
+    pool, built = make_pool(idle_ttl=60)
+    first = lease(pool)
+
+    clock.now += 59
+    assert lease(pool) is first
+    clock.now += 61
+    assert lease(pool) is not first
+
+
+def test_reset_clears_the_state_of_a_run():
+    member = SimpleNamespace(memory="memory", session_id="s", run_id="r", stream=True, stream_intermediate_steps=True)
+    team = SimpleNamespace(memory="memory", session_id="s", run_id="r", images=["face.jpg"], members=[member])
+
+    reset_team(team)
+
+    assert (team.memory, team.session_id, team.run_id, team.images) == (None, None, None, None)
+    assert (member.memory, member.run_id, member.stream, member.stream_intermediate_steps) == (None, None, None, False)
+
+
+def test_analyses_on_the_fake_model_share_a_pooled_team(tmp_path, monkeypatch):
+    from PIL import Image
+
+    from app.services import agent
+
+    image_path = tmp_path / "face.jpg"
+    Image.new("RGB", (64, 64), "tan").save(image_path)
+    builds = []
+    build_team = agent.team_pool.factory
+    monkeypatch.setattr(agent.team_pool, "factory", lambda *args: builds.append(args) or build_team(*args))
+    agent.team_pool.clear()
+
+    for _ in range(2):
+        agent.analyze_skin(str(image_path), "pool-key", "Indonesia", profile="fast")
+
+    assert builds == [("pool-key", "Indonesia", "fast")]
+    assert agent.team_pool.size() == 1
@@ -0,0 +1,40 @@
+import io
+import time
+
+import numpy as np
+from PIL import Image
+
+
+def image_bytes(seed=0):
+    pixels = (np.random.default_rng(seed).random((64, 64, 3)) * 255).astype("uint8")
+    buffer = io.BytesIO()
+    Image.fromarray(pixels).save(buffer, "JPEG")
+    return buffer.getvalue()
+
+
+def upload(image=None):
+    return {"image": ("face.jpg", image or image_bytes(), "image/jpeg")}
+
+
+def wait_for_job(client, headers, job_id, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        job = client.get(f"/api/v1/analysis/jobs/{job_id}", headers=headers).json()["data"]
+        if job["status"] in ("completed", "failed"):
+            return job
+        time.sleep(0.05)
+    raise AssertionError(f"Job {job_id} did not finish")
+
+
+def test_result_of_a_job_whose_analysis_was_deleted_is_gone(client, auth_headers):
+    queued = client.post("/api/v1/analysis/analyze", params={"mode": "async"}, files=upload(), headers=auth_headers)
+    assert queued.status_code == 202
+    job = wait_for_job(client, auth_headers, queued.json()["data"]["job_id"])
+    assert job["status"] == "completed"
+
+    deleted = client.delete(f"/api/v1/analysis/delete-analysis/{job['analysis_id']}", headers=auth_headers)
+    assert deleted.status_code == 200
+
+    job = client.get(f"/api/v1/analysis/jobs/{job['job_id']}", headers=auth_headers).json()["data"]
+    assert job["analysis_id"] is None
+    assert client.get(f"/api/v1/analysis/jobs/{job['job_id']}/result", headers=auth_headers).status_code == 410
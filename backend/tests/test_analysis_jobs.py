@@ -0,0 +1,93 @@
+from datetime import timedelta
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.db import migrate
+from app.models.analysis import Analysis
+from app.models.analysis_jobs import AnalysisJob
+from app.models.users import User
+from app.services import analysis_jobs
+from app.services.analysis_jobs import PENDING, RUNNING
+
+
+@pytest.fixture
+def session_factory(tmp_path, monkeypatch):
+    engine = create_engine(f"sqlite:///{tmp_path / 'app.db'}")
+    migrate.upgrade(bind=engine)
+    factory = sessionmaker(autoflush=False, bind=engine)
+    monkeypatch.setattr(analysis_jobs, "SessionLocal", factory)
+    db = factory()
+    db.add(User(id=1, name="a", email="a@b.co", country="Indonesia", hashed_password="x"))
+    db.commit()
+    db.close()
+    yield factory
+    engine.dispose()
+
+
+def add_job(factory, job_id, status=PENDING, owner=None, heartbeat_at=None):
+    db = factory()
+    db.add(AnalysisJob(
+        id=job_id, user_id=1, status=status, image_path="a.jpg", image_url="/uploads/a.jpg",
+        owner=owner, heartbeat_at=heartbeat_at
+    ))
+    db.commit()
+    db.close()
+
+
+def test_job_is_claimed_once(session_factory):
+    add_job(session_factory, "job")
+    db = session_factory()
+
+    assert analysis_jobs.claim_job(db, "job")
+    assert not analysis_jobs.claim_job(db, "job")
+    job = db.get(AnalysisJob, "job")
+    assert (job.status, job.owner) == (RUNNING, analysis_jobs.WORKER_ID)
+    db.close()
+
+
+def test_resume_requeues_only_stale_running_jobs(session_factory, monkeypatch):
+    now = analysis_jobs.utcnow()
+    stale = now - timedelta(seconds=analysis_jobs.settings.ANALYSIS_JOB_STALE_SECONDS + 1)
+    add_job(session_factory, "pending")
+    add_job(session_factory, "live", status=RUNNING, owner="other", heartbeat_at=now)
+    add_job(session_factory, "stale", status=RUNNING, owner="gone", heartbeat_at=stale)
+    add_job(session_factory, "legacy", status=RUNNING)
+    submitted = []
+    monkeypatch.setattr(analysis_jobs, "submit_job", submitted.append)
+
+    analysis_jobs.resume_jobs()
+
+    assert sorted(submitted) == ["legacy", "pending", "stale"]
+    db = session_factory()
+    live = db.get(AnalysisJob, "live")
+    assert (live.status, live.owner) == (RUNNING, "other")
+    assert db.get(AnalysisJob, "stale").owner is None
+    db.close()
+
+
+def test_job_deleted_during_its_run_keeps_no_analysis(session_factory, monkeypatch):
+    add_job(session_factory, "job")
+
+    def analyze_upload(db, user, image_path, image_url, timer=None, profile=None):
+        # The account is deleted while the team runs
+        other = session_factory()
+        other.delete(other.get(AnalysisJob, "job"))
+        other.commit()
+        other.close()
+        analysis = Analysis(user_id=user.id, image_url=image_url, concerns=[])
+        db.add(analysis)
+        db.commit()
+        return analysis
+
+    released = []
+    monkeypatch.setattr(analysis_jobs, "analyze_upload", analyze_upload)
+    monkeypatch.setattr(analysis_jobs.blob_store, "release", lambda db, url: released.append(url))
+
+    analysis_jobs.run_job("job")
+
+    db = session_factory()
+    assert db.query(Analysis).count() == 0
+    assert released == []
+    db.close()
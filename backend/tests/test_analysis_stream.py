@@ -0,0 +1,65 @@
+import json
+
+import pytest
+
+from app.services.analysis_stream import SECTIONS, SectionParser, extract_json, format_sse
+from tests.test_analysis_api import image_bytes, upload
+
+DOCUMENT = json.dumps({
+    "overall_health": "Good",
+    "skin_type": "Oily",
+    "concerns": [{"name": "Acne", "severity": "mild", "description": "Braces { and } in text"}],
+    "analysis_metrics": {"redness": 0.2},
+    "recommendations": ["Wash twice a day"],
+    "skincare_products": [],
+})
+
+
+def test_sections_are_reported_once_when_their_value_is_complete():
+    parser = SectionParser()
+    reported = []
+
+    for start in range(0, len(DOCUMENT), 7):
+        for name, value in parser.feed(DOCUMENT[start:start + 7]):
+            reported.append(name)
+            assert value == json.loads(DOCUMENT)[name]
+
+    assert reported == SECTIONS
+    assert parser.feed("") == []
+
+
+def test_incomplete_values_are_not_reported():
+    parser = SectionParser()
+
+    assert parser.feed('{"overall_health": "Go') == []
+    assert parser.feed('od", "concerns": [{"name": "Acne"}') == [("overall_health", "Good")]
+    assert parser.feed("]") == [("concerns", [{"name": "Acne"}])]
+
+
+def test_json_is_extracted_from_chatter_and_fences():
+    text = f'Here is {{the}} analysis:\n```json\n{DOCUMENT}\n```\nLet me know {{"if": "needed"}}'
+
+    assert json.loads(extract_json(text)) == json.loads(DOCUMENT)
+    with pytest.raises(ValueError):
+        extract_json('{"skin_type": "Oily"}')
+
+
+def test_events_are_formatted_as_server_sent_events():
+    assert format_sse("section", {"name": "skin_type"}) == 'event: section\ndata: {"name": "skin_type"}\n\n'
+
+
+def test_stream_reports_every_section_then_the_analysis(client, auth_headers):
+    response = client.post("/api/v1/analysis/analyze-stream", params={"profile": "fast"},
+                           files=upload(image_bytes(seed=7)), headers=auth_headers)
+
+    assert response.status_code == 200
+    events = [
+        (lines[0].removeprefix("event: "), json.loads(lines[1].removeprefix("data: ")))
+        for lines in (block.split("\n") for block in response.text.strip().split("\n\n"))
+    ]
+    names = [event for event, _ in events]
+    assert names[0] == "image_accepted"
+    assert names[-1] == "analysis"
+    # Every section once, in the order the model and the local metrics finish them
+    assert sorted(data["name"] for event, data in events if event == "section") == sorted(SECTIONS)
+    assert events[-1][1]["analysis"]["id"] is not None
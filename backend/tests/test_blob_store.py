@@ -0,0 +1,79 @@
+import asyncio
+import hashlib
+import io
+import os
+
+import aiofiles.os
+import pytest
+from fastapi import UploadFile
+from sqlalchemy import create_engine, select
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.db import migrate
+from app.models.stored_blobs import StoredBlob
+from app.services.blob_store import BlobStore
+
+
+@pytest.fixture
+def database_path(tmp_path):
+    path = tmp_path / "app.db"
+    engine = create_engine(f"sqlite:///{path}")
+    migrate.upgrade(bind=engine)
+    engine.dispose()
+    return path
+
+
+def test_failed_rename_releases_the_reference(database_path, tmp_path, monkeypatch):
+    store = BlobStore(root=str(tmp_path / "uploads"))
+    replace = aiofiles.os.replace
+
+    async def fail_into_store(source, destination):
+        if "blobs" in str(destination):
+            raise OSError("disk full")
+        await replace(source, destination)
+
+    monkeypatch.setattr(aiofiles.os, "replace", fail_into_store)
+
+    async def put():
+        engine = create_async_engine(f"sqlite+aiosqlite:///{database_path}")
+        async with AsyncSession(engine) as db:
+            with pytest.raises(OSError):
+                await store.put(db, UploadFile(io.BytesIO(b"image"), filename="a.jpg"))
+            blobs = (await db.execute(select(StoredBlob))).scalars().all()
+        await engine.dispose()
+        return blobs
+
+    assert asyncio.run(put()) == []
+    assert list((tmp_path / "uploads" / "incoming").iterdir()) == []
+
+
+def stored_blob(store, db, content=b"image"):
+    sha256 = hashlib.sha256(content).hexdigest()
+    blob = store.add_reference(db, sha256, len(content), ".jpg")
+    path = store.path(blob)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as f:
+        f.write(content)
+    return blob, path
+
+
+def test_released_file_is_deleted_only_after_the_commit(database_path, tmp_path):
+    store = BlobStore(root=str(tmp_path / "uploads"))
+    engine = create_engine(f"sqlite:///{database_path}")
+    db = sessionmaker(bind=engine)()
+    blob, path = stored_blob(store, db)
+    url = store.url(blob)
+
+    store.release(db, url)
+    assert os.path.exists(path)
+    db.rollback()
+    assert os.path.exists(path)
+    assert db.scalar(select(StoredBlob.ref_count)) == 1
+
+    store.release(db, url)
+    db.commit()
+    assert not os.path.exists(path)
+    assert db.scalar(select(StoredBlob)) is None
+    db.close()
+    engine.dispose()
@@ -0,0 +1,51 @@
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.db import migrate
+from app.models.analysis import Analysis
+from app.models.users import User
+from app.services.analysis_jobs import reusable_profiles
+from app.services.image_hash import find_cached_analysis, image_hash_index, record_image_hash
+
+IMAGE_HASH = 0x0F0F0F0F0F0F0F0F
+
+
+@pytest.fixture
+def db(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'app.db'}")
+    migrate.upgrade(bind=engine)
+    session = sessionmaker(autoflush=False, bind=engine)()
+    session.add(User(id=1, name="a", email="a@b.co", country="Indonesia", hashed_password="x"))
+    session.commit()
+    image_hash_index.clear()
+    yield session
+    image_hash_index.clear()
+    session.close()
+    engine.dispose()
+
+
+def add_analysis(db, profile, image_hash=IMAGE_HASH, source=None):
+    analysis = Analysis(user_id=1, image_url="/uploads/a.jpg", concerns=[])
+    db.add(analysis)
+    record_image_hash(analysis, image_hash, profile, source)
+    db.commit()
+    return analysis
+
+
+def test_only_same_or_deeper_profiles_are_reused(db):
+    fast = add_analysis(db, "fast")
+
+    assert find_cached_analysis(db, 1, IMAGE_HASH, reusable_profiles("fast"))[0].id == fast.id
+    assert find_cached_analysis(db, 1, IMAGE_HASH, reusable_profiles("standard")) is None
+
+    image_hash_index.clear()
+    deep = add_analysis(db, "deep", IMAGE_HASH ^ 1)
+    assert find_cached_analysis(db, 1, IMAGE_HASH, reusable_profiles("standard"))[0].id == deep.id
+
+
+def test_clone_keeps_the_profile_of_its_source(db):
+    deep = add_analysis(db, "deep")
+    clone = add_analysis(db, "fast", source=deep)
+
+    assert clone.image_hash.profile == "deep"
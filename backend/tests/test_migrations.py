@@ -0,0 +1,120 @@
+import json
+
+import pytest
+from alembic.autogenerate import compare_metadata
+from alembic.migration import MigrationContext
+from sqlalchemy import create_engine, inspect, text
+
+from app.db import migrate
+from app.db.database import Base
+
+# The schema of the original release, as Base.metadata.create_all made it on SQLite
+BASELINE_SCHEMA = """
+CREATE TABLE users (
+    id INTEGER NOT NULL, name VARCHAR NOT NULL, email VARCHAR NOT NULL, country VARCHAR NOT NULL,
+    hashed_password VARCHAR NOT NULL, profile_image VARCHAR, gemini_api_key VARCHAR,
+    created_at DATETIME DEFAULT CURRENT_TIMESTAMP, updated_at DATETIME, PRIMARY KEY (id)
+);
+CREATE INDEX ix_users_id ON users (id);
+CREATE UNIQUE INDEX ix_users_email ON users (email);
+CREATE TABLE analyses (
+    id INTEGER NOT NULL, user_id INTEGER NOT NULL, image_url VARCHAR, overall_health VARCHAR,
+    skin_type VARCHAR, concerns JSON, recommendations JSON, analysis_metrics JSON, skincare_products JSON,
+    created_at DATETIME DEFAULT CURRENT_TIMESTAMP, updated_at DATETIME, PRIMARY KEY (id),
+    FOREIGN KEY(user_id) REFERENCES users (id) ON DELETE CASCADE
+);
+CREATE INDEX ix_analyses_id ON analyses (id);
+CREATE TABLE journals (
+    id INTEGER NOT NULL, user_id INTEGER, title VARCHAR NOT NULL, content VARCHAR NOT NULL,
+    created_at DATETIME, updated_at DATETIME, PRIMARY KEY (id),
+    FOREIGN KEY(user_id) REFERENCES users (id) ON DELETE CASCADE
+);
+CREATE INDEX ix_journals_id ON journals (id);
+CREATE TABLE skin (
+    id INTEGER NOT NULL, user_id INTEGER, skin_type VARCHAR NOT NULL, concerns TEXT NOT NULL,
+    created_at VARCHAR NOT NULL, updated_at VARCHAR NOT NULL, PRIMARY KEY (id),
+    FOREIGN KEY(user_id) REFERENCES users (id) ON DELETE CASCADE
+);
+CREATE INDEX ix_skin_id ON skin (id);
+CREATE TABLE products (
+    id INTEGER NOT NULL, user_id INTEGER, product_name VARCHAR NOT NULL, product_category VARCHAR NOT NULL,
+    ai_recommendation BOOLEAN NOT NULL, created_at DATETIME, updated_at DATETIME, PRIMARY KEY (id),
+    FOREIGN KEY(user_id) REFERENCES users (id) ON DELETE CASCADE
+);
+CREATE INDEX ix_products_id ON products (id);
+"""
+
+# analysis_jobs as the background jobs release created it, before analysis profiles
+JOBS_SCHEMA = """
+CREATE TABLE analysis_jobs (
+    id VARCHAR NOT NULL, user_id INTEGER NOT NULL, analysis_id INTEGER, status VARCHAR NOT NULL,
+    image_path VARCHAR NOT NULL, image_url VARCHAR NOT NULL, error TEXT,
+    created_at DATETIME DEFAULT CURRENT_TIMESTAMP, updated_at DATETIME, PRIMARY KEY (id),
+    FOREIGN KEY(user_id) REFERENCES users (id) ON DELETE CASCADE,
+    FOREIGN KEY(analysis_id) REFERENCES analyses (id) ON DELETE SET NULL
+);
+CREATE INDEX ix_analysis_jobs_id ON analysis_jobs (id);
+"""
+
+CONCERNS = [{"name": "Acne", "severity": "Mild"}, {"name": "Redness", "severity": "Moderate"}]
+
+
+@pytest.fixture
+def engine(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'app.db'}")
+    yield engine
+    engine.dispose()
+
+
+def create_schema(engine, schema):
+    with engine.begin() as connection:
+        for statement in schema.split(";"):
+            if statement.strip():
+                connection.exec_driver_sql(statement)
+
+
+def seed_baseline(engine):
+    with engine.begin() as connection:
+        connection.execute(text(
+            "INSERT INTO users (id, name, email, country, hashed_password) VALUES (1, 'a', 'a@b.co', 'Indonesia', 'x')"
+        ))
+        connection.execute(
+            text("INSERT INTO analyses (id, user_id, concerns) VALUES (1, 1, :concerns)"),
+            {"concerns": json.dumps(CONCERNS)}
+        )
+
+
+def schema_drift(engine):
+    """Differences between the migrated database and the models"""
+    with engine.connect() as connection:
+        return compare_metadata(MigrationContext.configure(connection), Base.metadata)
+
+
+def test_upgrade_empty_database(engine):
+    migrate.upgrade(bind=engine)
+
+    assert migrate.current_revision(bind=engine) == migrate.head_revision()
+    assert schema_drift(engine) == []
+
+
+def test_upgrade_baseline_database(engine):
+    create_schema(engine, BASELINE_SCHEMA)
+    seed_baseline(engine)
+
+    migrate.upgrade(bind=engine)
+
+    assert migrate.current_revision(bind=engine) == migrate.head_revision()
+    assert schema_drift(engine) == []
+    with engine.connect() as connection:
+        names = connection.execute(text("SELECT concern_names FROM analyses WHERE id = 1")).scalar_one()
+    assert json.loads(names) == ["Acne", "Redness"]
+
+
+def test_upgrade_database_of_a_later_release(engine):
+    create_schema(engine, BASELINE_SCHEMA + JOBS_SCHEMA)
+    seed_baseline(engine)
+
+    migrate.upgrade(bind=engine)
+
+    assert "profile" in {column["name"] for column in inspect(engine).get_columns("analysis_jobs")}
+    assert schema_drift(engine) == []
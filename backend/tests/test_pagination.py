@@ -0,0 +1,62 @@
+import pytest
+
+from app.services.pagination import NEXT, InvalidCursor, decode_cursor, encode_cursor
+
+JOURNALS = "/api/v1/journals/get-journals"
+
+
+def get_page(client, headers, **params):
+    response = client.get(JOURNALS, params=params, headers=headers)
+    assert response.status_code == 200
+    return response.json()["data"]
+
+
+@pytest.fixture
+def journals(client, auth_headers):
+    # Created within the same second, so only their ids order them
+    ids = []
+    for number in range(5):
+        response = client.post("/api/v1/journals/create-journal", json={"title": f"Day {number}", "content": "."},
+                               headers=auth_headers)
+        ids.append(response.json()["data"]["id"])
+    return ids[::-1]
+
+
+def test_next_cursors_page_through_every_entry_newest_first(client, auth_headers, journals):
+    pages = [get_page(client, auth_headers, limit=2)]
+    while pages[-1]["next_cursor"]:
+        pages.append(get_page(client, auth_headers, limit=2, cursor=pages[-1]["next_cursor"]))
+
+    assert [[item["id"] for item in page["items"]] for page in pages] == [journals[0:2], journals[2:4], journals[4:]]
+    assert pages[0]["prev_cursor"] is None
+    assert pages[-1]["next_cursor"] is None
+
+
+def test_prev_cursor_returns_to_the_newer_page(client, auth_headers, journals):
+    first = get_page(client, auth_headers, limit=2)
+    second = get_page(client, auth_headers, limit=2, cursor=first["next_cursor"])
+
+    back = get_page(client, auth_headers, limit=2, cursor=second["prev_cursor"])
+
+    assert [item["id"] for item in back["items"]] == journals[0:2]
+    assert back["prev_cursor"] is None
+    assert back["next_cursor"] is not None
+
+
+def test_total_is_counted_only_on_request(client, auth_headers, journals):
+    assert get_page(client, auth_headers, limit=2)["total"] is None
+    assert get_page(client, auth_headers, limit=2, include_total=True)["total"] == 5
+
+
+@pytest.mark.parametrize("cursor", ["not-a-cursor", encode_cursor("sideways", "2024-01-01 00:00:00", 1)])
+def test_invalid_cursors_are_rejected(client, auth_headers, cursor):
+    response = client.get(JOURNALS, params={"cursor": cursor}, headers=auth_headers)
+    assert response.status_code == 400
+
+
+def test_cursors_round_trip():
+    cursor = encode_cursor(NEXT, "2024-01-01 08:30:00", 42)
+
+    assert decode_cursor(cursor, raw_text=True) == (NEXT, "2024-01-01 08:30:00", 42)
+    with pytest.raises(InvalidCursor):
+        decode_cursor(cursor[:-3], raw_text=True)
@@ -0,0 +1,52 @@
+import pytest
+from prometheus_client import REGISTRY
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.db import migrate
+from app.services.product_catalog import ProductCatalogIndex, harvest_products
+
+
+@pytest.fixture
+def db(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'app.db'}")
+    migrate.upgrade(bind=engine)
+    session = sessionmaker(autoflush=False, bind=engine)()
+    yield session
+    session.close()
+    engine.dispose()
+
+
+def product(title, link):
+    return {"title": title, "description": "", "link": link, "price": "", "how_to_use": "", "benefits": "",
+            "side_effects": "", "dosage": ""}
+
+
+def concern_count(result):
+    return REGISTRY.get_sample_value("skin_doctor_product_catalog_concerns_total", {"result": result}) or 0
+
+
+def test_search_ranks_the_skin_type_first_and_counts_concerns(db):
+    harvest_products(db, "Indonesia", {
+        "skin_type": "Oily", "concerns": [{"name": "Acne"}],
+        "skincare_products": [product("Gel", "https://shop.example/gel")],
+    })
+    harvest_products(db, "Indonesia", {
+        "skin_type": "Dry", "concerns": [{"name": "Acne"}],
+        "skincare_products": [product("Cream", "https://shop.example/cream"), product("Gel", "https://shop.example/gel")],
+    })
+    db.commit()
+    hits, misses = concern_count("hit"), concern_count("miss")
+
+    products, missing = ProductCatalogIndex().search("indonesia", ["acne ", "Redness"], "dry", limit=1, db=db)
+
+    # Both are recommended for dry skin, the gel twice
+    assert [entry["title"] for entry in products] == ["Gel"]
+    assert missing == ["redness"]
+    assert (concern_count("hit") - hits, concern_count("miss") - misses) == (1, 1)
+
+
+@pytest.mark.parametrize("limit", [0, -1, 101])
+def test_catalog_limit_is_bounded(client, auth_headers, limit):
+    response = client.get("/api/v1/products/catalog", params={"limit": limit}, headers=auth_headers)
+    assert response.status_code == 422
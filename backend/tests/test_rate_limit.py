@@ -0,0 +1,100 @@
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from app.db.database import SessionLocal
+from app.models.users import User
+from app.services import rate_limit
+from app.services.rate_limit import (
+    KeyRateLimiter, MemoryBucketStore, RateLimitExceeded, SQLiteBucketStore, rate_key, rate_limiter
+)
+from tests.test_analysis_api import upload
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+        self.slept = []
+
+    def time(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.slept.append(seconds)
+        self.now += seconds
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(rate_limit, "time", SimpleNamespace(time=clock.time, sleep=clock.sleep))
+    return clock
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def store(request, tmp_path):
+    return MemoryBucketStore() if request.param == "memory" else SQLiteBucketStore(str(tmp_path / "rate_limits.db"))
+
+
+def test_calls_within_the_budget_do_not_wait(store, clock):
+    limiter = KeyRateLimiter(store, requests_per_minute=2, tokens_per_minute=1000, max_wait=10)
+
+    limiter.acquire("key", 400)
+    limiter.acquire("key", 400)
+
+    assert clock.slept == []
+    assert limiter.status("key")["requests_available"] == 0
+    assert limiter.status("other")["requests_available"] == 2
+
+
+def test_calls_over_the_budget_wait_for_the_refill(store, clock):
+    limiter = KeyRateLimiter(store, requests_per_minute=6, tokens_per_minute=1000, max_wait=30)
+
+    limiter.acquire("key", 800)
+    limiter.acquire("key", 400)
+
+    # 200 missing tokens refill in 12 seconds
+    assert clock.slept == [pytest.approx(12)]
+    assert limiter.status("key")["usage"]["waited_seconds"] == pytest.approx(12)
+
+
+def test_calls_that_would_wait_too_long_are_rejected(store, clock):
+    limiter = KeyRateLimiter(store, requests_per_minute=1, tokens_per_minute=1000, max_wait=20)
+    limiter.acquire("key", 10)
+
+    with pytest.raises(RateLimitExceeded) as error:
+        limiter.acquire("key", 10)
+
+    # The request refills in 60 seconds, 40 more than the maximum wait
+    assert error.value.retry_after == pytest.approx(40)
+    assert limiter.retry_after("key") == pytest.approx(40)
+    clock.now += 41
+    assert limiter.retry_after("key") == 0
+    assert limiter.status("key")["usage"]["rejected"] == 1
+
+
+def test_settle_returns_the_unused_tokens_and_records_the_used_ones(store, clock):
+    limiter = KeyRateLimiter(store, requests_per_minute=10, tokens_per_minute=1000, max_wait=10)
+
+    limiter.acquire("key", 600)
+    limiter.settle("key", 600, 250)
+
+    status = limiter.status("key")
+    assert status["tokens_available"] == 750
+    assert (status["usage"]["requests"], status["usage"]["tokens"]) == (1, 250)
+
+
+def test_analysis_over_the_budget_is_rejected_with_retry_after(client, auth_headers):
+    user_id = client.get("/api/v1/profile/me", headers=auth_headers).json()["data"]["id"]
+    with SessionLocal() as db:
+        key = rate_key(db.get(User, user_id).gemini_api_key)
+    # Five requests in debt, the next one refills well beyond the maximum wait
+    rate_limiter.store.save(key, (-5.0, float(rate_limiter.tokens_per_minute), time.time()))
+
+    response = client.post("/api/v1/analysis/analyze", files=upload(), headers=auth_headers)
+
+    assert response.status_code == 429
+    assert int(response.headers["Retry-After"]) > 0
+    quota = client.get("/api/v1/profile/api-quota", headers=auth_headers).json()["data"]
+    assert quota["usage"]["rejected"] == 1
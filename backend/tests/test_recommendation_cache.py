@@ -0,0 +1,76 @@
+import pytest
+
+from app.services import agent, recommendation_cache
+from app.services.recommendation_cache import (
+    get_recommendations, recommendation_key, set_recommendations, severity_bucket
+)
+from app.services.tool_cache import ToolCache
+
+FINDINGS = {"skin_type": "Oily", "concerns": [{"name": "Acne", "severity": "mild"}]}
+CONTEXT = {
+    "recommendations": ["Wash twice a day"],
+    "skincare_products": [{"title": "Gel", "link": "https://shop.example/gel"}],
+}
+
+
+@pytest.mark.parametrize("profile, split", [("fast", False), ("standard", True), ("deep", False)])
+def test_only_split_profiles_run_the_image_part_alone(profile, split, monkeypatch):
+    calls = []
+    monkeypatch.setattr(agent, "analyze_skin_split", lambda *args: calls.append("split") or "{}")
+    monkeypatch.setattr(agent, "run_with_deadline", lambda *args: calls.append("team") or ("{}", {}))
+
+    agent.analyze_skin("face.jpg", profile=profile)
+
+    assert calls == ["split" if split else "team"]
+
+
+@pytest.fixture
+def cache(tmp_path, monkeypatch):
+    cache = ToolCache(str(tmp_path / "recommendations.db"))
+    monkeypatch.setattr(recommendation_cache, "recommendation_cache", cache)
+    return cache
+
+
+def test_keys_ignore_case_and_concern_order_and_keep_the_highest_severity():
+    key = recommendation_key(" Oily", [{"name": "Acne ", "severity": "Mild"}, {"name": "redness", "severity": "severe"}],
+                             "standard")
+
+    assert key == recommendation_key("oily", [{"name": "Redness", "severity": "Severe"}, {"name": "acne"}], "standard")
+    assert key == {"skin_type": "oily", "concerns": ["acne", "redness"], "severity": "severe", "profile": "standard"}
+    assert severity_bucket([{"name": "acne", "severity": "very bad"}]) == "unknown"
+
+
+def test_recommendations_are_cached_per_country(cache):
+    key = recommendation_key("oily", [{"name": "acne", "severity": "mild"}], "standard")
+    set_recommendations(key, "Indonesia", CONTEXT)
+
+    assert get_recommendations(key, "indonesia") == CONTEXT
+    assert get_recommendations(key, "Malaysia") is None
+
+
+def research(monkeypatch, context):
+    calls = []
+    monkeypatch.setattr(agent, "research_batch_context", lambda *args: calls.append(args) or context)
+    return calls
+
+
+def test_shared_recommendations_research_once_per_skin_profile(cache, monkeypatch):
+    calls = research(monkeypatch, CONTEXT)
+    events = []
+
+    for _ in range(2):
+        context = agent.shared_recommendations(FINDINGS, FINDINGS["concerns"], 1, country="Indonesia",
+                                               profile="standard", on_event=lambda *event: events.append(event))
+        assert context == CONTEXT
+
+    assert len(calls) == 1
+    assert events == [("recommendation_cache_hit", {"skin_type": "oily", "concerns": ["acne"]})]
+
+
+def test_incomplete_research_is_not_cached(cache, monkeypatch):
+    calls = research(monkeypatch, {"recommendations": CONTEXT["recommendations"], "skincare_products": []})
+
+    for _ in range(2):
+        agent.shared_recommendations(FINDINGS, FINDINGS["concerns"], 1, country="Indonesia", profile="standard")
+
+    assert len(calls) == 2
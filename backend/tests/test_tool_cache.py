@@ -0,0 +1,81 @@
+from types import SimpleNamespace
+
+import pytest
+from prometheus_client import REGISTRY
+
+from app.services import tool_cache
+from app.services.tool_cache import ToolCache, cached_toolkit
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(tool_cache, "time", SimpleNamespace(time=clock))
+    return clock
+
+
+def lookups(tool, result):
+    return REGISTRY.get_sample_value("skin_doctor_tool_cache_total", {"tool": tool, "result": result}) or 0
+
+
+def test_keys_ignore_case_whitespace_and_argument_order(tmp_path):
+    cache = ToolCache(str(tmp_path / "cache.db"))
+
+    key = cache.make_key("search", {"query": "Niacinamide  Serum", "max_results": 5}, "Indonesia")
+
+    assert key == cache.make_key("search", {"max_results": 5, "query": " niacinamide serum"}, "indonesia")
+    assert key != cache.make_key("search", {"query": "niacinamide serum", "max_results": 5}, "Malaysia")
+    assert key != cache.make_key("arxiv", {"query": "niacinamide serum", "max_results": 5}, "Indonesia")
+
+
+def test_entries_expire_after_their_tool_ttl(tmp_path, clock):
+    cache = ToolCache(str(tmp_path / "cache.db"), ttls={"search": 60}, default_ttl=3600)
+    cache.set("search", "a", "results")
+    cache.set("arxiv", "b", "papers")
+
+    clock.now += 61
+    assert cache.get("search", "a") is None
+    assert cache.get("arxiv", "b") == "papers"
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path, clock):
+    cache = ToolCache(str(tmp_path / "cache.db"), max_entries=2)
+    cache.set("search", "a", "1")
+    clock.now += 1
+    cache.set("search", "b", "2")
+    clock.now += 1
+    assert cache.get("search", "a") == "1"
+    clock.now += 1
+    cache.set("search", "c", "3")
+
+    assert cache.get("search", "b") is None
+    assert (cache.get("search", "a"), cache.get("search", "c")) == ("1", "3")
+
+
+def test_cached_toolkit_calls_each_tool_once_per_arguments(tmp_path):
+    cache = ToolCache(str(tmp_path / "cache.db"))
+    calls = []
+
+    def search(query, max_results=5):
+        calls.append(query)
+        return f"results for {query}"
+
+    toolkit = SimpleNamespace(functions={"search_web": SimpleNamespace(name="search_web", entrypoint=search)})
+    hits, misses = lookups("search_web", "hit"), lookups("search_web", "miss")
+
+    cached_toolkit(toolkit, "Indonesia", cache)
+    entrypoint = toolkit.functions["search_web"].entrypoint
+    assert entrypoint("Retinol") == "results for Retinol"
+    assert entrypoint(" retinol ") == "results for Retinol"
+    assert entrypoint("Retinol", max_results=10) == "results for Retinol"
+
+    assert calls == ["Retinol", "Retinol"]
+    assert (lookups("search_web", "hit") - hits, lookups("search_web", "miss") - misses) == (1, 2)
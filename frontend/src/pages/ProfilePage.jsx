@@ -164,11 +164,8 @@ const ProfilePage = () => {
           userId: analysis.user_id,
           imageUrl: analysis.image_url,
           overallHealth: analysis.overall_health,
-          concerns: Array.isArray(analysis.concerns)
-            ? analysis.concerns.map((c) => c.name)
-            : [],
-          recommendations: Array.isArray(analysis.recommendations)
-            ? analysis.recommendations.map((r) => r.title)
+          concerns: Array.isArray(analysis.concern_names)
+            ? analysis.concern_names
             : [],
           createdAt: analysis.created_at,
         }));